@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from api.endpoints import attempt, quiz, post_quiz
+from api.endpoints import attempt, metrics, quiz, post_quiz
 
 api_router = APIRouter()
 
@@ -19,3 +19,7 @@ api_router.include_router(
     tags=['attempt'],
     prefix='/attempt'
 )
+api_router.include_router(
+    metrics.router,
+    tags=['metrics']
+)
@@ -1,35 +1,88 @@
-from fastapi import APIRouter, Depends
+from typing import Optional, Union
 
-from core.dependencies import init_service
-from models.attempt import AttemptInResponse, AttemptInCreate
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import UUID4, conlist
+
+from core.config import ATTEMPT_BATCH_MAX_ITEMS, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, STREAM_BATCH_SIZE
+from core.dependencies import get_service
+from core.metrics import MetricsRoute
+from core.responses import (CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, csv_response, model_response, ndjson_response,
+                            page_response)
+from models.attempt import AttemptInResponse, AttemptInResponsePartial, AttemptInCreate, AttemptBatchItemResult
+from models.pagination import Page, PageCursor
 from services.attempt import AttemptService
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
+
+AttemptsBatch = conlist(AttemptInCreate, min_items=1, max_items=ATTEMPT_BATCH_MAX_ITEMS)
+
+
+@router.get('/export', response_class=StreamingResponse, responses={200: {'content': {CSV_MEDIA_TYPE: {}}}})
+async def export_attempts_by_quiz_id(quiz_id: str,
+                                     format: str = Query('csv', regex='^csv$'),
+                                     gzip: bool = False,
+                                     batch_size: int = Query(STREAM_BATCH_SIZE, ge=1),
+                                     service: AttemptService = Depends(get_service(AttemptService))):
+    header, rows = await service.export_by_quiz_id(quiz_id, batch_size)
+
+    return csv_response(header, rows, f'attempts_{quiz_id}.{format}', compress=gzip)
 
 
 @router.get('/{attempt_id}', response_model=AttemptInResponse)
-async def get_attempt(attempt_id: str, service: AttemptService = Depends(init_service(AttemptService))):
+async def get_attempt(attempt_id: str, service: AttemptService = Depends(get_service(AttemptService))):
     attempt = await service.get_by_id(attempt_id)
 
-    return attempt
+    return model_response(attempt, AttemptInResponse)
+
+
+@router.get('/', response_model=Page[Union[AttemptInResponse, AttemptInResponsePartial]],
+            responses={200: {'content': {NDJSON_MEDIA_TYPE: {}}}})
+async def get_attempts(quiz_id: Optional[str] = None,
+                       user: Optional[UUID4] = None,
+                       answers: bool = False,  # only for the user history, attempts of a quiz always have answers
+                       limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+                       after: Optional[PageCursor] = None,
+                       stream: bool = False,
+                       batch_size: int = Query(STREAM_BATCH_SIZE, ge=1),
+                       service: AttemptService = Depends(get_service(AttemptService))):
+    if user is not None:
+        item_model = AttemptInResponse if answers else AttemptInResponsePartial
+        if stream:
+            return ndjson_response(service.iterate_by_user(user, batch_size, quiz_id, answers), item_model)
 
+        attempts, last_id = await service.get_by_user(user, limit, after, quiz_id, answers)
 
-@router.get('/', response_model=list[AttemptInResponse])
-async def get_attempts_by_quiz_id(quiz_id: str, service: AttemptService = Depends(init_service(AttemptService))):
-    attempts = await service.get_by_quiz_id(quiz_id)
+        return page_response(attempts, last_id, item_model)
 
-    return attempts
+    if quiz_id is None:
+        raise HTTPException(status_code=422, detail='Either quiz_id or user should be given')
+
+    if stream:
+        return ndjson_response(service.iterate_by_quiz_id(quiz_id, batch_size), AttemptInResponse)
+
+    attempts, last_id = await service.get_by_quiz_id(quiz_id, limit, after)
+
+    return page_response(attempts, last_id, AttemptInResponse)
 
 
 @router.post('/', response_model=AttemptInResponse, status_code=201)
-async def pass_quiz(quiz_data: AttemptInCreate, service: AttemptService = Depends(init_service(AttemptService))):
-    new_quiz = await service.pass_quiz(quiz_data)
+async def pass_quiz(quiz_data: AttemptInCreate, service: AttemptService = Depends(get_service(AttemptService))):
+    new_attempt = await service.pass_quiz(quiz_data)
+
+    return model_response(new_attempt, AttemptInResponse, status_code=201)
+
+
+@router.post('/batch', response_model=list[AttemptBatchItemResult])
+async def pass_quizzes(attempts_data: AttemptsBatch = Body(...),
+                       service: AttemptService = Depends(get_service(AttemptService))):
+    results = await service.pass_quizzes(attempts_data)
 
-    return new_quiz
+    return results
 
 
 @router.delete('/{attempt_id}', status_code=204)
-async def delete_quiz(attempt_id: str, service: AttemptService = Depends(init_service(AttemptService))):
+async def delete_quiz(attempt_id: str, service: AttemptService = Depends(get_service(AttemptService))):
     await service.delete(attempt_id)
 
     return {'message': 'ok'}
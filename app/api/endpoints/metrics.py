@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Request, Response
+
+from core.metrics import PROMETHEUS_MEDIA_TYPE
+
+router = APIRouter()
+
+
+@router.get('/metrics', include_in_schema=False)
+async def get_metrics(request: Request):
+    return Response(request.app.state.metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
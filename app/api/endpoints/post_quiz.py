@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 
-from core.dependencies import init_service
-from models.quiz import QuizInResponsePartial
+from core.dependencies import get_response_cache, get_service
+from core.metrics import MetricsRoute
+from core.response_cache import ResponseCache
+from core.responses import keyed_response, versioned_response
+from models.quiz import PostIdList, QuizInResponsePartial, QuizzesByPostId
 from services.quiz import QuizService
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
+
+
+@router.get('/', response_model=QuizzesByPostId)
+async def get_quizzes_by_post_ids(post_ids: PostIdList, service: QuizService = Depends(get_service(QuizService))):
+    quizzes = await service.get_many_by_post_ids(post_ids)
+
+    return keyed_response(quizzes, QuizInResponsePartial)
 
 
 @router.get('/{post_id}', response_model=QuizInResponsePartial)
-async def get_quiz_by_post_id(post_id: int, service: QuizService = Depends(init_service(QuizService))):
+async def get_quiz_by_post_id(post_id: int, request: Request, response: Response,
+                              service: QuizService = Depends(get_service(QuizService)),
+                              response_cache: ResponseCache = Depends(get_response_cache)):
     quiz = await service.get_by_post_id(post_id)
 
-    return quiz
+    return versioned_response(request, response, quiz, QuizInResponsePartial, response_cache)
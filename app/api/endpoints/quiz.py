@@ -1,42 +1,95 @@
-from fastapi import APIRouter, Depends
-
-from core.dependencies import init_service
-from models.quiz import QuizInCreate, QuizInResponseFull
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request, Response
+
+from core.config import (PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, STREAM_BATCH_SIZE, LEADERBOARD_SIZE,
+                         QUIZ_IMPORT_CHUNK_SIZE, QUIZ_IMPORT_MAX_LINE_SIZE)
+from core.dependencies import get_response_cache, get_service
+from core.metrics import MetricsRoute
+from core.response_cache import ResponseCache
+from core.responses import NDJSON_MEDIA_TYPE, model_response, ndjson_response, page_response, versioned_response
+from models.pagination import Page, PageCursor
+from models.quiz import QuizImportResult, QuizInCreate, QuizInResponseFull
+from models.quiz_deletion import QuizDeletionInResponse
+from models.stats import QuizLeaderboard, QuizStats
 from services.quiz import QuizService
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 
 @router.get('/{quiz_id}', response_model=QuizInResponseFull)
-async def get_quiz_by_id(quiz_id: str, service: QuizService = Depends(init_service(QuizService))):
+async def get_quiz_by_id(quiz_id: str, request: Request, response: Response,
+                         service: QuizService = Depends(get_service(QuizService)),
+                         response_cache: ResponseCache = Depends(get_response_cache)):
     quiz = await service.get_by_id(quiz_id)
 
-    return quiz
+    return versioned_response(request, response, quiz, QuizInResponseFull, response_cache)
+
+
+@router.get('/{quiz_id}/stats', response_model=QuizStats)
+async def get_quiz_stats(quiz_id: str, service: QuizService = Depends(get_service(QuizService))):
+    stats = await service.get_stats(quiz_id)
+
+    return stats
+
+
+@router.get('/{quiz_id}/leaderboard', response_model=QuizLeaderboard)
+async def get_quiz_leaderboard(quiz_id: str, limit: int = Query(LEADERBOARD_SIZE, ge=1, le=LEADERBOARD_SIZE),
+                               service: QuizService = Depends(get_service(QuizService))):
+    leaderboard = await service.get_leaderboard(quiz_id, limit)
+
+    return leaderboard
 
 
-@router.get('/', response_model=list[QuizInResponseFull])
-async def get_all_quizzes(service: QuizService = Depends(init_service(QuizService))):
-    quizzes_list = await service.get_all()
+@router.get('/', response_model=Page[QuizInResponseFull],
+            responses={200: {'content': {NDJSON_MEDIA_TYPE: {}}}})
+async def get_all_quizzes(limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+                          after: Optional[PageCursor] = None,
+                          stream: bool = False,
+                          batch_size: int = Query(STREAM_BATCH_SIZE, ge=1),
+                          service: QuizService = Depends(get_service(QuizService))):
+    if stream:
+        return ndjson_response(service.iterate_all(batch_size), QuizInResponseFull)
 
-    return quizzes_list
+    quizzes_list, last_id = await service.get_all(limit, after)
+
+    return page_response(quizzes_list, last_id, QuizInResponseFull)
 
 
 @router.post('/', response_model=QuizInResponseFull, status_code=201)
-async def create_quiz(quiz_data: QuizInCreate, service: QuizService = Depends(init_service(QuizService))):
+async def create_quiz(quiz_data: QuizInCreate, service: QuizService = Depends(get_service(QuizService))):
     new_quiz = await service.create(quiz_data)
 
-    return new_quiz
+    return model_response(new_quiz, QuizInResponseFull, status_code=201)
+
+
+@router.post('/import', response_model=list[QuizImportResult],
+             responses={200: {'content': {NDJSON_MEDIA_TYPE: {}}}})
+async def import_quizzes(request: Request, chunk_size: int = Query(QUIZ_IMPORT_CHUNK_SIZE, ge=1),
+                         service: QuizService = Depends(get_service(QuizService))):
+    results = service.import_quizzes(request.stream(), chunk_size, QUIZ_IMPORT_MAX_LINE_SIZE)
+
+    return ndjson_response(results, QuizImportResult, duplex=True)
 
 
 @router.put('/{quiz_id}', response_model=QuizInResponseFull)
-async def update_quiz(quiz_id: str, quiz_data: QuizInCreate, service: QuizService = Depends(init_service(QuizService))):
+async def update_quiz(quiz_id: str, quiz_data: QuizInCreate, service: QuizService = Depends(get_service(QuizService))):
     new_quiz = await service.update(quiz_id, quiz_data)
 
-    return new_quiz
+    return model_response(new_quiz, QuizInResponseFull)
 
 
 @router.delete('/{quiz_id}', status_code=204)
-async def delete_quiz(quiz_id: str, service: QuizService = Depends(init_service(QuizService))):
+async def delete_quiz(quiz_id: str, background_tasks: BackgroundTasks,
+                      service: QuizService = Depends(get_service(QuizService))):
     await service.delete(quiz_id)
+    background_tasks.add_task(service.purge_attempts_in_background, quiz_id)
 
     return {'message': 'ok'}
+
+
+@router.get('/{quiz_id}/deletion', response_model=QuizDeletionInResponse)
+async def get_quiz_deletion(quiz_id: str, service: QuizService = Depends(get_service(QuizService))):
+    deletion = await service.get_deletion(quiz_id)
+
+    return deletion
@@ -0,0 +1,68 @@
+"""
+Recompute incrementally maintained quiz statistics from the attempts collection.
+
+Usage (from the app directory):
+    python -m commands.rebuild_quiz_stats [--quiz-id QUIZ_ID ...] [--batch-size N]
+"""
+import argparse
+import asyncio
+from typing import Optional
+
+from bson import ObjectId
+from motor import motor_asyncio
+
+from core.config import (MONGODB_URL, QUIZ_CACHE_MAX_ENTRIES, QUIZ_CACHE_MAX_SIZE, QUIZ_CACHE_TTL,
+                         LEADERBOARD_SIZE, LEADERBOARD_MAX_QUIZZES)
+from crud.quiz import QuizCRUD
+from models.db import DBModelMixin
+from services.leaderboard import LeaderboardCache
+from services.quiz import QuizService
+from services.quiz_cache import QuizCache
+
+
+async def rebuild_quiz_stats(client: motor_asyncio.AsyncIOMotorClient, batch_size: int,
+                             quiz_ids: Optional[list[ObjectId]] = None) -> int:
+    """
+    Rebuild statistics of the given quizzes or of all quizzes, fetching quiz ids in batches
+    :param client: AsyncIOMotorClient instance
+    :param batch_size: number of quiz ids fetched from the DB per round trip
+    :param quiz_ids: list of quiz ObjectId, all quizzes when None
+    :return: number of rebuilt quizzes
+    """
+    service = QuizService(client, QuizCache(QUIZ_CACHE_MAX_ENTRIES, QUIZ_CACHE_MAX_SIZE, QUIZ_CACHE_TTL),
+                          LeaderboardCache(LEADERBOARD_SIZE, LEADERBOARD_MAX_QUIZZES))
+
+    if quiz_ids is None:
+        quizzes = QuizCRUD(client).iterate(batch_size, model=DBModelMixin)
+    else:
+        quizzes = QuizCRUD(client).iterate(batch_size, model=DBModelMixin, _id={'$in': quiz_ids})
+
+    rebuilt = 0
+    async for quiz in quizzes:
+        counters = await service.rebuild_stats(quiz.id)
+        rebuilt += 1
+        print(f'{quiz.id}: {counters.attempts} attempts')
+
+    return rebuilt
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute quiz statistics from attempts')
+    parser.add_argument('--quiz-id', action='append', type=ObjectId, dest='quiz_ids',
+                        help='quiz to rebuild, can be repeated; all quizzes by default')
+    parser.add_argument('--batch-size', type=int, default=100, help='number of quizzes fetched per round trip')
+    args = parser.parse_args()
+
+    client = motor_asyncio.AsyncIOMotorClient(MONGODB_URL)
+    try:
+        rebuilt = asyncio.get_event_loop().run_until_complete(
+            rebuild_quiz_stats(client, args.batch_size, args.quiz_ids)
+        )
+    finally:
+        client.close()
+
+    print(f'Rebuilt statistics of {rebuilt} quizzes')
+
+
+if __name__ == '__main__':
+    main()
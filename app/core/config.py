@@ -11,7 +11,55 @@ if MONGODB_URL is None:
 
     MONGODB_URL = f'mongodb://{MONGO_USER}:{MONGO_PASS}@{MONGO_HOST}:{MONGO_PORT}'
 
+# "mongodb" or "memory", the latter keeps data in the process and is meant for profiling and load tests
+MONGO_BACKEND = os.getenv('MONGO_BACKEND', 'mongodb')
+
 MAX_CONNECTIONS_COUNT = int(os.getenv("MAX_CONNECTIONS_COUNT", 10))
 MIN_CONNECTIONS_COUNT = int(os.getenv("MIN_CONNECTIONS_COUNT", 10))
 
 database_name = MONGO_DB
+
+PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 100))
+PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 1000))
+
+# Max number of quizzes looked up by post ids in one request
+POST_IDS_MAX = int(os.getenv('POST_IDS_MAX', 100))
+
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+
+# NDJSON quiz import: quizzes written per insert_many and the longest accepted line
+QUIZ_IMPORT_CHUNK_SIZE = int(os.getenv('QUIZ_IMPORT_CHUNK_SIZE', 500))
+QUIZ_IMPORT_MAX_LINE_SIZE = int(os.getenv('QUIZ_IMPORT_MAX_LINE_SIZE', 1024 * 1024))  # bytes
+
+QUIZ_CACHE_MAX_ENTRIES = int(os.getenv('QUIZ_CACHE_MAX_ENTRIES', 1024))
+QUIZ_CACHE_MAX_SIZE = int(os.getenv('QUIZ_CACHE_MAX_SIZE', 64 * 1024 * 1024))  # approximate size in bytes
+QUIZ_CACHE_TTL = float(os.getenv('QUIZ_CACHE_TTL', 60))  # seconds
+
+# Encoded bodies of quiz responses, keyed by quiz version
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 4096))
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv('RESPONSE_CACHE_MAX_SIZE', 32 * 1024 * 1024))  # bytes
+
+# In-process leaderboards: users kept per quiz (the max limit of a leaderboard request) and quizzes kept at once
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', 100))
+LEADERBOARD_MAX_QUIZZES = int(os.getenv('LEADERBOARD_MAX_QUIZZES', 1024))
+
+ATTEMPT_BATCH_MAX_ITEMS = int(os.getenv('ATTEMPT_BATCH_MAX_ITEMS', 1000))
+
+# Coalesce concurrent attempt inserts into one insert_many
+ATTEMPT_INSERT_BATCHING = os.getenv('ATTEMPT_INSERT_BATCHING', 'false').lower() == 'true'
+ATTEMPT_INSERT_BATCH_SIZE = int(os.getenv('ATTEMPT_INSERT_BATCH_SIZE', 100))
+ATTEMPT_INSERT_BATCH_WINDOW_MS = float(os.getenv('ATTEMPT_INSERT_BATCH_WINDOW_MS', 5))
+
+MONGO_CREATE_INDEXES = os.getenv('MONGO_CREATE_INDEXES', 'true').lower() == 'true'
+
+QUIZ_DELETION_BATCH_SIZE = int(os.getenv('QUIZ_DELETION_BATCH_SIZE', 1000))
+RESUME_QUIZ_DELETIONS = os.getenv('RESUME_QUIZ_DELETIONS', 'true').lower() == 'true'
+
+# Serialize models built from DB documents directly, without validating them again against response_model
+TRUSTED_DB_RESPONSES = os.getenv('TRUSTED_DB_RESPONSES', 'true').lower() == 'true'
+
+# Log MongoDB commands slower than the threshold, explain the first one of each filter shape when enabled
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG', 'true').lower() == 'true'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'false').lower() == 'true'
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', '/var/log/app/slow_queries.log')
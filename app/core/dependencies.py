@@ -1,8 +1,17 @@
 from fastapi import Request
 
+from core.response_cache import ResponseCache
+
+
+def get_service(service_class) -> callable:
+    """Resolve the app-scoped instance of the service class from the service container"""
 
-def init_service(service_class) -> callable:
     def wrapper(request: Request):
-        return service_class(request.app.state.mongodb)
+        return request.app.state.services.get(service_class)
 
     return wrapper
+
+
+def get_response_cache(request: Request) -> ResponseCache:
+    """Resolve the app-scoped cache of encoded responses"""
+    return request.app.state.response_cache
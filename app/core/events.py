@@ -1,26 +1,81 @@
+import asyncio
 from typing import Callable
 
-from motor import motor_asyncio
 from fastapi import FastAPI
 
-from core.config import MONGODB_URL, MAX_CONNECTIONS_COUNT, MIN_CONNECTIONS_COUNT
+from core.config import (MONGO_CREATE_INDEXES, database_name,
+                         QUIZ_CACHE_MAX_ENTRIES, QUIZ_CACHE_MAX_SIZE, QUIZ_CACHE_TTL,
+                         LEADERBOARD_SIZE, LEADERBOARD_MAX_QUIZZES,
+                         RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_SIZE,
+                         ATTEMPT_INSERT_BATCHING, ATTEMPT_INSERT_BATCH_SIZE, ATTEMPT_INSERT_BATCH_WINDOW_MS,
+                         RESUME_QUIZ_DELETIONS, SLOW_QUERY_LOG, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN,
+                         SLOW_QUERY_LOG_FILE)
+from core.metrics import Metrics
+from core.response_cache import ResponseCache
+from crud.attempt import AttemptCRUD
+from crud.quiz import QuizCRUD
+from crud.quiz_deletion import QuizDeletionCRUD
+from db.batcher import InsertBatcher
+from db.mongodb import create_client
+from db.monitoring import CommandTimer, PoolCheckoutTimer, SlowCommandRecorder, create_slow_query_logger
+from services.container import ServiceContainer
+from services.leaderboard import LeaderboardCache
+from services.quiz import QuizService
+from services.quiz_cache import QuizCache
 
 
 def on_startup_handler(app: FastAPI) -> Callable:
-    """Creates motor client"""
+    """
+    Creates metrics, storage client, collection indexes, the service container and the response cache,
+    resumes interrupted cascade deletions
+    """
 
     async def start_app():
-        app.state.mongodb = motor_asyncio.AsyncIOMotorClient(MONGODB_URL,
-                                                             maxPoolSize=MAX_CONNECTIONS_COUNT,
-                                                             minPoolSize=MIN_CONNECTIONS_COUNT)
+        app.state.metrics = Metrics()
+        event_listeners = [CommandTimer(app.state.metrics), PoolCheckoutTimer(app.state.metrics)]
+        app.state.slow_command_recorder = None
+        if SLOW_QUERY_LOG:
+            app.state.slow_command_recorder = SlowCommandRecorder(SLOW_QUERY_THRESHOLD_MS / 1000,
+                                                                  create_slow_query_logger(SLOW_QUERY_LOG_FILE),
+                                                                  explain=SLOW_QUERY_EXPLAIN)
+            event_listeners.append(app.state.slow_command_recorder)
+        app.state.mongodb = create_client(event_listeners=event_listeners)
+        if app.state.slow_command_recorder is not None:
+            app.state.slow_command_recorder.bind(app.state.mongodb)
+        if MONGO_CREATE_INDEXES:
+            for crud_class in (QuizCRUD, AttemptCRUD, QuizDeletionCRUD):
+                await crud_class(app.state.mongodb).create_indexes()
+        attempt_batcher = None
+        if ATTEMPT_INSERT_BATCHING:
+            attempt_batcher = InsertBatcher(app.state.mongodb[database_name][AttemptCRUD._collection_name],
+                                            max_size=ATTEMPT_INSERT_BATCH_SIZE,
+                                            max_delay=ATTEMPT_INSERT_BATCH_WINDOW_MS / 1000)
+        app.state.services = ServiceContainer(app.state.mongodb,
+                                              QuizCache(QUIZ_CACHE_MAX_ENTRIES, QUIZ_CACHE_MAX_SIZE, QUIZ_CACHE_TTL),
+                                              LeaderboardCache(LEADERBOARD_SIZE, LEADERBOARD_MAX_QUIZZES),
+                                              attempt_batcher)
+        app.state.response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_SIZE)
+        app.state.metrics.caches.register('quiz', app.state.services.quiz_cache.stats)
+        app.state.metrics.caches.register('response', app.state.response_cache.stats)
+
+        app.state.resumed_deletions = None
+        if RESUME_QUIZ_DELETIONS:
+            service = app.state.services.get(QuizService)
+            app.state.resumed_deletions = asyncio.ensure_future(service.resume_deletions())
 
     return start_app
 
 
 def on_shutdown_handler(app: FastAPI) -> Callable:
-    """Closes motor client"""
+    """Writes buffered documents and closes motor client"""
 
     async def shut_down():
+        if app.state.resumed_deletions is not None:
+            app.state.resumed_deletions.cancel()
+        if app.state.services.attempt_batcher is not None:
+            await app.state.services.attempt_batcher.close()
+        if app.state.slow_command_recorder is not None:
+            app.state.slow_command_recorder.close()
         app.state.mongodb.close()
 
     return shut_down
@@ -0,0 +1,220 @@
+"""
+Per-process metrics in the Prometheus text format.
+
+Every thread writes into its own shard of a metric, so observing a value takes no lock even when
+pymongo monitoring callbacks run in executor threads; shards are only summed up when metrics are rendered.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterator
+
+from fastapi import HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+
+from db.exceptions import DatabaseResultException
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: object) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _ShardedMetric:
+    """Base class of metrics keeping a dict of series by label values in every writing thread"""
+
+    _type: str
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._local = threading.local()
+        self._shards: list[dict] = []
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+            return shard
+
+    def _series(self) -> Iterator[tuple[tuple, object]]:
+        for shard in list(self._shards):
+            yield from list(shard.items())
+
+    def _labels(self, values: tuple, **extra: str) -> str:
+        pairs = [*zip(self.label_names, values), *extra.items()]
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self._type}'
+        yield from self._render_samples()
+
+    def _render_samples(self) -> Iterator[str]:
+        totals = {}
+        for labels, value in self._series():
+            totals[labels] = totals.get(labels, 0) + value
+        for labels, value in sorted(totals.items()):
+            yield f'{self.name}{self._labels(labels)} {value}'
+
+
+class Counter(_ShardedMetric):
+    _type = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(_ShardedMetric):
+    """Gauge which may be increased in one thread and decreased in another, the sum of shards stays right"""
+
+    _type = 'gauge'
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_ShardedMetric):
+    _type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]  # bucket counts, +Inf count, sum
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _render_samples(self) -> Iterator[str]:
+        totals = {}
+        for labels, series in self._series():
+            total = totals.setdefault(labels, [0] * len(series))
+            for index, value in enumerate(series):
+                total[index] += value
+
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                yield f'{self.name}_bucket{self._labels(labels, le=str(bound))} {cumulative}'
+            yield f'{self.name}_sum{self._labels(labels)} {series[-1]}'
+            yield f'{self.name}_count{self._labels(labels)} {cumulative}'
+
+
+class CacheStats:
+    """
+    Counters of in-process caches, read from their stats() when metrics are rendered,
+    so lookups keep counting with plain attribute increments
+    """
+
+    # stats() key, metric name, type and documentation
+    _series = (
+        ('hits', 'cache_hits_total', 'counter', 'Cache lookups which found the entry by cache'),
+        ('misses', 'cache_misses_total', 'counter', 'Cache lookups which did not find the entry by cache'),
+        ('evictions', 'cache_evictions_total', 'counter', 'Entries evicted to keep the cache in its limits by cache'),
+        ('entries', 'cache_entries', 'gauge', 'Entries in the cache by cache'),
+        ('size', 'cache_size_bytes', 'gauge', 'Approximate size of the cached entries by cache'),
+    )
+
+    def __init__(self):
+        self._caches: dict[str, Callable[[], dict]] = {}
+
+    def register(self, name: str, stats: Callable[[], dict]) -> None:
+        """
+        Export counters of the cache
+        :param name: value of the "cache" label
+        :param stats: function returning dict with hits, misses, evictions, entries and size of the cache
+        """
+        self._caches[name] = stats
+
+    def render(self) -> Iterator[str]:
+        stats = {name: get_stats() for name, get_stats in sorted(self._caches.items())}
+        for key, metric_name, metric_type, documentation in self._series:
+            yield f'# HELP {metric_name} {documentation}'
+            yield f'# TYPE {metric_name} {metric_type}'
+            for name, cache_stats in stats.items():
+                yield f'{metric_name}{{cache="{_escape(name)}"}} {cache_stats[key]}'
+
+
+class Metrics:
+    """App-scoped set of metrics, kept on app.state.metrics"""
+
+    def __init__(self):
+        self.request_duration = Histogram('http_request_duration_seconds',
+                                          'Time spent handling requests by route', ('method', 'route'))
+        self.requests = Counter('http_requests_total',
+                                'Handled requests by route and status code', ('method', 'route', 'status'))
+        self.requests_in_flight = Gauge('http_requests_in_flight',
+                                        'Requests being handled right now by route', ('method', 'route'))
+        self.mongo_command_duration = Histogram('mongodb_command_duration_seconds',
+                                                'MongoDB command round trip time by command name', ('command',))
+        self.mongo_command_failures = Counter('mongodb_command_failures_total',
+                                              'Failed MongoDB commands by command name', ('command',))
+        self.pool_checkout_wait = Histogram('mongodb_pool_checkout_wait_seconds',
+                                            'Time spent waiting for a connection from the pool')
+        self.pool_checkout_failures = Counter('mongodb_pool_checkout_failures_total',
+                                              'Failed connection checkouts by reason', ('reason',))
+        self.caches = CacheStats()
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format
+        :return: metrics text
+        """
+        metrics = (self.request_duration, self.requests, self.requests_in_flight, self.mongo_command_duration,
+                   self.mongo_command_failures, self.pool_checkout_wait, self.pool_checkout_failures, self.caches)
+
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+class MetricsRoute(APIRoute):
+    """Route which counts its requests, measures their handling time and tracks the ones in flight"""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def measured_handler(request: Request) -> Response:
+            metrics: Metrics = request.app.state.metrics
+            labels = (request.method, route)
+            status = 'error'
+            metrics.requests_in_flight.inc(*labels)
+            started = time.perf_counter()
+            try:
+                response = await handler(request)
+                status = str(response.status_code)
+                return response
+            except HTTPException as exc:
+                status = str(exc.status_code)
+                raise
+            except RequestValidationError:
+                status = '422'
+                raise
+            except DatabaseResultException:
+                status = '404'  # see core.exception_handlers
+                raise
+            finally:
+                metrics.request_duration.observe(time.perf_counter() - started, *labels)
+                metrics.requests.inc(*labels, status)
+                metrics.requests_in_flight.dec(*labels)
+
+        return measured_handler
@@ -0,0 +1,37 @@
+from typing import AsyncIterator, Optional
+
+
+async def iterate_lines(chunks: AsyncIterator[bytes], max_line_size: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a stream of bytes, like a request body, into lines, keeping at most one line in memory.
+    Lines longer than the limit are skipped as they arrive and yielded as None, so the line numbers stay right
+    :param chunks: async iterator of byte chunks
+    :param max_line_size: max length of a line in bytes, without the line break
+    :return: async iterator of lines without line breaks, None for the lines which are too long
+    """
+    buffer = bytearray()
+    too_long = False
+    async for chunk in chunks:
+        start = 0
+        end = chunk.find(b'\n')
+        while end != -1:
+            if too_long or len(buffer) + end - start > max_line_size:
+                yield None
+            else:
+                buffer += chunk[start:end]
+                yield bytes(buffer)
+            buffer.clear()
+            too_long = False
+            start = end + 1
+            end = chunk.find(b'\n', start)
+
+        if not too_long:
+            buffer += chunk[start:]
+            if len(buffer) > max_line_size:
+                buffer.clear()
+                too_long = True
+
+    if too_long:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
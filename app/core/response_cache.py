@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of encoded response bodies, bounded by the number of entries and their total size.
+    Keys include the content version, so a changed document gets a new entry and the old one is evicted
+    as least recently used instead of being invalidated
+    """
+
+    def __init__(self, max_entries: int, max_size: int):
+        self._max_entries = max_entries
+        self._max_size = max_size
+
+        self._bodies: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """
+        Get cached body
+        :param key: hashable key, which includes the content version
+        :return: encoded body or None, if it is not cached
+        """
+        body = self._bodies.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+
+        self._bodies.move_to_end(key)
+        self.hits += 1
+
+        return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        """
+        Add body to the cache, evicting least recently used bodies when limits are exceeded
+        :param key: hashable key, which includes the content version
+        :param body: encoded body
+        """
+        if key in self._bodies:
+            self._size -= len(self._bodies.pop(key))
+        if len(body) > self._max_size:
+            return
+
+        self._bodies[key] = body
+        self._size += len(body)
+
+        while len(self._bodies) > self._max_entries or self._size > self._max_size:
+            _, oldest_body = self._bodies.popitem(last=False)
+            self._size -= len(oldest_body)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+        :return: dict with hits, misses, evictions, current number of entries and their total size
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._bodies),
+            'size': self._size,
+        }
@@ -0,0 +1,255 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, AsyncIterator, Optional, Type, Union
+from uuid import UUID
+
+from bson import ObjectId
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+from starlette.types import Receive, Scope, Send
+
+from core.config import TRUSTED_DB_RESPONSES
+from core.response_cache import ResponseCache
+from models.pagination import PageCursor
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+CSV_MEDIA_TYPE = 'text/csv'  # charset is added by starlette
+CSV_CHUNK_SIZE = 64 * 1024  # characters of CSV written to the client at once
+
+
+def bson_default(value: Any) -> Any:
+    """Encode BSON types, which are not supported by the json module"""
+    if isinstance(value, (ObjectId, UUID)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def encode_json(content: Any) -> bytes:
+    """Encode JSON compatible content with BSON types compactly"""
+    return json.dumps(
+        content,
+        default=bson_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
+
+
+class BSONJSONResponse(JSONResponse):
+    """JSON response which encodes ObjectId and UUID values directly, without jsonable_encoder pass"""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+@lru_cache(maxsize=None)
+def get_include(model: Type[BaseModel]) -> dict:
+    """
+    Build pydantic "include" argument, which keeps only the fields described by the model.
+    Nested models (also inside lists) are narrowed down as well, so e.g. QuizInDB dumped with
+    the include of QuizPartial has no answers
+    :param model: BaseModel subclass, used as response_model
+    :return: include dict suitable for BaseModel.dict
+    """
+    include = {}
+    for name, field in model.__fields__.items():
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            nested_include = get_include(field.type_)
+            include[name] = nested_include if field.shape == SHAPE_SINGLETON else {'__all__': nested_include}
+        else:
+            include[name] = ...
+
+    return include
+
+
+def model_response(content: Any, response_model: Type[BaseModel],
+                   status_code: int = 200) -> Union[Any, BSONJSONResponse]:
+    """
+    Serialize the model, which was built from a trusted DB document, skipping the second
+    validation FastAPI does against response_model. Anything else is returned as is and
+    goes through the regular response_model path
+    :param content: endpoint result
+    :param response_model: response_model of the endpoint
+    :param status_code: response status code
+    :return: BSONJSONResponse instance or content itself
+    """
+    if not TRUSTED_DB_RESPONSES or not isinstance(content, BaseModel):
+        return content
+
+    return BSONJSONResponse(content.dict(by_alias=True, include=get_include(response_model)), status_code=status_code)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check If-None-Match header against the ETag, with the weak comparison RFC 7232 requires for it
+    :param if_none_match: header value, a list of entity tags or "*"
+    :param etag: strong ETag of the current representation
+    :return: True, if the client has the current representation
+    """
+    if not if_none_match:
+        return False
+
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == etag:
+            return True
+
+    return False
+
+
+def versioned_response(request: Request, response: Response, content: Any, response_model: Type[BaseModel],
+                       response_cache: ResponseCache) -> Union[Any, Response]:
+    """
+    Serve the model with a version field with an ETag made of the _id and the version,
+    so a matching If-None-Match gets 304 with no encoding at all. The trusted model (see model_response)
+    is served from its encoded body cache, otherwise the content goes through the regular response_model path
+    :param request: incoming request
+    :param response: response of the endpoint, gets the ETag when the content is returned as is
+    :param content: endpoint result
+    :param response_model: response_model of the endpoint
+    :param response_cache: ResponseCache instance
+    :return: Response instance or content itself
+    """
+    if not isinstance(content, BaseModel):
+        return content
+
+    etag = f'"{content.id}-{content.version}-{response_model.__name__}"'
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    if not TRUSTED_DB_RESPONSES:
+        response.headers['ETag'] = etag
+        return content
+
+    key = (response_model, content.id, content.version)
+
+    body = response_cache.get(key)
+    if body is None:
+        body = encode_json(content.dict(by_alias=True, include=get_include(response_model)))
+        response_cache.put(key, body)
+
+    return Response(body, media_type=BSONJSONResponse.media_type, headers={'ETag': etag})
+
+
+def page_response(items: list, last_id: Optional[ObjectId],
+                  item_model: Type[BaseModel]) -> Union[dict, BSONJSONResponse]:
+    """
+    Make a Page response out of the trusted models, see model_response
+    :param items: list of BaseModel subclass instances on the page
+    :param last_id: _id to continue from or None on the last page
+    :param item_model: model of the page items in response_model
+    :return: BSONJSONResponse instance or Page compatible dict
+    """
+    next_cursor = PageCursor.encode(last_id)
+    if not TRUSTED_DB_RESPONSES or not all(isinstance(item, BaseModel) for item in items):
+        return {'items': items, 'next_cursor': next_cursor}
+
+    include = get_include(item_model)
+    return BSONJSONResponse({
+        'items': [item.dict(by_alias=True, include=include) for item in items],
+        'next_cursor': next_cursor
+    })
+
+
+def keyed_response(items: dict, item_model: Type[BaseModel]) -> Union[dict, BSONJSONResponse]:
+    """
+    Make a response of the trusted models keyed by some field, missing keys have None, see model_response
+    :param items: dict of BaseModel subclass instances or None
+    :param item_model: model of the items in response_model
+    :return: BSONJSONResponse instance or response_model compatible dict
+    """
+    if not TRUSTED_DB_RESPONSES or not all(isinstance(item, BaseModel) for item in items.values() if item is not None):
+        return {'items': items}
+
+    include = get_include(item_model)
+    return BSONJSONResponse({
+        'items': {key: item and item.dict(by_alias=True, include=include) for key, item in items.items()}
+    })
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response which is sent while its body iterator still reads the request body.
+    StreamingResponse waits for the client disconnect meanwhile, which would take the request body messages away,
+    so here a disconnect is noticed by the request body reader instead
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+        if self.background is not None:
+            await self.background()
+
+
+def ndjson_response(models: AsyncIterator[BaseModel], item_model: Type[BaseModel],
+                    duplex: bool = False) -> StreamingResponse:
+    """
+    Stream models to the client as newline delimited JSON, one document per line
+    :param models: async iterator of BaseModel subclass instances
+    :param item_model: model describing fields of each line
+    :param duplex: whether the iterator reads the request body, see DuplexStreamingResponse
+    :return: StreamingResponse instance
+    """
+    include = get_include(item_model)
+
+    async def lines():
+        async for model in models:
+            yield json.dumps(model.dict(by_alias=True, include=include), default=bson_default,
+                             ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    response_class = DuplexStreamingResponse if duplex else StreamingResponse
+    return response_class(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Compress a stream of bytes into one gzip member on the fly
+    :param chunks: async iterator of byte chunks
+    :return: async iterator of compressed chunks
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+def csv_response(header: list[str], rows: AsyncIterator[list], filename: str,
+                 compress: bool = False) -> StreamingResponse:
+    """
+    Stream rows to the client as a CSV attachment, written in chunks of about CSV_CHUNK_SIZE
+    :param header: column names
+    :param rows: async iterator of rows
+    :param filename: name of the downloaded file
+    :param compress: whether to send the CSV with gzip content encoding
+    :return: StreamingResponse instance
+    """
+    async def chunks():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        async for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= CSV_CHUNK_SIZE:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('utf-8')
+
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+        return StreamingResponse(gzip_chunks(chunks()), media_type=CSV_MEDIA_TYPE, headers=headers)
+
+    return StreamingResponse(chunks(), media_type=CSV_MEDIA_TYPE, headers=headers)
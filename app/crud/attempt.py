@@ -1,30 +1,148 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorClientSession
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import BulkWriteError
 
 from crud.base import AbstractCRUD
-from models.attempt import AttemptInDB
+from crud.projection import get_projection
+from db.batcher import InsertBatcher
+from db.exceptions import DatabaseResultException
+from models.attempt import AttemptInDB, AttemptScore
 
 
 class AttemptCRUD(AbstractCRUD):
     """Describes CRUD operations for quiz attempts"""
     _collection_name = 'attempts'
     _model = AttemptInDB
+    _indexes = [
+        IndexModel([('quiz_id', ASCENDING), ('_id', ASCENDING)]),
+        # leaderboard seeding reads best scores first, user makes it an index-only scan
+        IndexModel([('quiz_id', ASCENDING), ('total_score', DESCENDING), ('_id', ASCENDING), ('user', ASCENDING)]),
+        # user history by quiz; total_score lets AttemptSummary pages be served from the index alone
+        IndexModel([('user', ASCENDING), ('quiz_id', ASCENDING), ('_id', ASCENDING), ('total_score', ASCENDING)]),
+        # user history of all quizzes, pages come in _id order without a blocking sort and are covered as well
+        IndexModel([('user', ASCENDING), ('_id', ASCENDING), ('quiz_id', ASCENDING), ('total_score', ASCENDING)]),
+    ]
+
+    def __init__(self, client: AsyncIOMotorClient, insert_batcher: Optional[InsertBatcher] = None):
+        super().__init__(client)
+        self._insert_batcher = insert_batcher
 
     async def create(self, attempt_data: dict,
                      session: Optional[AsyncIOMotorClientSession] = None) -> AttemptInDB:
         """
-        Create attempt document in the DB by given data
+        Create attempt document in the DB by given data.
+        Without a session the insert goes through the insert batcher, when the app has one
         :param attempt_data:
         :param session: AsyncIOMotorClientSession to make transactions when needed
         :return: AttemptInDB instance filled with attempt data
         """
-        row = await self._db[self._collection_name].insert_one(attempt_data, session=session)
-        attempt = self._model(**attempt_data, _id=row.inserted_id)
+        if self._insert_batcher is not None and session is None:
+            inserted_id = await self._insert_batcher.insert(attempt_data)
+        else:
+            row = await self._collection.insert_one(attempt_data, session=session)
+            inserted_id = row.inserted_id
+        attempt = self._model(**{**attempt_data, '_id': inserted_id})
 
         return attempt
 
+    async def create_many(self, attempts_data: list[dict], session: Optional[AsyncIOMotorClientSession] = None
+                          ) -> tuple[list[Optional[AttemptInDB]], dict[int, str]]:
+        """
+        Create many attempt documents in the DB with one unordered insert, so one failed document
+        does not prevent the others from being saved
+        :param attempts_data: list of attempts data
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        :return: list of AttemptInDB instances (None for failed documents) and error messages by document index
+        """
+        errors = {}
+        try:
+            await self._collection.insert_many(attempts_data, ordered=False, session=session)
+        except BulkWriteError as exc:
+            errors = {error['index']: error['errmsg'] for error in exc.details['writeErrors']}
+
+        attempts = [
+            None if index in errors else self._model(**attempt_data)
+            for index, attempt_data in enumerate(attempts_data)
+        ]
+
+        return attempts, errors
+
+    async def iterate_best_scores(self, quiz_id: ObjectId, batch_size: int) -> AsyncIterator[AttemptScore]:
+        """
+        Iterate over attempts of the quiz from the best score, earlier attempts first among equal scores
+        :param quiz_id: ObjectId of the quiz
+        :param batch_size: number of attempts fetched from the DB per round trip
+        :return: async iterator of AttemptScore instances
+        """
+        cursor = self._collection.find({'quiz_id': quiz_id}, get_projection(AttemptScore))
+        cursor = cursor.sort([('total_score', DESCENDING), ('_id', ASCENDING)]).batch_size(batch_size)
+        async for document in cursor:
+            yield AttemptScore(**document)
+
+    async def aggregate_stats(self, quiz_id: ObjectId) -> tuple[dict[int, int], dict[int, dict]]:
+        """
+        Count attempt scores and per-question correctness inside the DB, so only the summary is transferred
+        :param quiz_id: ObjectId of the quiz
+        :return: number of attempts by total_score and {"answered": int, "correct": int} counters by question index
+        """
+        pipeline = [
+            {'$match': {'quiz_id': quiz_id}},
+            {'$facet': {
+                'histogram': [
+                    {'$group': {'_id': '$total_score', 'count': {'$sum': 1}}},
+                ],
+                'questions': [
+                    {'$unwind': {'path': '$answers', 'includeArrayIndex': 'index'}},
+                    {'$group': {
+                        '_id': '$index',
+                        'answered': {'$sum': 1},
+                        'correct': {'$sum': {'$cond': ['$answers.is_correct', 1, 0]}}
+                    }},
+                ],
+            }},
+        ]
+        [result] = await self._collection.aggregate(pipeline).to_list(length=1)
+
+        histogram = {bucket['_id']: bucket['count'] for bucket in result['histogram']}
+        questions = {
+            question['_id']: {'answered': question['answered'], 'correct': question['correct']}
+            for question in result['questions']
+        }
+
+        return histogram, questions
+
+    async def pop(self, attempt_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None) -> AttemptInDB:
+        """
+        Delete attempt document from the DB by _id and return it
+        :param attempt_id: ObjectId instance
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        :return: AttemptInDB instance filled with removed attempt data
+        """
+        data = await self._collection.find_one_and_delete({'_id': attempt_id}, session=session)
+        if data is None:
+            raise DatabaseResultException(f'There are no {self._collection_name} with {attempt_id}')
+
+        return self._model(**data)
+
+    async def delete_batch_by_quiz_id(self, quiz_id: ObjectId, batch_size: int,
+                                      session: Optional[AsyncIOMotorClientSession] = None) -> int:
+        """
+        Delete at most batch_size attempts of the quiz, so one call never holds a huge document set
+        :param quiz_id: ObjectId of the quiz
+        :param batch_size: max number of attempts to delete
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        :return: number of removed documents, 0 when there is nothing left
+        """
+        cursor = self._collection.find({'quiz_id': quiz_id}, {'_id': 1}, session=session)
+        attempt_ids = [document['_id'] for document in await cursor.limit(batch_size).to_list(length=batch_size)]
+        if not attempt_ids:
+            return 0
+
+        return await self.delete_many(attempt_ids, session=session)
+
     async def delete_many(self, attempt_ids: list[ObjectId],
                           session: Optional[AsyncIOMotorClientSession] = None) -> int:
         """
@@ -33,6 +151,6 @@ class AttemptCRUD(AbstractCRUD):
         :param session: AsyncIOMotorClientSession to make transactions when needed
         :return: number of removed documents
         """
-        result = await self._db[self._collection_name].delete_many({'_id': {'$in': attempt_ids}}, session=session)
+        result = await self._collection.delete_many({'_id': {'$in': attempt_ids}}, session=session)
 
         return result.deleted_count
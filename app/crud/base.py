@@ -1,11 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Type, Optional
+from typing import AsyncIterator, Type, Optional
 
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorClientSession
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
 
 from core.config import database_name
+from crud.projection import get_projection
 from db.exceptions import DatabaseResultException
 
 
@@ -14,32 +16,89 @@ class AbstractCRUD(ABC):
 
     _collection_name: str
     _model: Type[BaseModel]
+    _indexes: list[IndexModel] = []
 
     def __init__(self, client: AsyncIOMotorClient):
-        self._db = client[database_name]
+        self._collection = client[database_name][self._collection_name]
 
-    async def get(self, *args, **kwargs):
+    async def create_indexes(self) -> None:
+        """Create indexes declared for the collection, existing ones are left untouched"""
+        if self._indexes:
+            await self._collection.create_indexes(self._indexes)
+
+    def _resolve_model(self, model: Optional[Type[BaseModel]]) -> tuple[Type[BaseModel], Optional[dict]]:
+        """
+        Pick the model documents are validated into and the projection needed to fill it
+        :param model: BaseModel subclass with a subset of the default model fields or None
+        :return: model class and projection dict (None to fetch whole documents)
+        """
+        if model is None or model is self._model:
+            return self._model, None
+
+        return model, get_projection(model)
+
+    async def get(self, *args, model: Optional[Type[BaseModel]] = None, **kwargs):
         """
         Retrieve document from the DB by parameters passed as key arguments
+        :param model: BaseModel subclass to validate the document into, only its fields are fetched from the DB
         :return: BaseModel subclass instance filled with document data
         """
-        data = await self._db[self._collection_name].find_one(kwargs)
+        model, projection = self._resolve_model(model)
+        data = await self._collection.find_one(kwargs, projection)
 
         if data is None:
             raise DatabaseResultException(f'There are no {self._collection_name} by "{kwargs}"')
 
-        return self._model(**data)
+        return model(**data)
 
-    async def get_many(self, *args, **kwargs) -> list:
+    async def get_many(self, *args, limit: Optional[int] = None, after: Optional[ObjectId] = None,
+                       model: Optional[Type[BaseModel]] = None, **kwargs) -> list:
         """
         Retrieve many documents from the DB by parameters passed as key arguments
+        :param limit: max number of documents to return, documents are ordered by _id when it is set
+        :param after: return only documents with _id greater than this one
+        :param model: BaseModel subclass to validate documents into, only its fields are fetched from the DB
         :return: list of BaseModel subclass instance filled with document data
         """
-        cursor = self._db[self._collection_name].find(kwargs)
-        result = [self._model(**document) for document in await cursor.to_list(length=None)]
+        model, projection = self._resolve_model(model)
+        if after is not None:
+            kwargs['_id'] = {'$gt': after}
+
+        cursor = self._collection.find(kwargs, projection)
+        if limit is not None:
+            cursor = cursor.sort('_id', ASCENDING).limit(limit)
+        result = [model(**document) for document in await cursor.to_list(length=limit)]
 
         return result
 
+    async def get_page(self, limit: int, after: Optional[ObjectId] = None,
+                       model: Optional[Type[BaseModel]] = None, **kwargs) -> tuple[list, Optional[ObjectId]]:
+        """
+        Retrieve one page of documents using keyset pagination on _id
+        :param limit: page size
+        :param after: _id of the last document of the previous page
+        :param model: BaseModel subclass to validate documents into, only its fields are fetched from the DB
+        :return: list of BaseModel subclass instances and _id to continue from (None on the last page)
+        """
+        documents = await self.get_many(limit=limit + 1, after=after, model=model, **kwargs)
+        if len(documents) > limit:
+            return documents[:limit], documents[limit - 1].id
+
+        return documents, None
+
+    async def iterate(self, batch_size: int, model: Optional[Type[BaseModel]] = None,
+                      **kwargs) -> AsyncIterator[BaseModel]:
+        """
+        Iterate over documents from the DB by parameters passed as key arguments without loading them all at once
+        :param batch_size: number of documents fetched from the DB per round trip
+        :param model: BaseModel subclass to validate documents into, only its fields are fetched from the DB
+        :return: async iterator of BaseModel subclass instances filled with document data
+        """
+        model, projection = self._resolve_model(model)
+        cursor = self._collection.find(kwargs, projection).batch_size(batch_size)
+        async for document in cursor:
+            yield model(**document)
+
     @abstractmethod
     async def create(self, document_data: dict, session: Optional[AsyncIOMotorClientSession] = None) -> BaseModel:
         """
@@ -56,6 +115,6 @@ class AbstractCRUD(ABC):
         :param document_id: ObjectId instance
         :param session: AsyncIOMotorClientSession instance to make a transaction
         """
-        result = await self._db[self._collection_name].delete_one({'_id': document_id}, session=session)
+        result = await self._collection.delete_one({'_id': document_id}, session=session)
         if result.deleted_count == 0:
             raise DatabaseResultException(f'There are no {self._collection_name} with {document_id}')
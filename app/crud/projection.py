@@ -0,0 +1,28 @@
+from functools import lru_cache
+from typing import Type
+
+from pydantic import BaseModel
+
+
+@lru_cache(maxsize=None)
+def get_projection(model: Type[BaseModel]) -> dict:
+    """
+    Build MongoDB projection which fetches only the fields described by the model.
+    Nested models (also inside lists) are expanded to dotted paths, so e.g. QuizPartial
+    never pulls "questions.answer" from the DB
+    :param model: BaseModel subclass, documents will be validated into
+    :return: projection dict suitable for find / find_one
+    """
+    return {path: 1 for path in _field_paths(model)}
+
+
+def _field_paths(model: Type[BaseModel], prefix: str = '') -> list[str]:
+    paths = []
+    for field in model.__fields__.values():
+        path = f'{prefix}{field.alias}'
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            paths.extend(_field_paths(field.type_, prefix=f'{path}.'))
+        else:
+            paths.append(path)
+
+    return paths
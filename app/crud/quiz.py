@@ -1,9 +1,11 @@
 from motor.motor_asyncio import AsyncIOMotorClientSession
-from pymongo import ReturnDocument
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from typing import Optional
 
 from bson import ObjectId
 
+from db.batcher import DUPLICATE_KEY_ERROR_CODE
 from db.exceptions import DatabaseResultException
 from crud.base import AbstractCRUD
 from models.quiz import QuizInDB
@@ -14,6 +16,9 @@ class QuizCRUD(AbstractCRUD):
 
     _collection_name = 'quizzes'
     _model = QuizInDB
+    _indexes = [
+        IndexModel([('post_id', ASCENDING)], unique=True),
+    ]
 
     async def create(self, quiz_data: dict, session: Optional[AsyncIOMotorClientSession] = None) -> QuizInDB:
         """
@@ -22,30 +27,63 @@ class QuizCRUD(AbstractCRUD):
         :param session: AsyncIOMotorClientSession to make transactions when needed
         :return: QuizInDB instance filled with quiz data
         """
-        check_duplicate = await self._db[self._collection_name].find_one({'post_id': quiz_data['post_id']})
-        if check_duplicate is not None:
+        try:
+            row = await self._collection.insert_one(quiz_data, session=session)
+        except DuplicateKeyError:
             raise DatabaseResultException(f'There is a quiz with post id "{quiz_data["post_id"]}" already')
 
-        row = await self._db[self._collection_name].insert_one(quiz_data)
-        quiz = self._model(**quiz_data, _id=row.inserted_id)
+        quiz = self._model(**{**quiz_data, '_id': row.inserted_id})
 
         return quiz
 
+    async def create_many(self, quizzes_data: list[dict], session: Optional[AsyncIOMotorClientSession] = None
+                          ) -> tuple[list[Optional[QuizInDB]], dict[int, str]]:
+        """
+        Insert many quiz documents to the DB with one unordered insert, so a duplicate post id
+        does not prevent the other quizzes from being saved
+        :param quizzes_data: list of quiz data in QuizInCreate format
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        :return: list of QuizInDB instances (None for failed documents) and error messages by document index
+        """
+        for quiz_data in quizzes_data:
+            quiz_data.setdefault('_id', ObjectId())
+
+        errors = {}
+        try:
+            await self._collection.insert_many(quizzes_data, ordered=False, session=session)
+        except BulkWriteError as exc:
+            for error in exc.details['writeErrors']:
+                if error.get('code') == DUPLICATE_KEY_ERROR_CODE:
+                    post_id = quizzes_data[error['index']]['post_id']
+                    errors[error['index']] = f'There is a quiz with post id "{post_id}" already'
+                else:
+                    errors[error['index']] = error['errmsg']
+
+        quizzes = [
+            None if index in errors else self._model(**quiz_data)
+            for index, quiz_data in enumerate(quizzes_data)
+        ]
+
+        return quizzes, errors
+
     async def update(self, quiz_id: ObjectId, quiz_data: dict,
                      session: Optional[AsyncIOMotorClientSession] = None) -> QuizInDB:
         """
-        Update quiz document in the DB by quiz _id
+        Update quiz document in the DB by quiz _id and bump its version
         :param quiz_id: should be valid ObjectId string
         :param quiz_data: quiz data in QuizInCreate format
         :param session: AsyncIOMotorClientSession to make transactions when needed
         :return: QuizInDB instance filled with quiz data
         """
-        new_quiz = await self._db[self._collection_name].find_one_and_update(
-            {'_id': quiz_id},
-            {'$set': quiz_data},
-            session=session,
-            return_document=ReturnDocument.AFTER
-        )
+        try:
+            new_quiz = await self._collection.find_one_and_update(
+                {'_id': quiz_id},
+                {'$set': quiz_data, '$inc': {'version': 1}},
+                session=session,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            raise DatabaseResultException(f'There is a quiz with post id "{quiz_data["post_id"]}" already')
         if new_quiz is None:
             raise DatabaseResultException(f'There are no quizzes with ObjectId("{quiz_id}")')
 
@@ -0,0 +1,70 @@
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+from crud.base import AbstractCRUD
+from models.quiz_deletion import QuizDeletion
+
+
+class QuizDeletionCRUD(AbstractCRUD):
+    """Describes CRUD operations for progress of the quiz attempts cascade deletion"""
+
+    _collection_name = 'quiz_deletions'
+    _model = QuizDeletion
+    _indexes = [
+        IndexModel([('finished', ASCENDING)]),
+    ]
+
+    async def create(self, deletion_data: dict,
+                     session: Optional[AsyncIOMotorClientSession] = None) -> QuizDeletion:
+        """
+        Insert deletion progress document to the DB
+        :param deletion_data: progress data in QuizDeletion format
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        :return: QuizDeletion instance
+        """
+        row = await self._collection.insert_one(deletion_data, session=session)
+
+        return self._model(**{**deletion_data, '_id': row.inserted_id})
+
+    async def start(self, quiz_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None) -> QuizDeletion:
+        """
+        Start tracking deletion of the quiz attempts, existing progress is kept
+        :param quiz_id: ObjectId of the removed quiz
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        :return: QuizDeletion instance
+        """
+        data = await self._collection.find_one_and_update(
+            {'_id': quiz_id},
+            {'$setOnInsert': {'deleted_attempts': 0}, '$set': {'finished': False}},
+            upsert=True,
+            session=session,
+            return_document=ReturnDocument.AFTER
+        )
+
+        return self._model(**data)
+
+    async def add_progress(self, quiz_id: ObjectId, deleted_attempts: int,
+                           session: Optional[AsyncIOMotorClientSession] = None) -> None:
+        """
+        Count another batch of removed attempts
+        :param quiz_id: ObjectId of the removed quiz
+        :param deleted_attempts: number of attempts removed in the batch
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        """
+        await self._collection.update_one(
+            {'_id': quiz_id},
+            {'$inc': {'deleted_attempts': deleted_attempts}},
+            session=session
+        )
+
+    async def finish(self, quiz_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None) -> None:
+        """
+        Mark deletion of the quiz attempts as finished
+        :param quiz_id: ObjectId of the removed quiz
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        """
+        await self._collection.update_one({'_id': quiz_id}, {'$set': {'finished': True}},
+                                          session=session)
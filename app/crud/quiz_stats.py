@@ -0,0 +1,90 @@
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClientSession
+from pymongo import UpdateOne
+
+from crud.base import AbstractCRUD
+from models.attempt import AttemptInDB
+from models.stats import QuizStatsCounters
+
+
+class QuizStatsCRUD(AbstractCRUD):
+    """Describes CRUD operations for incrementally maintained quiz statistics"""
+
+    _collection_name = 'quiz_stats'
+    _model = QuizStatsCounters
+
+    async def create(self, stats_data: dict,
+                     session: Optional[AsyncIOMotorClientSession] = None) -> QuizStatsCounters:
+        """
+        Insert quiz statistics document to the DB
+        :param stats_data: statistics data in QuizStatsCounters format
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        :return: QuizStatsCounters instance filled with statistics data
+        """
+        row = await self._collection.insert_one(stats_data, session=session)
+
+        return self._model(**{**stats_data, '_id': row.inserted_id})
+
+    async def get_counters(self, quiz_id: ObjectId) -> QuizStatsCounters:
+        """
+        Get statistics counters of the quiz with a single lookup
+        :param quiz_id: ObjectId of the quiz
+        :return: QuizStatsCounters instance, empty one if there were no attempts yet
+        """
+        data = await self._collection.find_one({'_id': quiz_id})
+
+        return self._model(**(data or {'_id': quiz_id}))
+
+    async def record(self, attempts: list[AttemptInDB], sign: int = 1,
+                     session: Optional[AsyncIOMotorClientSession] = None) -> None:
+        """
+        Atomically add attempts to (or, with negative sign, remove them from) statistics of their quizzes
+        :param attempts: list of AttemptInDB instances
+        :param sign: 1 to count new attempts, -1 to discount removed ones
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        """
+        if not attempts:
+            return
+
+        operations = [
+            UpdateOne({'_id': attempt.quiz_id}, {'$inc': self._increments(attempt, sign)}, upsert=True)
+            for attempt in attempts
+        ]
+        await self._collection.bulk_write(operations, ordered=False, session=session)
+
+    async def replace(self, counters: QuizStatsCounters,
+                      session: Optional[AsyncIOMotorClientSession] = None) -> None:
+        """
+        Overwrite statistics of the quiz, used to rebuild counters from attempts
+        :param counters: QuizStatsCounters instance
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        """
+        document = counters.dict(by_alias=True)
+        document['histogram'] = {str(score): count for score, count in document['histogram'].items()}
+        document['questions'] = {str(index): question for index, question in document['questions'].items()}
+
+        await self._collection.replace_one({'_id': counters.id}, document,
+                                           upsert=True, session=session)
+
+    async def delete_for_quiz(self, quiz_id: ObjectId, session: Optional[AsyncIOMotorClientSession] = None) -> None:
+        """
+        Delete statistics of the quiz, if there are any
+        :param quiz_id: ObjectId of the quiz
+        :param session: AsyncIOMotorClientSession to make transactions when needed
+        """
+        await self._collection.delete_one({'_id': quiz_id}, session=session)
+
+    @staticmethod
+    def _increments(attempt: AttemptInDB, sign: int) -> dict:
+        increments = {
+            'attempts': sign,
+            'score_sum': sign * attempt.total_score,
+            f'histogram.{attempt.total_score}': sign,
+        }
+        for index, answer in enumerate(attempt.answers):
+            increments[f'questions.{index}.answered'] = sign
+            increments[f'questions.{index}.correct'] = sign * int(answer.is_correct)
+
+        return increments
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+
+class InsertBatcher:
+    """
+    Write-behind buffer which coalesces concurrent single-document inserts into one unordered insert_many.
+    Documents are flushed when the buffer holds max_size documents or max_delay seconds after the first one
+    arrived, whichever happens first. Each caller waits for its own _id or its own write error
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, max_size: int, max_delay: float):
+        self._collection = collection
+        self._max_size = max_size
+        self._max_delay = max_delay
+
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def insert(self, document: dict) -> ObjectId:
+        """
+        Queue the document for insertion
+        :param document: document data, _id is set in place
+        :return: _id of the inserted document
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future))
+
+        if len(self._pending) >= self._max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_delay, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """Start writing all queued documents"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._write(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def close(self) -> None:
+        """Write all queued documents and wait until every started write is finished"""
+        self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        errors = {}
+        try:
+            await self._collection.insert_many([document for document, _ in batch], ordered=False)
+        except BulkWriteError as exc:
+            errors = {error['index']: error for error in exc.details['writeErrors']}
+        except Exception as exc:  # waiting callers must never hang, whatever went wrong
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for index, (document, future) in enumerate(batch):
+            if future.done():  # the caller was cancelled, the document is written anyway
+                continue
+
+            error = errors.get(index)
+            if error is None:
+                future.set_result(document['_id'])
+            else:
+                error_class = DuplicateKeyError if error.get('code') == DUPLICATE_KEY_ERROR_CODE else WriteError
+                future.set_exception(error_class(error.get('errmsg'), error.get('code'), error))
@@ -0,0 +1,790 @@
+"""
+In-memory storage engine with the subset of the Motor client API used by the CRUD classes.
+
+It keeps documents in dicts keyed by _id and maintains a hash index on the leading field of every
+created index, so equality and $in lookups on fields like post_id or quiz_id do not scan the collection.
+It is meant for profiling the service layer and for load tests without a MongoDB server:
+there is no persistence, sessions are accepted and ignored, every operation is atomic because
+it never awaits in the middle.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, WriteError
+from pymongo.operations import IndexModel
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+_MISSING = object()
+
+
+class MemoryClient:
+    """Stand-in for AsyncIOMotorClient, databases are created on first access"""
+
+    def __init__(self):
+        self._databases: dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> 'MemoryDatabase':
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryDatabase:
+    """Stand-in for AsyncIOMotorDatabase, collections are created on first access"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> 'MemoryCollection':
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(f'{self.name}.{name}')
+        return self._collections[name]
+
+
+class MemoryCollection:
+    """Stand-in for AsyncIOMotorCollection"""
+
+    def __init__(self, full_name: str):
+        self.full_name = full_name
+        self._documents: dict[Any, dict] = {}
+        self._indexes: dict[str, _HashIndex] = {}
+
+    # reads
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None,
+             session: Any = None) -> 'MemoryCursor':
+        return MemoryCursor(lambda: self._find(filter or {}), _projector(projection))
+
+    async def find_one(self, filter: Any = None, projection: Optional[dict] = None,
+                       session: Any = None) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {'_id': filter}
+
+        for document in self._find(filter or {}):
+            return _projector(projection)(document)
+        return None
+
+    async def count_documents(self, filter: dict, session: Any = None) -> int:
+        return sum(1 for _ in self._find(filter))
+
+    def aggregate(self, pipeline: list[dict], session: Any = None) -> 'MemoryCursor':
+        return MemoryCursor(lambda: _run_pipeline(pipeline, self._find({})), _copy)
+
+    # writes
+
+    async def insert_one(self, document: dict, session: Any = None) -> InsertOneResult:
+        self._insert(document)
+        return InsertOneResult(document['_id'], True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True,
+                          session: Any = None) -> InsertManyResult:
+        documents = list(documents)
+        bulk = _Bulk()
+        for document in documents:
+            bulk.add_insert(document)
+        self._execute(bulk.operations, ordered)
+
+        return InsertManyResult([document['_id'] for document in documents if '_id' in document], True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False,
+                         session: Any = None) -> UpdateResult:
+        return UpdateResult(self._update(filter, update, upsert=upsert), True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False,
+                          session: Any = None) -> UpdateResult:
+        return UpdateResult(self._update(filter, update, upsert=upsert, multi=True), True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False,
+                          session: Any = None) -> UpdateResult:
+        return UpdateResult(self._update(filter, replacement, upsert=upsert, replace=True), True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None,
+                                  upsert: bool = False, return_document: bool = ReturnDocument.BEFORE,
+                                  session: Any = None) -> Optional[dict]:
+        before, after = self._update_one(filter, update, upsert=upsert)
+        document = after if return_document == ReturnDocument.AFTER else before
+
+        return None if document is None else _projector(projection)(document)
+
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None,
+                                  session: Any = None) -> Optional[dict]:
+        for document in self._find(filter):
+            self._remove(document)
+            return _projector(projection)(document)
+        return None
+
+    async def delete_one(self, filter: dict, session: Any = None) -> DeleteResult:
+        return DeleteResult({'n': self._delete(filter, limit=1)}, True)
+
+    async def delete_many(self, filter: dict, session: Any = None) -> DeleteResult:
+        return DeleteResult({'n': self._delete(filter, limit=0)}, True)
+
+    async def bulk_write(self, requests: Iterable[Any], ordered: bool = True,
+                         session: Any = None) -> BulkWriteResult:
+        bulk = _Bulk()
+        for request in requests:
+            request._add_to_bulk(bulk)  # the protocol pymongo operations use to describe themselves
+
+        return BulkWriteResult(self._execute(bulk.operations, ordered), True)
+
+    async def create_indexes(self, indexes: list[IndexModel], session: Any = None) -> list[str]:
+        names = []
+        for index_model in indexes:
+            spec = index_model.document
+            name = spec['name']
+            if name not in self._indexes:
+                index = _HashIndex(name, list(spec['key'].keys()), spec.get('unique', False))
+                for document in self._documents.values():
+                    self._raise_on_duplicate(index, document)
+                    index.add(document)
+                self._indexes[name] = index
+            names.append(name)
+
+        return names
+
+    # internals
+
+    def _find(self, filter: dict) -> Iterable[dict]:
+        """Yield stored documents matching the filter, using an index to pick candidates when possible"""
+        candidates = self._candidates(filter)
+        for document in candidates:
+            if _matches(document, filter):
+                yield document
+
+    def _candidates(self, filter: dict) -> Iterable[dict]:
+        id_condition = filter.get('_id', _MISSING)
+        ids = _lookup_keys(id_condition) if id_condition is not _MISSING else None
+        if ids is not None:
+            return [self._documents[key] for key in ids if key in self._documents]
+
+        for index in self._indexes.values():
+            condition = filter.get(index.fields[0], _MISSING)
+            if condition is not _MISSING:
+                keys = _lookup_keys(condition)
+                if keys is not None:
+                    return [self._documents[document_id] for document_id in index.lookup(keys)]
+
+        return list(self._documents.values())
+
+    def _insert(self, document: dict) -> None:
+        if '_id' not in document:
+            document['_id'] = ObjectId()  # set in place, as pymongo does
+        stored = _copy(document)
+
+        if _freeze(stored['_id']) in self._documents:
+            raise self._duplicate_key_error('_id_', ['_id'], stored)
+        for index in self._indexes.values():
+            self._raise_on_duplicate(index, stored)
+
+        self._documents[_freeze(stored['_id'])] = stored
+        for index in self._indexes.values():
+            index.add(stored)
+
+    def _remove(self, document: dict) -> None:
+        del self._documents[_freeze(document['_id'])]
+        for index in self._indexes.values():
+            index.remove(document)
+
+    def _replace(self, old: dict, new: dict) -> None:
+        for index in self._indexes.values():
+            self._raise_on_duplicate(index, new, ignore_id=old['_id'])
+
+        self._remove(old)
+        self._documents[_freeze(new['_id'])] = new
+        for index in self._indexes.values():
+            index.add(new)
+
+    def _update_one(self, filter: dict, update: dict, upsert: bool = False,
+                    replace: bool = False) -> tuple[Optional[dict], Optional[dict]]:
+        """Update the first matched document or upsert a new one, return its states before and after"""
+        for document in self._find(filter):
+            updated = _apply_update(_copy(document), update, is_insert=False, replace=replace)
+            if updated != document:
+                self._replace(document, updated)
+            return document, updated
+
+        if not upsert:
+            return None, None
+
+        document = {}
+        for path, condition in filter.items():
+            if not path.startswith('$') and not _is_operator_condition(condition):
+                _set_path(document, path, _copy(condition))
+        document = _apply_update(document, update, is_insert=True, replace=replace)
+        if '_id' not in document and '_id' in filter and not _is_operator_condition(filter['_id']):
+            document['_id'] = filter['_id']
+        self._insert(document)
+
+        return None, document
+
+    def _update(self, filter: dict, update: dict, upsert: bool = False, multi: bool = False,
+                replace: bool = False) -> dict:
+        """Apply update and return the raw result in the format of the update command"""
+        if not multi:
+            before, after = self._update_one(filter, update, upsert=upsert, replace=replace)
+            if before is None and after is not None:
+                return {'n': 1, 'nModified': 0, 'upserted': after['_id']}
+            return {'n': int(before is not None), 'nModified': int(before is not None and before != after)}
+
+        matched = modified = 0
+        for document in list(self._find(filter)):
+            updated = _apply_update(_copy(document), update, is_insert=False)
+            matched += 1
+            if updated != document:
+                self._replace(document, updated)
+                modified += 1
+        if matched == 0 and upsert:
+            return self._update(filter, update, upsert=True)
+
+        return {'n': matched, 'nModified': modified}
+
+    def _delete(self, filter: dict, limit: int) -> int:
+        documents = list(self._find(filter))
+        if limit:
+            documents = documents[:limit]
+        for document in documents:
+            self._remove(document)
+
+        return len(documents)
+
+    def _execute(self, operations: list[tuple], ordered: bool) -> dict:
+        """Run write operations recorded by _Bulk, collecting per-operation errors as the server does"""
+        result = {'writeErrors': [], 'writeConcernErrors': [], 'nInserted': 0, 'nUpserted': 0,
+                  'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []}
+
+        for index, (operation, args) in enumerate(operations):
+            try:
+                if operation == 'insert':
+                    self._insert(args[0])
+                    result['nInserted'] += 1
+                elif operation == 'delete':
+                    result['nRemoved'] += self._delete(args[0], limit=args[1])
+                else:
+                    raw = self._update(*args, replace=operation == 'replace')
+                    if 'upserted' in raw:
+                        result['nUpserted'] += 1
+                        result['upserted'].append({'index': index, '_id': raw['upserted']})
+                    else:
+                        result['nMatched'] += raw['n']
+                        result['nModified'] += raw['nModified']
+            except WriteError as exc:
+                result['writeErrors'].append({'index': index, 'code': exc.code, 'errmsg': str(exc),
+                                              'op': args[0]})
+                if ordered:
+                    break
+
+        if result['writeErrors']:
+            raise BulkWriteError(result)
+        return result
+
+    def _raise_on_duplicate(self, index: '_HashIndex', document: dict, ignore_id: Any = _MISSING) -> None:
+        duplicate_id = index.find_duplicate(document)
+        if duplicate_id is not None and (ignore_id is _MISSING or _freeze(ignore_id) != duplicate_id):
+            raise self._duplicate_key_error(index.name, index.fields, document)
+
+    def _duplicate_key_error(self, index_name: str, fields: list[str], document: dict) -> DuplicateKeyError:
+        key_value = {field: _value_or_none(_get_path(document, field)) for field in fields}
+        message = f'E11000 duplicate key error collection: {self.full_name} index: {index_name} dup key: {key_value}'
+
+        return DuplicateKeyError(message, DUPLICATE_KEY_ERROR_CODE,
+                                 {'code': DUPLICATE_KEY_ERROR_CODE, 'errmsg': message, 'keyValue': key_value})
+
+
+class MemoryCursor:
+    """Stand-in for AsyncIOMotorCursor and AsyncIOMotorCommandCursor, documents are produced on first read"""
+
+    def __init__(self, source: Callable[[], Iterable[dict]], projector: Callable[[dict], dict]):
+        self._source = source
+        self._projector = projector
+        self._sort: list[tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._batch_size = 0
+
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> 'MemoryCursor':
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or 1)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, skip: int) -> 'MemoryCursor':
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> 'MemoryCursor':
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> 'MemoryCursor':
+        self._batch_size = batch_size
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> list[dict]:
+        documents = self._documents()
+        if length is not None:
+            documents = documents[:length]
+        return documents
+
+    def __aiter__(self) -> AsyncIterator[dict]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[dict]:
+        for position, document in enumerate(self._documents(), start=1):
+            yield document
+            if self._batch_size and position % self._batch_size == 0:
+                await asyncio.sleep(0)  # let other tasks run between batches, as a round trip would
+
+    def _documents(self) -> list[dict]:
+        documents = list(self._source())
+        if self._sort:
+            documents = _sort_documents(documents, self._sort)
+        if self._skip:
+            documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:abs(self._limit)]
+
+        return [self._projector(document) for document in documents]
+
+
+class _HashIndex:
+    """
+    Secondary index as a hash map from the value of the leading field to _id of documents,
+    unique indexes also map the whole key to _id to detect duplicates
+    """
+
+    def __init__(self, name: str, fields: list[str], unique: bool):
+        self.name = name
+        self.fields = fields
+        self.unique = unique
+        self._buckets: dict[Any, dict[Any, None]] = {}  # dict as an insertion ordered set
+        self._keys: dict[tuple, Any] = {}
+
+    def add(self, document: dict) -> None:
+        document_id = _freeze(document['_id'])
+        for value in self._leading_values(document):
+            self._buckets.setdefault(value, {})[document_id] = None
+        if self.unique:
+            self._keys[self._key(document)] = document_id
+
+    def remove(self, document: dict) -> None:
+        document_id = _freeze(document['_id'])
+        for value in self._leading_values(document):
+            bucket = self._buckets.get(value)
+            if bucket is not None:
+                bucket.pop(document_id, None)
+                if not bucket:
+                    del self._buckets[value]
+        if self.unique and self._keys.get(self._key(document)) == document_id:
+            del self._keys[self._key(document)]
+
+    def find_duplicate(self, document: dict) -> Optional[Any]:
+        if not self.unique:
+            return None
+        return self._keys.get(self._key(document))
+
+    def lookup(self, values: list) -> list:
+        document_ids = {}
+        for value in values:
+            document_ids.update(self._buckets.get(value, {}))
+        return list(document_ids)
+
+    def _key(self, document: dict) -> tuple:
+        return tuple(_freeze(_value_or_none(_get_path(document, field))) for field in self.fields)
+
+    def _leading_values(self, document: dict) -> set:
+        value = _value_or_none(_get_path(document, self.fields[0]))
+        if isinstance(value, list):  # multikey: an array is found by any of its elements and by itself
+            return {_freeze(item) for item in value} | {_freeze(value)}
+        return {_freeze(value)}
+
+
+class _Bulk:
+    """Records operations described by pymongo InsertOne, UpdateOne, ReplaceOne, DeleteOne etc."""
+
+    def __init__(self):
+        self.operations: list[tuple[str, tuple]] = []
+
+    def add_insert(self, document: dict) -> None:
+        self.operations.append(('insert', (document,)))
+
+    def add_update(self, selector: dict, update: dict, multi: bool = False, upsert: bool = False, **kwargs) -> None:
+        self.operations.append(('update', (selector, update, upsert, multi)))
+
+    def add_replace(self, selector: dict, replacement: dict, upsert: bool = False, **kwargs) -> None:
+        self.operations.append(('replace', (selector, replacement, upsert)))
+
+    def add_delete(self, selector: dict, limit: int, **kwargs) -> None:
+        self.operations.append(('delete', (selector, limit)))
+
+
+# documents
+
+
+def _copy(value: Any) -> Any:
+    """Copy containers of the document, so callers never share state with the storage"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _freeze(value: Any) -> Any:
+    """Make a hashable equivalent of the value to use it as a dict key"""
+    if isinstance(value, dict):
+        return 'dict', tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return 'list', tuple(_freeze(item) for item in value)
+    return value
+
+
+def _value_or_none(value: Any) -> Any:
+    return None if value is _MISSING else value
+
+
+def _get_path(document: Any, path: str) -> Any:
+    """Get value by dotted path, a path through an array collects values of its elements"""
+    value = document
+    for part in path.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        elif isinstance(value, list):
+            if part.isdigit():
+                index = int(part)
+                value = value[index] if index < len(value) else _MISSING
+            else:
+                values = [_get_path(item, part) for item in value]
+                value = [item for item in values if item is not _MISSING] or _MISSING
+        else:
+            return _MISSING
+
+        if value is _MISSING:
+            return _MISSING
+
+    return value
+
+
+def _set_path(document: dict, path: str, value: Any) -> None:
+    *parents, name = path.split('.')
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[name] = value
+
+
+def _unset_path(document: dict, path: str) -> None:
+    *parents, name = path.split('.')
+    for part in parents:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(name, None)
+
+
+def _apply_update(document: dict, update: dict, is_insert: bool, replace: bool = False) -> dict:
+    """Apply update operators (or a replacement document) to the document copy and return it"""
+    if replace or not any(key.startswith('$') for key in update):
+        replacement = _copy(update)
+        if '_id' in document:
+            replacement['_id'] = document['_id']
+        return replacement
+
+    for operator, fields in update.items():
+        if operator == '$setOnInsert' and not is_insert:
+            continue
+        for path, value in fields.items():
+            if operator in ('$set', '$setOnInsert'):
+                _set_path(document, path, _copy(value))
+            elif operator == '$inc':
+                current = _value_or_none(_get_path(document, path))
+                _set_path(document, path, (current or 0) + value)
+            elif operator == '$unset':
+                _unset_path(document, path)
+            else:
+                raise WriteError(f"Unknown modifier: {operator}", 9)
+
+    return document
+
+
+def _projector(projection: Optional[dict]) -> Callable[[dict], dict]:
+    """Compile projection into a function which copies the projected part of a document"""
+    if not projection:
+        return _copy
+
+    include_id = bool(projection.get('_id', 1))
+    fields = {path: bool(flag) for path, flag in projection.items() if path != '_id'}
+
+    if not fields or not any(fields.values()):
+        excluded = list(fields) if include_id else list(fields) + ['_id']
+
+        def exclude(document: dict) -> dict:
+            document = _copy(document)
+            for path in excluded:
+                _unset_path(document, path)
+            return document
+
+        return exclude
+
+    tree = {}
+    for path in fields:
+        node = tree
+        *parents, name = path.split('.')
+        for part in parents:
+            node = node.setdefault(part, {})
+            if node is True:
+                break
+        else:
+            node[name] = True
+    if include_id:
+        tree['_id'] = True
+
+    return lambda document: _include(document, tree)
+
+
+def _include(value: Any, tree: Any) -> Any:
+    if tree is True:
+        return _copy(value)
+    if isinstance(value, list):
+        included = [_include(item, tree) for item in value if isinstance(item, (dict, list))]
+        return [item for item in included if item is not _MISSING]
+    if isinstance(value, dict):
+        included = {key: _include(value[key], node) for key, node in tree.items() if key in value}
+        return {key: item for key, item in included.items() if item is not _MISSING}
+    return _MISSING
+
+
+# queries
+
+
+def _is_operator_condition(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith('$') for key in condition)
+
+
+def _lookup_keys(condition: Any) -> Optional[list]:
+    """Frozen values to look the condition up in a hash index, None when it can not use one"""
+    if not _is_operator_condition(condition):
+        return [_freeze(condition)]
+    if set(condition) == {'$eq'}:
+        return [_freeze(condition['$eq'])]
+    if set(condition) == {'$in'}:
+        return [_freeze(value) for value in condition['$in']]
+    return None
+
+
+def _matches(document: dict, filter: dict) -> bool:
+    for key, condition in filter.items():
+        if key == '$and':
+            if not all(_matches(document, item) for item in condition):
+                return False
+        elif key == '$or':
+            if not any(_matches(document, item) for item in condition):
+                return False
+        elif key == '$nor':
+            if any(_matches(document, item) for item in condition):
+                return False
+        elif not _matches_condition(_get_path(document, key), condition):
+            return False
+
+    return True
+
+
+def _matches_condition(value: Any, condition: Any) -> bool:
+    if not _is_operator_condition(condition):
+        return _equals(value, condition)
+
+    for operator, argument in condition.items():
+        if operator not in _QUERY_OPERATORS:
+            raise OperationFailure(f'unknown operator: {operator}', 2)
+        if not _QUERY_OPERATORS[operator](value, argument):
+            return False
+
+    return True
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    if value is _MISSING:
+        return expected is None
+    if value == expected:
+        return True
+    return isinstance(value, list) and expected in value
+
+
+def _compare(value: Any, argument: Any, compare: Callable[[Any, Any], bool]) -> bool:
+    if value is _MISSING:
+        return False
+    for item in (value if isinstance(value, list) else [value]):
+        try:
+            if compare(item, argument):
+                return True
+        except TypeError:  # values of different types never match a range condition
+            pass
+    return False
+
+
+_QUERY_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    '$eq': _equals,
+    '$ne': lambda value, argument: not _equals(value, argument),
+    '$in': lambda value, argument: any(_equals(value, item) for item in argument),
+    '$nin': lambda value, argument: not any(_equals(value, item) for item in argument),
+    '$gt': lambda value, argument: _compare(value, argument, lambda a, b: a > b),
+    '$gte': lambda value, argument: _compare(value, argument, lambda a, b: a >= b),
+    '$lt': lambda value, argument: _compare(value, argument, lambda a, b: a < b),
+    '$lte': lambda value, argument: _compare(value, argument, lambda a, b: a <= b),
+    '$exists': lambda value, argument: (value is not _MISSING) == bool(argument),
+}
+
+_TYPE_ORDER = ((type(None), 0), (bool, 8), ((int, float), 1), (str, 2), (dict, 3), (list, 4),
+               (ObjectId, 7), (datetime, 9))
+
+
+def _sort_key(value: Any) -> tuple:
+    """Order values of different types the way MongoDB does, values of one type by their natural order"""
+    value = _value_or_none(value)
+    for types, rank in _TYPE_ORDER:
+        if isinstance(value, types):
+            if isinstance(value, (dict, list)):
+                return rank, repr(value)
+            return rank, value
+    return 5, repr(value)
+
+
+def _sort_documents(documents: list[dict], sort: list[tuple[str, int]]) -> list[dict]:
+    for path, direction in reversed(sort):  # stable sorts from the least significant key
+        documents = sorted(documents, key=lambda document: _sort_key(_get_path(document, path)),
+                           reverse=direction < 0)
+    return documents
+
+
+# aggregation
+
+
+def _run_pipeline(pipeline: list[dict], documents: Iterable[dict]) -> list[dict]:
+    documents = list(documents)
+    for stage in pipeline:
+        [(name, argument)] = stage.items()
+        if name not in _STAGES:
+            raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'", 40324)
+        documents = _STAGES[name](argument, documents)
+
+    return documents
+
+
+def _stage_unwind(argument: Any, documents: list[dict]) -> list[dict]:
+    if isinstance(argument, str):
+        argument = {'path': argument}
+    path = argument['path'][1:]
+    index_field = argument.get('includeArrayIndex')
+    preserve_empty = argument.get('preserveNullAndEmptyArrays', False)
+
+    unwound = []
+    for document in documents:
+        value = _get_path(document, path)
+        if not isinstance(value, list):
+            value = [] if value is _MISSING or value is None else [value]
+        if not value and preserve_empty:
+            unwound.append(dict(document, **({index_field: None} if index_field else {})))
+        for index, item in enumerate(value):
+            output = _copy(document) if '.' in path else dict(document)
+            _set_path(output, path, item)
+            if index_field:
+                output[index_field] = index
+            unwound.append(output)
+
+    return unwound
+
+
+def _stage_group(argument: dict, documents: list[dict]) -> list[dict]:
+    groups: dict[Any, dict] = {}
+    accumulated: dict[Any, dict[str, list]] = {}
+    for document in documents:
+        group_id = _evaluate(argument['_id'], document)
+        key = _freeze(group_id)
+        if key not in groups:
+            groups[key] = {'_id': group_id}
+            accumulated[key] = {field: [] for field in argument if field != '_id'}
+        for field, accumulator in argument.items():
+            if field != '_id':
+                [(operator, expression)] = accumulator.items()
+                accumulated[key][field].append(_evaluate(expression, document))
+
+    for key, group in groups.items():
+        for field, accumulator in argument.items():
+            if field != '_id':
+                [operator] = accumulator
+                if operator not in _ACCUMULATORS:
+                    raise OperationFailure(f"unknown group operator '{operator}'", 15952)
+                group[field] = _ACCUMULATORS[operator](accumulated[key][field])
+
+    return list(groups.values())
+
+
+def _numbers(values: list) -> list:
+    return [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+
+
+_ACCUMULATORS: dict[str, Callable[[list], Any]] = {
+    '$sum': lambda values: sum(_numbers(values)),
+    '$avg': lambda values: sum(_numbers(values)) / len(_numbers(values)) if _numbers(values) else None,
+    '$min': lambda values: min((value for value in values if value is not None), key=_sort_key, default=None),
+    '$max': lambda values: max((value for value in values if value is not None), key=_sort_key, default=None),
+    '$first': lambda values: values[0] if values else None,
+    '$last': lambda values: values[-1] if values else None,
+    '$push': list,
+}
+
+
+def _evaluate(expression: Any, document: dict) -> Any:
+    """Evaluate aggregation expression: field paths, literals and a few operators"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        return _value_or_none(_get_path(document, expression[1:]))
+    if isinstance(expression, list):
+        return [_evaluate(item, document) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+
+    if len(expression) == 1 and next(iter(expression)).startswith('$'):
+        [(operator, argument)] = expression.items()
+        if operator == '$cond':
+            if isinstance(argument, dict):
+                argument = [argument['if'], argument['then'], argument['else']]
+            condition, then, otherwise = argument
+            return _evaluate(then if _truthy(_evaluate(condition, document)) else otherwise, document)
+        if operator == '$eq':
+            first, second = _evaluate(argument, document)
+            return first == second
+        if operator == '$add':
+            return sum(_evaluate(argument, document))
+        if operator == '$ifNull':
+            value, default = _evaluate(argument, document)
+            return default if value is None else value
+        raise OperationFailure(f"Unrecognized expression '{operator}'", 168)
+
+    return {key: _evaluate(value, document) for key, value in expression.items()}
+
+
+def _truthy(value: Any) -> bool:
+    return value is not None and value is not False and value != 0
+
+
+_STAGES: dict[str, Callable[[Any, list[dict]], list[dict]]] = {
+    '$match': lambda argument, documents: [document for document in documents if _matches(document, argument)],
+    '$project': lambda argument, documents: [_projector(argument)(document) for document in documents],
+    '$sort': lambda argument, documents: _sort_documents(documents, list(argument.items())),
+    '$skip': lambda argument, documents: documents[argument:],
+    '$limit': lambda argument, documents: documents[:argument],
+    '$count': lambda argument, documents: [{argument: len(documents)}] if documents else [],
+    '$unwind': _stage_unwind,
+    '$group': _stage_group,
+    '$facet': lambda argument, documents: [
+        {name: _run_pipeline(pipeline, documents) for name, pipeline in argument.items()}
+    ],
+}
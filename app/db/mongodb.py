@@ -1,12 +1,23 @@
-from typing import Callable
+from typing import Optional, Union
 
-from starlette.requests import Request
+from motor import motor_asyncio
 
+from core.config import MONGO_BACKEND, MONGODB_URL, MAX_CONNECTIONS_COUNT, MIN_CONNECTIONS_COUNT
+from db.memory import MemoryClient
 
-def get_client(model_class) -> Callable:
-    """Get mongoDB client from the request object ind initialize model class with it"""
 
-    def wrapper(request: Request) -> object:
-        return model_class(request.app.state.mongodb)
+def create_client(event_listeners: Optional[list] = None) -> Union[motor_asyncio.AsyncIOMotorClient,
+                                                                   MemoryClient]:
+    """
+    Create a client of the storage backend chosen by MONGO_BACKEND
+    :param event_listeners: pymongo monitoring listeners, the in-memory backend runs no commands to report
+    :return: motor client or in-memory client with the same interface
+    """
+    if MONGO_BACKEND == 'memory':
+        return MemoryClient()
+    if MONGO_BACKEND != 'mongodb':
+        raise ValueError(f'Unknown MONGO_BACKEND "{MONGO_BACKEND}", should be "mongodb" or "memory"')
 
-    return wrapper
+    return motor_asyncio.AsyncIOMotorClient(MONGODB_URL, maxPoolSize=MAX_CONNECTIONS_COUNT,
+                                            minPoolSize=MIN_CONNECTIONS_COUNT,
+                                            event_listeners=event_listeners or [])
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional
+
+from bson import SON
+from pymongo import monitoring
+
+from core.metrics import Metrics
+
+SLOW_QUERY_LOGGER_NAME = 'quizzes.slow_queries'
+
+# where each command keeps its filter, the shape of which is logged
+_FILTER_FIELDS = {
+    'find': 'filter',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+    'aggregate': 'pipeline',
+}
+_STATEMENT_FIELDS = {'update': ('updates', 'q'), 'delete': ('deletes', 'q')}
+_EXPLAINABLE_COMMANDS = {*_FILTER_FIELDS, *_STATEMENT_FIELDS}
+# session and transaction fields are not accepted inside explain
+_NOT_EXPLAINED_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'writeConcern', 'readConcern'}
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Records duration of every MongoDB command the client runs"""
+
+    def __init__(self, metrics: Metrics):
+        self._metrics = metrics
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._metrics.mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._metrics.mongo_command_duration.observe(event.duration_micros / 1e6, event.command_name)
+        self._metrics.mongo_command_failures.inc(event.command_name)
+
+
+class PoolCheckoutTimer(monitoring.ConnectionPoolListener):
+    """
+    Records how long operations wait for a pooled connection.
+    Check out start and its result are reported in the same thread, so the start time is kept per thread
+    """
+
+    def __init__(self, metrics: Metrics):
+        self._metrics = metrics
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event: monitoring.ConnectionCheckOutStartedEvent) -> None:
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        self._observe_wait()
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        self._observe_wait()
+        self._metrics.pool_checkout_failures.inc(event.reason)
+
+    def _observe_wait(self) -> None:
+        started = getattr(self._local, 'started', None)
+        if started is not None:
+            self._metrics.pool_checkout_wait.observe(time.perf_counter() - started)
+            self._local.started = None
+
+    def pool_created(self, event: monitoring.PoolCreatedEvent) -> None:
+        pass
+
+    def pool_cleared(self, event: monitoring.PoolClearedEvent) -> None:
+        pass
+
+    def pool_closed(self, event: monitoring.PoolClosedEvent) -> None:
+        pass
+
+    def connection_created(self, event: monitoring.ConnectionCreatedEvent) -> None:
+        pass
+
+    def connection_ready(self, event: monitoring.ConnectionReadyEvent) -> None:
+        pass
+
+    def connection_closed(self, event: monitoring.ConnectionClosedEvent) -> None:
+        pass
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        pass
+
+
+def redact(value: Any) -> Any:
+    """
+    Replace values in a filter or pipeline with "?", keeping field names, operators and field paths,
+    so filters which differ only in values have one shape
+    :param value: filter, pipeline or their part
+    :return: shape of the value
+    """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if any(isinstance(item, (dict, list)) for item in value):
+            return [redact(item) for item in value]
+        return '?'
+    if isinstance(value, str) and value.startswith('$'):
+        return value
+    return '?'
+
+
+def get_query_shape(command_name: str, command: dict) -> Optional[Any]:
+    """
+    Get redacted filter (or pipeline) of the command
+    :param command_name: name of the command, like find or aggregate
+    :param command: command document
+    :return: filter shape or None for commands without a filter
+    """
+    if command_name in _FILTER_FIELDS:
+        shape = redact(command.get(_FILTER_FIELDS[command_name], {}))
+        if command_name == 'find' and command.get('sort'):
+            return {'filter': shape, 'sort': dict(command['sort'])}
+        return shape
+    if command_name in _STATEMENT_FIELDS:
+        statements_field, filter_field = _STATEMENT_FIELDS[command_name]
+        return [redact(statement.get(filter_field, {})) for statement in command.get(statements_field, [])]
+
+    return None
+
+
+def get_plan_stages(explain: Any, in_winning_plan: bool = False) -> list[str]:
+    """
+    Collect stages of the winning plans in an explain output, aggregate explains nest them in pipeline stages
+    :param explain: explain command reply or its part
+    :param in_winning_plan: whether the part belongs to a winning plan
+    :return: list of stage names, like IXSCAN or COLLSCAN
+    """
+    stages = []
+    if isinstance(explain, dict):
+        for key, value in explain.items():
+            if key == 'stage' and in_winning_plan and isinstance(value, str):
+                stages.append(value)
+            elif key != 'rejectedPlans':
+                stages.extend(get_plan_stages(value, in_winning_plan or key == 'winningPlan'))
+    elif isinstance(explain, list):
+        for item in explain:
+            stages.extend(get_plan_stages(item, in_winning_plan))
+
+    return stages
+
+
+def create_slow_query_logger(path: str) -> logging.Logger:
+    """
+    Configure the logger of slow commands to write JSON lines to the file,
+    falling back to stderr when the log directory is not writable
+    :param path: log file path
+    :return: Logger instance
+    """
+    logger = logging.getLogger(SLOW_QUERY_LOGGER_NAME)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if logger.handlers:
+        return logger
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.FileHandler(path, delay=True)
+    except OSError:
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+
+    return logger
+
+
+class SlowCommandRecorder(monitoring.CommandListener):
+    """
+    Logs every command which takes longer than the threshold with its collection and redacted filter.
+    With explain enabled, the first slow command of each distinct shape is explained on the event loop
+    (listeners must not run commands themselves) and plans with a collection scan are flagged
+    """
+
+    def __init__(self, threshold: float, logger: logging.Logger, explain: bool = False):
+        self._threshold_micros = threshold * 1e6
+        self._logger = logger
+        self._explain = explain
+        self._started: dict[tuple, tuple[str, dict]] = {}
+        self._explained_shapes: set[str] = set()
+        self._explains: set[asyncio.Task] = set()
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, client: Any) -> None:
+        """
+        Give the recorder the client to run explain with, should be called from the event loop
+        :param client: AsyncIOMotorClient the recorder listens to
+        """
+        self._client = client
+        self._loop = asyncio.get_running_loop()
+
+    def close(self) -> None:
+        """Stop explaining new shapes and cancel explains which are still running"""
+        self._loop = None
+        for task in list(self._explains):
+            task.cancel()
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        self._started[(event.request_id, event.connection_id)] = (event.database_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finished(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finished(event, failed=True)
+
+    def _finished(self, event: Any, failed: bool) -> None:
+        database_name, command = self._started.pop((event.request_id, event.connection_id), (None, None))
+        if command is None or event.duration_micros < self._threshold_micros or event.command_name == 'explain':
+            return
+
+        collection = command.get('collection' if event.command_name == 'getMore' else event.command_name)
+        record = {
+            'event': 'slow_command',
+            'command': event.command_name,
+            'database': database_name,
+            'collection': collection if isinstance(collection, str) else None,
+            'shape': get_query_shape(event.command_name, command),
+            'duration_ms': round(event.duration_micros / 1000, 3),
+            'failed': failed,
+        }
+        self._logger.warning(json.dumps(record, default=str))
+
+        if self._explain and self._loop is not None and event.command_name in _EXPLAINABLE_COMMANDS:
+            self._loop.call_soon_threadsafe(self._start_explain, record, database_name, command)
+
+    def _start_explain(self, record: dict, database_name: str, command: dict) -> None:
+        shape_key = json.dumps([record['command'], record['database'], record['collection'], record['shape']],
+                               default=str, sort_keys=True)
+        if shape_key in self._explained_shapes:
+            return
+        self._explained_shapes.add(shape_key)
+
+        task = asyncio.ensure_future(self._run_explain(record, database_name, command))
+        self._explains.add(task)
+        task.add_done_callback(self._explains.discard)
+
+    async def _run_explain(self, record: dict, database_name: str, command: dict) -> None:
+        explained = SON((key, value) for key, value in command.items()
+                        if not key.startswith('$') and key not in _NOT_EXPLAINED_FIELDS)
+        for statements_field, _ in _STATEMENT_FIELDS.values():
+            if statements_field in explained:
+                explained[statements_field] = explained[statements_field][:1]  # explain takes one statement
+
+        explain_record = {key: record[key] for key in ('command', 'database', 'collection', 'shape')}
+        try:
+            explain = SON([('explain', explained), ('verbosity', 'queryPlanner')])
+            reply = await self._client[database_name].command(explain)
+        except Exception as exc:  # explain is a diagnostic, it must never break anything
+            self._logger.info(json.dumps({'event': 'explain_failed', **explain_record, 'error': str(exc)},
+                                         default=str))
+            return
+
+        stages = get_plan_stages(reply)
+        collection_scan = 'COLLSCAN' in stages
+        explain_record = {'event': 'explain', **explain_record, 'stages': stages, 'collscan': collection_scan}
+        self._logger.log(logging.WARNING if collection_scan else logging.INFO, json.dumps(explain_record, default=str))
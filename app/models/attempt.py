@@ -1,7 +1,9 @@
+from typing import Optional
+
 from bson import ObjectId
 from pydantic import BaseModel, UUID4
 
-from models.attempt_answer import BaseAttemptAnswer, AttemptAnswerInDB
+from models.attempt_answer import AttemptAnswerCorrectness, BaseAttemptAnswer, AttemptAnswerInDB
 from models.db import PyObjectId, DBModelMixin
 
 
@@ -28,3 +30,40 @@ class AttemptInDB(BaseAttempt, DBModelMixin):
 
 class AttemptInResponse(AttemptInDB):
     pass
+
+
+class AttemptSummary(DBModelMixin):
+    """Attempt without answers, all its fields are in the user history index"""
+    user: UUID4
+    quiz_id: PyObjectId
+    total_score: int
+
+    class Config:
+        json_encoders = {
+            ObjectId: str
+        }
+
+
+class AttemptScore(DBModelMixin):
+    user: UUID4
+    total_score: int
+
+
+class AttemptInResponsePartial(AttemptSummary):
+    pass
+
+
+class AttemptInExport(DBModelMixin):
+    user: UUID4
+    total_score: int
+    answers: list[AttemptAnswerCorrectness]
+
+
+class AttemptBatchItemResult(BaseModel):
+    attempt: Optional[AttemptInResponse]
+    error: Optional[str]
+
+    class Config:
+        json_encoders = {
+            ObjectId: str
+        }
@@ -9,3 +9,7 @@ class BaseAttemptAnswer(BaseModel):
 
 class AttemptAnswerInDB(BaseAttemptAnswer):
     is_correct: bool
+
+
+class AttemptAnswerCorrectness(BaseModel):
+    is_correct: bool
@@ -0,0 +1,56 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from typing import Generic, Optional, TypeVar
+
+from bson import ObjectId
+from pydantic.generics import GenericModel
+
+ItemT = TypeVar('ItemT')
+
+
+class PageCursor(ObjectId):
+    """Opaque keyset cursor, which wraps _id of the last document of the previous page"""
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v):
+        if not isinstance(v, str):
+            raise TypeError('Cursor should be a string')
+        try:
+            binary = urlsafe_b64decode(v + '=' * (-len(v) % 4))
+        except (BinasciiError, ValueError):
+            raise ValueError('Invalid cursor')
+        if len(binary) != 12:  # ObjectId raises TypeError for bytes of another length
+            raise ValueError('Invalid cursor')
+
+        return ObjectId(binary)
+
+    @classmethod
+    def __modify_schema__(cls, field_schema):
+        field_schema.update(type='string')
+
+    @staticmethod
+    def encode(document_id: Optional[ObjectId]) -> Optional[str]:
+        """
+        Make an opaque cursor string from the document _id
+        :param document_id: ObjectId of the last document on the page or None
+        :return: cursor string or None, if there are no more pages
+        """
+        if document_id is None:
+            return None
+
+        return urlsafe_b64encode(document_id.binary).decode().rstrip('=')
+
+
+class Page(GenericModel, Generic[ItemT]):
+    items: list[ItemT]
+    next_cursor: Optional[str]
+
+    class Config:
+        arbitrary_types_allowed = True
+        json_encoders = {
+            ObjectId: str
+        }
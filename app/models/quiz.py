@@ -1,7 +1,10 @@
-from pydantic import BaseModel, validator
+from typing import Any, Optional
 
+from pydantic import BaseModel, PrivateAttr
+
+from core.config import POST_IDS_MAX
 from models.quiz_question import QuestionPartial, QuestionInCreate, QuestionFull, BaseQuestion
-from models.db import DBModelMixin
+from models.db import DBModelMixin, PyObjectId
 
 
 class BaseQuiz(BaseModel):
@@ -12,47 +15,58 @@ class BaseQuiz(BaseModel):
 
 
 class QuizInCreate(BaseQuiz):
-    questions: list[QuestionInCreate]
-
-    @validator('questions')
-    def validate_questions(cls, questions: list[QuestionInCreate]) -> list[QuestionInCreate]:
-        """
-        To validate questions properly, and with alignment to OCP, we have several
-        classes (syb-classes of QuestionInCreate class) which describe specific
-        validation of the "options" and "answer" fields depending on the "type" of the question.
-        Because of that we should have some check on which question type user wants to create and to give
-        it an appropriate validation. I decided to make a mapper, that will generate automatically,
-        no matter how many new question types we will have in the future. It generates from __subclasses__ of the
-        QuestionInCreate class, which is a base class for all question types and takes _question_type attribute of each
-        class to match it with question type, that user filled in.
-        :param questions: list of QuestionInCreate instances
-        :return: list of QuestionInCreate sub classes instances
-        """
-        mapper = {model_class._question_type: model_class for model_class in QuestionInCreate.__subclasses__()}
-
-        validated_questions = []
-        for question in questions:
-            try:
-                model = mapper[question.type]
-                validated_questions.append(model(**question.dict()))
-            except KeyError:
-                keys_list = ', '.join(mapper.keys())
-                raise ValueError(f'Question type {question.type} is not in list: [{keys_list}]')
-
-        return validated_questions
+    questions: list[QuestionInCreate]  # validated by type, see QuestionInCreate.validate_by_type
 
 
 class QuizInDB(BaseQuiz, DBModelMixin):
     questions: list[QuestionFull]
+    version: int = 0  # bumped by every update, quizzes stored before versioning have none
+
+    _answer_key: Any = PrivateAttr(default=None)  # compiled answers, see services.scoring.AnswerKey
 
 
 class QuizPartial(BaseQuiz, DBModelMixin):
     questions: list[QuestionPartial]
 
 
+class QuizPartialInDB(QuizPartial):
+    version: int = 0  # keeps versioned responses working for the projection, see QuizInDB.version
+
+
 class QuizInResponsePartial(QuizPartial):
     pass
 
 
-class QuizInResponseFull(QuizInDB):
-    pass
+class QuizInResponseFull(BaseQuiz, DBModelMixin):
+    questions: list[QuestionFull]
+
+
+class PostIdList(str):
+    """Comma separated post ids in a query parameter, like "1,2,3", validated into a list of unique ints"""
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, v):
+        if not isinstance(v, str):
+            raise TypeError('Post ids should be a string')
+        try:
+            post_ids = list(dict.fromkeys(int(post_id) for post_id in v.split(',')))
+        except ValueError:
+            raise ValueError('Post ids should be comma separated integers')
+        if len(post_ids) > POST_IDS_MAX:
+            raise ValueError(f'There should be at most {POST_IDS_MAX} post ids')
+
+        return post_ids
+
+
+class QuizzesByPostId(BaseModel):
+    items: dict[int, Optional[QuizInResponsePartial]]  # None for post ids without a quiz
+
+
+class QuizImportResult(BaseModel):
+    line: int  # 1-based line number in the uploaded NDJSON
+    quiz_id: Optional[PyObjectId] = None
+    error: Optional[str] = None
@@ -0,0 +1,11 @@
+from models.db import DBModelMixin
+
+
+class QuizDeletion(DBModelMixin):
+    """Progress of the background removal of quiz attempts, _id is the removed quiz _id"""
+    deleted_attempts: int = 0
+    finished: bool = False
+
+
+class QuizDeletionInResponse(QuizDeletion):
+    pass
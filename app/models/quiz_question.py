@@ -1,7 +1,10 @@
-from typing import Optional, Union
+from typing import Optional, Type, Union
 
 from pydantic import BaseModel, HttpUrl, validator
 
+# question type -> QuestionInCreate sub-class, filled in by QuestionInCreate.__init_subclass__
+QUESTION_TYPES: dict[str, Type['QuestionInCreate']] = {}
+
 
 class BaseQuestion(BaseModel):
     description: str
@@ -23,6 +26,49 @@ class QuestionInCreate(BaseQuestion):
 
     answer: Union[int, str, list[int]]
 
+    def __init_subclass__(cls, **kwargs):
+        """
+        To validate questions properly, and with alignment to OCP, we have several
+        classes (sub-classes of QuestionInCreate class) which describe specific
+        validation of the "options" and "answer" fields depending on the "type" of the question.
+        Every sub-class registers itself in QUESTION_TYPES by its _question_type once, when it is defined,
+        so no matter how many new question types we will have in the future, the mapper is always complete
+        and is not rebuilt for every validated quiz.
+        """
+        super().__init_subclass__(**kwargs)
+        question_type = cls.__dict__.get('_question_type')
+        if question_type is not None:
+            QUESTION_TYPES[question_type] = cls
+
+    @classmethod
+    def __get_validators__(cls):
+        yield cls.validate_by_type
+
+    @classmethod
+    def validate_by_type(cls, value):
+        """
+        Validate the question as the class which matches its "type" in a single pass,
+        instead of validating it as QuestionInCreate first and re-creating it after
+        :param value: raw question data
+        :return: instance of the QuestionInCreate sub-class
+        """
+        if cls is not QuestionInCreate or isinstance(value, QuestionInCreate):
+            return cls.validate(value)
+
+        question_type = value.get('type') if isinstance(value, dict) else None
+        if not isinstance(question_type, str):
+            # let the base model report missing or malformed fields the usual way
+            question = cls.validate(value)
+            question_type, value = question.type, question.dict()
+
+        try:
+            model = QUESTION_TYPES[question_type]
+        except KeyError:
+            keys_list = ', '.join(QUESTION_TYPES.keys())
+            raise ValueError(f'Question type {question_type} is not in list: [{keys_list}]')
+
+        return model(**value)
+
 
 class TextQuestionInCreate(QuestionInCreate):
     _question_type = 'text'
@@ -0,0 +1,62 @@
+from typing import Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, UUID4
+
+from models.db import DBModelMixin, PyObjectId
+
+
+class QuestionCounters(BaseModel):
+    answered: int = 0
+    correct: int = 0
+
+
+class QuizStatsCounters(DBModelMixin):
+    """Incrementally maintained counters of the quiz attempts, _id is the quiz _id"""
+    attempts: int = 0
+    score_sum: int = 0
+    histogram: dict[int, int] = {}
+    questions: dict[int, QuestionCounters] = {}
+
+
+class ScoreBucket(BaseModel):
+    score: int
+    count: int
+
+
+class QuestionStats(BaseModel):
+    index: int
+    answered: int
+    correct_ratio: float
+
+
+class QuizStats(BaseModel):
+    quiz_id: PyObjectId
+    attempts: int
+    mean_score: Optional[float]
+    median_score: Optional[float]
+    histogram: list[ScoreBucket]
+    questions: list[QuestionStats]
+
+    class Config:
+        arbitrary_types_allowed = True
+        json_encoders = {
+            ObjectId: str
+        }
+
+
+class LeaderboardPosition(BaseModel):
+    rank: int
+    user: UUID4
+    total_score: int
+    attempt_id: PyObjectId
+
+
+class QuizLeaderboard(BaseModel):
+    quiz_id: PyObjectId
+    positions: list[LeaderboardPosition]
+
+    class Config:
+        json_encoders = {
+            ObjectId: str
+        }
@@ -1,16 +1,30 @@
+from collections import defaultdict
+from typing import AsyncIterator, Optional, Type
+from uuid import UUID
+
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from crud.attempt import AttemptCRUD
 from crud.quiz import QuizCRUD
-from models.attempt import AttemptInDB, AttemptInCreate
+from crud.quiz_stats import QuizStatsCRUD
+from db.batcher import InsertBatcher
+from models.attempt import AttemptInDB, AttemptInCreate, AttemptInExport, AttemptSummary
+from models.quiz import QuizInDB
+from services.leaderboard import LeaderboardCache, LeaderboardEntry
+from services.quiz_cache import QuizCache
+from services.scoring import AnswerKey
 
 
 class AttemptService:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, quiz_cache: QuizCache, leaderboards: LeaderboardCache,
+                 attempt_batcher: Optional[InsertBatcher] = None):
         self._client = client
+        self._quiz_cache = quiz_cache
+        self._leaderboards = leaderboards
         self._quiz_crud = QuizCRUD(client)
-        self._attempt_crud = AttemptCRUD(client)
+        self._attempt_crud = AttemptCRUD(client, attempt_batcher)
+        self._stats_crud = QuizStatsCRUD(client)
 
     async def get_by_id(self, attempt_id: str) -> AttemptInDB:
         """
@@ -18,15 +32,87 @@ class AttemptService:
         :param attempt_id: should be valid ObjectId string
         :return: AttemptInDB instance filled with attempt data
         """
-        return await self._attempt_crud.get(id=ObjectId(attempt_id))
+        return await self._attempt_crud.get(_id=ObjectId(attempt_id))
+
+    async def get_by_quiz_id(self, quiz_id: str, limit: int,
+                             after: Optional[ObjectId] = None) -> tuple[list[AttemptInDB], Optional[ObjectId]]:
+        """
+        Get one page of attempts by quiz
+        :param quiz_id: should be valid ObjectId string
+        :param limit: page size
+        :param after: _id of the last attempt on the previous page
+        :return: list of AttemptInDB instances and _id to continue from
+        """
+        return await self._attempt_crud.get_page(limit, after, quiz_id=ObjectId(quiz_id))
+
+    def iterate_by_quiz_id(self, quiz_id: str, batch_size: int) -> AsyncIterator[AttemptInDB]:
+        """
+        Iterate over all attempts by quiz without loading them into memory at once
+        :param quiz_id: should be valid ObjectId string
+        :param batch_size: number of attempts fetched from the DB per round trip
+        :return: async iterator of AttemptInDB instances
+        """
+        return self._attempt_crud.iterate(batch_size, quiz_id=ObjectId(quiz_id))
+
+    async def get_by_user(self, user: UUID, limit: int, after: Optional[ObjectId] = None,
+                          quiz_id: Optional[str] = None,
+                          answers: bool = False) -> tuple[list[AttemptInDB], Optional[ObjectId]]:
+        """
+        Get one page of attempts by user, optionally only of one quiz
+        :param user: UUID of the user
+        :param limit: page size
+        :param after: _id of the last attempt on the previous page
+        :param quiz_id: should be valid ObjectId string or None for attempts of all quizzes
+        :param answers: whether to fetch answers, without them the page is read from the index only
+        :return: list of AttemptInDB (AttemptSummary without answers) instances and _id to continue from
+        """
+        return await self._attempt_crud.get_page(limit, after, model=self._user_history_model(answers),
+                                                 **self._user_filter(user, quiz_id))
+
+    def iterate_by_user(self, user: UUID, batch_size: int, quiz_id: Optional[str] = None,
+                        answers: bool = False) -> AsyncIterator[AttemptInDB]:
+        """
+        Iterate over all attempts by user, optionally only of one quiz, without loading them into memory at once
+        :param user: UUID of the user
+        :param batch_size: number of attempts fetched from the DB per round trip
+        :param quiz_id: should be valid ObjectId string or None for attempts of all quizzes
+        :param answers: whether to fetch answers
+        :return: async iterator of AttemptInDB (AttemptSummary without answers) instances
+        """
+        return self._attempt_crud.iterate(batch_size, model=self._user_history_model(answers),
+                                          **self._user_filter(user, quiz_id))
+
+    @staticmethod
+    def _user_filter(user: UUID, quiz_id: Optional[str]) -> dict:
+        if quiz_id is None:
+            return {'user': user}
 
-    async def get_by_quiz_id(self, quiz_id: str) -> list[AttemptInDB]:
+        return {'user': user, 'quiz_id': ObjectId(quiz_id)}
+
+    @staticmethod
+    def _user_history_model(answers: bool) -> Optional[Type[AttemptSummary]]:
+        return None if answers else AttemptSummary
+
+    async def export_by_quiz_id(self, quiz_id: str, batch_size: int) -> tuple[list[str], AsyncIterator[list]]:
         """
-        Get all attempts by quiz
+        Get table of all attempts by quiz: attempt id, user, total score and correctness (1 or 0) of each question.
+        Attempts are read with a projected cursor one batch at a time, so the table is never in memory as a whole
         :param quiz_id: should be valid ObjectId string
-        :return: list of AttemptInDB instances filled with attempt data
+        :param batch_size: number of attempts fetched from the DB per round trip
+        :return: header and async iterator of rows
         """
-        return await self._attempt_crud.get_many(quiz_id=quiz_id)
+        quiz_id = ObjectId(quiz_id)
+        quiz = await self._quiz_cache.load_by_id(quiz_id, lambda: self._quiz_crud.get(_id=quiz_id))
+        questions_count = len(quiz.questions)
+        header = ['attempt_id', 'user', 'total_score', *(f'question_{n}' for n in range(1, questions_count + 1))]
+
+        async def rows() -> AsyncIterator[list]:
+            async for attempt in self._attempt_crud.iterate(batch_size, model=AttemptInExport, quiz_id=quiz_id):
+                correctness = [int(answer.is_correct) for answer in attempt.answers[:questions_count]]
+                yield [attempt.id, attempt.user, attempt.total_score,
+                       *correctness, *([''] * (questions_count - len(correctness)))]
+
+        return header, rows()
 
     async def pass_quiz(self, attempt: AttemptInCreate) -> AttemptInDB:
         """
@@ -34,22 +120,82 @@ class AttemptService:
         :param attempt: AttemptInCreate instance filled with attempt data
         :return: AttemptInDB instance filled with attempt data
         """
-        quiz = await self._quiz_crud.get(_id=attempt.quiz_id)
+        quiz = await self._quiz_cache.load_by_id(attempt.quiz_id, lambda: self._quiz_crud.get(_id=attempt.quiz_id))
         attempt_data = attempt.dict()
+        attempt_data['total_score'] = AnswerKey.for_quiz(quiz).grade(attempt_data['answers'])
+
+        new_attempt = await self._attempt_crud.create(attempt_data)
+        await self._stats_crud.record([new_attempt])
+        self._record_scores([new_attempt])
+
+        return new_attempt
+
+    async def pass_quizzes(self, attempts: list[AttemptInCreate]) -> list[dict]:
+        """
+        Check and save many attempts at once: all quizzes are fetched with one query
+        and all attempts are saved with one insert
+        :param attempts: list of AttemptInCreate instances filled with attempt data
+        :return: list of dicts with "attempt" (AttemptInDB or None) and "error" (message or None) for each attempt
+        """
+        quizzes = await self._get_quizzes({attempt.quiz_id for attempt in attempts})
+
+        results = [{'attempt': None, 'error': None} for _ in attempts]
+        attempts_by_quiz = defaultdict(list)
+        for index, attempt in enumerate(attempts):
+            if attempt.quiz_id in quizzes:
+                attempts_by_quiz[attempt.quiz_id].append((index, attempt.dict()))
+            else:
+                results[index]['error'] = f'There are no quizzes with ObjectId("{attempt.quiz_id}")'
+
+        indexes, attempts_data = [], []
+        for quiz_id, quiz_attempts in attempts_by_quiz.items():
+            scores = AnswerKey.for_quiz(quizzes[quiz_id]).grade_many([data['answers'] for _, data in quiz_attempts])
+            for (index, attempt_data), score in zip(quiz_attempts, scores):
+                attempt_data['total_score'] = score
+                indexes.append(index)
+                attempts_data.append(attempt_data)
+
+        if attempts_data:
+            created, errors = await self._attempt_crud.create_many(attempts_data)
+            for position, index in enumerate(indexes):
+                results[index]['attempt'] = created[position]
+                results[index]['error'] = errors.get(position)
+            saved = [attempt for attempt in created if attempt is not None]
+            await self._stats_crud.record(saved)
+            self._record_scores(saved)
 
-        score = 0
-        for question, answer in zip(quiz.questions, attempt_data['answers']):
-            answer['is_correct'] = question.answer == answer['value']
-            score += int(answer['is_correct'])
+        return results
 
-        attempt_data['total_score'] = score
+    async def _get_quizzes(self, quiz_ids: set[ObjectId]) -> dict[ObjectId, QuizInDB]:
+        """
+        Get quizzes from the cache, fetching all missing ones with a single query
+        :param quiz_ids: set of quiz ObjectId
+        :return: dict of QuizInDB instances by _id, quizzes which don't exist are omitted
+        """
+        quizzes = {}
+        for quiz_id in quiz_ids:
+            quiz = self._quiz_cache.get_by_id(quiz_id)
+            if quiz is not None:
+                quizzes[quiz_id] = quiz
 
-        return await self._attempt_crud.create(attempt_data)
+        missing_ids = list(quiz_ids - quizzes.keys())
+        if missing_ids:
+            for quiz in await self._quiz_crud.get_many(_id={'$in': missing_ids}):
+                self._quiz_cache.put(quiz)
+                quizzes[quiz.id] = quiz
+
+        return quizzes
 
     async def delete(self, attempt_id: str) -> None:
         """
-        Remove attempt
+        Remove attempt, discount it from the quiz statistics and drop the quiz leaderboard
         :param attempt_id: should be valid ObjectId string
         :return: None
         """
-        await self._attempt_crud.delete(ObjectId(attempt_id))
+        attempt = await self._attempt_crud.pop(ObjectId(attempt_id))
+        await self._stats_crud.record([attempt], sign=-1)
+        self._leaderboards.invalidate(attempt.quiz_id)
+
+    def _record_scores(self, attempts: list[AttemptInDB]) -> None:
+        for attempt in attempts:
+            self._leaderboards.record(attempt.quiz_id, LeaderboardEntry(attempt.user, attempt.total_score, attempt.id))
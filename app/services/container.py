@@ -0,0 +1,38 @@
+from typing import Optional, Type, TypeVar
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db.batcher import InsertBatcher
+from services.attempt import AttemptService
+from services.leaderboard import LeaderboardCache
+from services.quiz import QuizService
+from services.quiz_cache import QuizCache
+
+ServiceT = TypeVar('ServiceT')
+
+
+class ServiceContainer:
+    """
+    Holds app-scoped services, created once on startup and kept on app.state.services.
+    Services are stateless apart from the shared caches and batcher, so one instance serves all requests
+    """
+
+    def __init__(self, client: AsyncIOMotorClient, quiz_cache: QuizCache, leaderboards: LeaderboardCache,
+                 attempt_batcher: Optional[InsertBatcher] = None):
+        self.client = client
+        self.quiz_cache = quiz_cache
+        self.attempt_batcher = attempt_batcher
+        self.leaderboards = leaderboards  # QuizService reads and AttemptService updates the same boards
+
+        self._services = {
+            service_class: service_class(client, quiz_cache, leaderboards, attempt_batcher)
+            for service_class in (QuizService, AttemptService)
+        }
+
+    def get(self, service_class: Type[ServiceT]) -> ServiceT:
+        """
+        Get the shared instance of the service
+        :param service_class: class of the service, like QuizService
+        :return: service instance
+        """
+        return self._services[service_class]
@@ -0,0 +1,165 @@
+import heapq
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, NamedTuple, Optional
+from uuid import UUID
+
+from bson import ObjectId
+
+from services.single_flight import SingleFlight
+
+
+class LeaderboardEntry(NamedTuple):
+    user: UUID
+    total_score: int
+    attempt_id: ObjectId
+
+
+def _eviction_key(total_score: int, attempt_id: ObjectId) -> tuple[int, bytes]:
+    # the smallest key is the worst entry: the lowest score and, among equal scores, the latest attempt
+    return total_score, bytes(255 - byte for byte in attempt_id.binary)
+
+
+class Leaderboard:
+    """
+    Best score of each of the top N users of one quiz. Users are ranked by their best score,
+    an earlier attempt goes first among equal scores. The worst entry is kept on top of a min-heap,
+    so an attempt which does not make it to the board costs O(1) and one which does costs O(log N)
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._best: dict[UUID, LeaderboardEntry] = {}
+        self._heap: list[tuple[tuple[int, bytes], UUID, LeaderboardEntry]] = []  # has stale entries of improved users
+        self._ranking: Optional[list[LeaderboardEntry]] = None
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def add(self, user: UUID, total_score: int, attempt_id: ObjectId) -> bool:
+        """
+        Take the attempt into account
+        :param user: UUID of the user
+        :param total_score: score of the attempt
+        :param attempt_id: ObjectId of the attempt
+        :return: whether the board changed
+        """
+        key = _eviction_key(total_score, attempt_id)
+        current = self._best.get(user)
+        if current is not None:
+            if key <= _eviction_key(current.total_score, current.attempt_id):
+                return False
+        elif len(self._best) >= self._size:
+            worst_key, worst_user, _ = self._peek_worst()
+            if key <= worst_key:
+                return False
+            heapq.heappop(self._heap)
+            del self._best[worst_user]
+
+        entry = LeaderboardEntry(user, total_score, attempt_id)
+        self._best[user] = entry
+        heapq.heappush(self._heap, (key, user, entry))
+        if len(self._heap) > 2 * self._size:
+            self._heap = [(_eviction_key(entry.total_score, entry.attempt_id), user, entry)
+                          for user, entry in self._best.items()]
+            heapq.heapify(self._heap)
+        self._ranking = None
+
+        return True
+
+    async def seed(self, attempts: AsyncIterator[LeaderboardEntry]) -> None:
+        """
+        Fill the board from attempts ordered by score descending and _id ascending, reading only until it is full
+        :param attempts: async iterator of LeaderboardEntry instances, one per attempt
+        """
+        async for attempt in attempts:
+            self.add(*attempt)
+            if len(self._best) >= self._size:
+                break
+
+    def top(self, limit: int) -> list[LeaderboardEntry]:
+        """
+        Get the best users, the ranking is sorted again only after the board changes
+        :param limit: max number of entries
+        :return: list of LeaderboardEntry instances, the best first
+        """
+        if self._ranking is None:
+            self._ranking = sorted(self._best.values(), key=lambda entry: (-entry.total_score, entry.attempt_id))
+
+        return self._ranking[:limit]
+
+    def _peek_worst(self) -> tuple[tuple[int, bytes], UUID, LeaderboardEntry]:
+        while self._heap[0][2] is not self._best.get(self._heap[0][1]):
+            heapq.heappop(self._heap)
+
+        return self._heap[0]
+
+
+class LeaderboardCache:
+    """
+    In-process LRU of quiz leaderboards. A board is seeded from the DB on the first read and kept up to date
+    by recording every new attempt. Attempts recorded while the board is being seeded are applied after it,
+    so none of them are lost whichever side of the seeding query they land on
+    """
+
+    def __init__(self, size: int, max_quizzes: int):
+        self.size = size
+        self._max_quizzes = max_quizzes
+
+        self._boards: OrderedDict[ObjectId, Leaderboard] = OrderedDict()
+        self._seeding: dict[ObjectId, list[LeaderboardEntry]] = {}
+        self._loads = SingleFlight()
+        self._generation = 0  # changes on every invalidation, so boards seeded before it are not kept
+
+    async def get(self, quiz_id: ObjectId,
+                  loader: Callable[[], AsyncIterator[LeaderboardEntry]]) -> Leaderboard:
+        """
+        Get the leaderboard of the quiz, seeding it when it is not cached, concurrent misses wait for one seeding
+        :param quiz_id: ObjectId of the quiz
+        :param loader: function making an async iterator of the quiz attempts ordered by score, see Leaderboard.seed
+        :return: Leaderboard instance
+        """
+        board = self._boards.get(quiz_id)
+        if board is not None:
+            self._boards.move_to_end(quiz_id)
+            return board
+
+        generation = self._generation
+        return await self._loads.do(quiz_id, lambda: self._seed(quiz_id, loader, generation))
+
+    def record(self, quiz_id: ObjectId, entry: LeaderboardEntry) -> None:
+        """
+        Add the new attempt to the leaderboard of its quiz, if the board is cached or being seeded
+        :param quiz_id: ObjectId of the quiz
+        :param entry: LeaderboardEntry instance of the attempt
+        """
+        board = self._boards.get(quiz_id)
+        if board is not None:
+            board.add(*entry)
+        elif quiz_id in self._seeding:
+            self._seeding[quiz_id].append(entry)
+
+    def invalidate(self, quiz_id: ObjectId) -> None:
+        """
+        Remove the leaderboard of the quiz, should be called after its attempts are deleted
+        :param quiz_id: ObjectId of the quiz
+        """
+        self._generation += 1
+        self._boards.pop(quiz_id, None)
+
+    async def _seed(self, quiz_id: ObjectId, loader: Callable[[], AsyncIterator[LeaderboardEntry]],
+                    generation: int) -> Leaderboard:
+        board = Leaderboard(self.size)
+        recorded = self._seeding[quiz_id] = []  # before the query, so no attempt falls between the two
+        try:
+            await board.seed(loader())
+            for entry in recorded:
+                board.add(*entry)
+        finally:
+            del self._seeding[quiz_id]
+
+        if generation == self._generation:
+            self._boards[quiz_id] = board
+            while len(self._boards) > self._max_quizzes:
+                self._boards.popitem(last=False)
+
+        return board
@@ -1,18 +1,39 @@
+import logging
+from typing import AsyncIterator, Optional, Union
+
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import PyMongoError
+from pydantic import ValidationError
 
+from core.config import QUIZ_DELETION_BATCH_SIZE
+from core.ndjson import iterate_lines
 from crud.attempt import AttemptCRUD
 from crud.quiz import QuizCRUD
+from crud.quiz_deletion import QuizDeletionCRUD
+from crud.quiz_stats import QuizStatsCRUD
+from db.batcher import InsertBatcher
 from db.exceptions import DatabaseResultException
-from models.quiz import QuizInDB, QuizInCreate
+from models.db import DBModelMixin
+from models.quiz import QuizImportResult, QuizInDB, QuizInCreate, QuizPartial, QuizPartialInDB
+from models.quiz_deletion import QuizDeletion
+from models.stats import LeaderboardPosition, QuizLeaderboard, QuizStats, QuizStatsCounters
+from services.leaderboard import LeaderboardCache, LeaderboardEntry
+from services.quiz_cache import QuizCache
+from services.stats import build_quiz_stats
+
+logger = logging.getLogger(__name__)
 
 
 class QuizService:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, quiz_cache: QuizCache, leaderboards: LeaderboardCache,
+                 attempt_batcher: Optional[InsertBatcher] = None):
         self._client = client
+        self._quiz_cache = quiz_cache
+        self._leaderboards = leaderboards
         self._quiz_crud = QuizCRUD(client)
-        self._attempt_crud = AttemptCRUD(client)
+        self._attempt_crud = AttemptCRUD(client, attempt_batcher)
+        self._stats_crud = QuizStatsCRUD(client)
+        self._deletion_crud = QuizDeletionCRUD(client)
 
     async def get_by_id(self, quiz_id: str) -> QuizInDB:
         """
@@ -20,22 +41,105 @@ class QuizService:
         :param quiz_id: should be valid ObjectId string
         :return: QuizInDB instance filled with quiz data
         """
-        return await self._quiz_crud.get(id=ObjectId(quiz_id))
+        quiz_id = ObjectId(quiz_id)
+
+        return await self._quiz_cache.load_by_id(quiz_id, lambda: self._quiz_crud.get(_id=quiz_id))
 
-    async def get_by_post_id(self, post_id: int) -> QuizInDB:
+    async def get_by_post_id(self, post_id: int) -> QuizPartialInDB:
         """
-        Get a quiz by post id
+        Get a quiz without answers by post id, it is fetched and cached without them
         :param post_id: int
-        :return: QuizInDB instance filled with quiz data
+        :return: QuizPartialInDB instance
         """
-        return await self._quiz_crud.get(post_id=post_id)
+        return await self._quiz_cache.load_by_post_id(
+            post_id,
+            lambda: self._quiz_crud.get(post_id=post_id, model=QuizPartialInDB),
+            model=QuizPartialInDB
+        )
 
-    async def get_all(self) -> list[QuizInDB]:
+    async def get_many_by_post_ids(self, post_ids: list[int]) -> dict[int, Optional[Union[QuizInDB, QuizPartial]]]:
         """
-        Get all quizzes
-        :return: QuizInDB instance filled with quiz data
+        Get quizzes by post ids, cached ones are taken from the cache and the rest is fetched with one query
+        :param post_ids: list of unique post ids
+        :return: dict of quizzes (QuizInDB from the cache or QuizPartial without answers) by post id,
+                 None for post ids without a quiz
+        """
+        quizzes = {post_id: self._quiz_cache.get_by_post_id(post_id) for post_id in post_ids}
+        missing = [post_id for post_id, quiz in quizzes.items() if quiz is None]
+        if missing:
+            for quiz in await self._quiz_crud.get_many(post_id={'$in': missing}, model=QuizPartial):
+                quizzes[quiz.post_id] = quiz
+
+        return quizzes
+
+    async def get_all(self, limit: int, after: Optional[ObjectId] = None) -> tuple[list[QuizInDB], Optional[ObjectId]]:
+        """
+        Get one page of all quizzes
+        :param limit: page size
+        :param after: _id of the last quiz on the previous page
+        :return: list of QuizInDB instances and _id to continue from
+        """
+        return await self._quiz_crud.get_page(limit, after)
+
+    def iterate_all(self, batch_size: int) -> AsyncIterator[QuizInDB]:
+        """
+        Iterate over all quizzes without loading them into memory at once
+        :param batch_size: number of quizzes fetched from the DB per round trip
+        :return: async iterator of QuizInDB instances
+        """
+        return self._quiz_crud.iterate(batch_size)
+
+    async def get_stats(self, quiz_id: str) -> QuizStats:
         """
-        return await self._quiz_crud.get_many()
+        Get attempts statistics of the quiz from its incrementally maintained counters
+        :param quiz_id: should be valid ObjectId string
+        :return: QuizStats instance
+        """
+        quiz = await self.get_by_id(quiz_id)
+        counters = await self._stats_crud.get_counters(quiz.id)
+        questions = {index: question.dict() for index, question in counters.questions.items()}
+
+        return build_quiz_stats(quiz.id, counters.histogram, questions)
+
+    async def get_leaderboard(self, quiz_id: str, limit: int) -> QuizLeaderboard:
+        """
+        Get the best score of the top users of the quiz from its in-process leaderboard,
+        which is seeded from the DB on the first request and then follows new attempts
+        :param quiz_id: should be valid ObjectId string
+        :param limit: max number of users, at most the leaderboard size
+        :return: QuizLeaderboard instance
+        """
+        quiz = await self.get_by_id(quiz_id)
+
+        async def best_scores():
+            async for attempt in self._attempt_crud.iterate_best_scores(quiz.id, batch_size=self._leaderboards.size):
+                yield LeaderboardEntry(attempt.user, attempt.total_score, attempt.id)
+
+        leaderboard = await self._leaderboards.get(quiz.id, best_scores)
+        positions = [
+            LeaderboardPosition(rank=rank, user=entry.user, total_score=entry.total_score, attempt_id=entry.attempt_id)
+            for rank, entry in enumerate(leaderboard.top(limit), start=1)
+        ]
+
+        return QuizLeaderboard(quiz_id=quiz.id, positions=positions)
+
+    async def rebuild_stats(self, quiz_id: ObjectId) -> QuizStatsCounters:
+        """
+        Recompute statistics counters of the quiz from its attempts
+        :param quiz_id: ObjectId of the quiz
+        :return: QuizStatsCounters instance with the new counters
+        """
+        histogram, questions = await self._attempt_crud.aggregate_stats(quiz_id)
+        counters = QuizStatsCounters(
+            _id=quiz_id,
+            attempts=sum(histogram.values()),
+            score_sum=sum(score * count for score, count in histogram.items()),
+            histogram=histogram,
+            questions=questions
+        )
+        await self._stats_crud.replace(counters)
+
+        return counters
 
     async def create(self, quiz_data: QuizInCreate) -> QuizInDB:
         """
@@ -45,6 +149,56 @@ class QuizService:
         """
         return await self._quiz_crud.create(quiz_data.dict())
 
+    async def import_quizzes(self, chunks: AsyncIterator[bytes], chunk_size: int,
+                             max_line_size: int) -> AsyncIterator[QuizImportResult]:
+        """
+        Create quizzes from NDJSON, one QuizInCreate per line, as the stream arrives.
+        Valid quizzes are written with one unordered insert per chunk and results are yielded after each chunk,
+        so memory use depends on the chunk size only, not on the size of the upload
+        :param chunks: async iterator of NDJSON byte chunks, like the request body stream
+        :param chunk_size: max number of lines handled per insert
+        :param max_line_size: max length of a line in bytes
+        :return: async iterator of QuizImportResult instances in the line order, blank lines are skipped
+        """
+        results: list[QuizImportResult] = []
+        pending: list[tuple[QuizImportResult, dict]] = []
+        line_number = 0
+        async for line in iterate_lines(chunks, max_line_size):
+            line_number += 1
+            if line is not None and not line.strip():
+                continue
+
+            result = QuizImportResult(line=line_number)
+            results.append(result)
+            if line is None:
+                result.error = f'Line is longer than {max_line_size} bytes'
+            else:
+                try:
+                    pending.append((result, QuizInCreate.parse_raw(line).dict()))
+                except ValidationError as exc:
+                    result.error = format_validation_error(exc)
+
+            if len(results) >= chunk_size:
+                await self._insert_imported(pending)
+                for result in results:
+                    yield result
+                results, pending = [], []
+
+        await self._insert_imported(pending)
+        for result in results:
+            yield result
+
+    async def _insert_imported(self, pending: list[tuple[QuizImportResult, dict]]) -> None:
+        if not pending:
+            return
+
+        quizzes, errors = await self._quiz_crud.create_many([quiz_data for _, quiz_data in pending])
+        for index, ((result, _), quiz) in enumerate(zip(pending, quizzes)):
+            if quiz is None:
+                result.error = errors[index]
+            else:
+                result.quiz_id = quiz.id
+
     async def update(self, quiz_id: str, quiz_data: QuizInCreate) -> QuizInDB:
         """
         Update quiz document in the DB by quiz _id
@@ -52,26 +206,99 @@ class QuizService:
         :param quiz_data: QuizInCreate instance filled with quiz data
         :return: QuizInDB instance filled with quiz data
         """
-        return await self._quiz_crud.update(
-            quiz_id=ObjectId(quiz_id),
+        quiz_id = ObjectId(quiz_id)
+        self._quiz_cache.invalidate(quiz_id)
+        quiz = await self._quiz_crud.update(
+            quiz_id=quiz_id,
             quiz_data=quiz_data.dict()
         )
+        self._quiz_cache.invalidate(quiz_id)  # loads which read the quiz before the write must not be cached
+        self._quiz_cache.put(quiz)
+
+        return quiz
+
+    async def delete(self, quiz_id: str) -> QuizDeletion:
+        """
+        Delete quiz document from the DB by quiz _id and start cascade deletion of its attempts.
+        The deletion is recorded before anything is removed, so if the call is interrupted
+        resume_deletions still finds the attempts, and it is dropped again if the quiz stays.
+        Attempts are removed later by purge_attempts, so the call does not depend on their number
+        :param quiz_id: should be valid ObjectId string
+        :return: QuizDeletion instance to track removal of the attempts
+        """
+        quiz_id = ObjectId(quiz_id)
+        await self._quiz_crud.get(_id=quiz_id, model=DBModelMixin)  # a missing quiz gets no deletion record
+        deletion = await self._deletion_crud.start(quiz_id)
+        try:
+            await self._quiz_crud.delete(quiz_id)
+        except DatabaseResultException:
+            raise  # removed by a concurrent call, whose deletion goes on
+        except Exception:
+            await self._drop_deletion_of_existing_quiz(quiz_id)
+            raise
+        self._quiz_cache.invalidate(quiz_id)
+        self._leaderboards.invalidate(quiz_id)
+        await self._stats_crud.delete_for_quiz(quiz_id)
+
+        return deletion
 
-    async def delete(self, quiz_id: str) -> None:
+    async def purge_attempts(self, quiz_id: str, batch_size: int = QUIZ_DELETION_BATCH_SIZE) -> None:
         """
-        Delete quiz document from the DB by quiz _id and cascade delete attempts
+        Delete attempts of the removed quiz in bounded batches, recording progress after each batch.
+        It is safe to run it again after interruption, it continues with the attempts which are left.
+        Nothing is removed if the quiz is still there, because its own delete failed
         :param quiz_id: should be valid ObjectId string
+        :param batch_size: max number of attempts deleted with one query
         """
         quiz_id = ObjectId(quiz_id)
-        attempts_to_delete = await self._attempt_crud.get_many(quiz=quiz_id)
-        id_list = [x.id for x in attempts_to_delete]
-
-        async with await self._client.start_session() as session:
-            session.start_transaction()
-            try:
-                await self._attempt_crud.delete_many(id_list, session=session)
-                await self._quiz_crud.delete(quiz_id, session=session)
-                session.commit_transaction()
-            except (PyMongoError, DatabaseResultException):
-                session.abort_transaction()
-                raise
+        if await self._drop_deletion_of_existing_quiz(quiz_id):
+            return
+
+        while True:
+            deleted = await self._attempt_crud.delete_batch_by_quiz_id(quiz_id, batch_size)
+            if not deleted:
+                break
+            await self._deletion_crud.add_progress(quiz_id, deleted)
+
+        await self._deletion_crud.finish(quiz_id)
+
+    async def purge_attempts_in_background(self, quiz_id: str) -> None:
+        """
+        Run purge_attempts as a background task, logging its failure instead of losing it.
+        The deletion stays unfinished then and is continued by resume_deletions
+        :param quiz_id: should be valid ObjectId string
+        """
+        try:
+            await self.purge_attempts(quiz_id)
+        except Exception:
+            logger.exception('Deletion of attempts of quiz %s failed, it is resumed on the next start', quiz_id)
+
+    async def resume_deletions(self) -> None:
+        """Continue cascade deletions which were interrupted, e.g. by the app restart"""
+        for deletion in await self._deletion_crud.get_many(finished=False):
+            await self.purge_attempts_in_background(deletion.id)
+
+    async def _drop_deletion_of_existing_quiz(self, quiz_id: ObjectId) -> bool:
+        if not await self._quiz_crud.get_many(_id=quiz_id, limit=1, model=DBModelMixin):
+            return False
+
+        await self._deletion_crud.delete(quiz_id)
+        logger.warning('Quiz %s was not deleted, its attempts are kept', quiz_id)
+        return True
+
+    async def get_deletion(self, quiz_id: str) -> QuizDeletion:
+        """
+        Get progress of the quiz attempts cascade deletion
+        :param quiz_id: should be valid ObjectId string
+        :return: QuizDeletion instance
+        """
+        return await self._deletion_crud.get(_id=ObjectId(quiz_id))
+
+
+def format_validation_error(exc: ValidationError) -> str:
+    """
+    Make a one-line message out of the validation errors
+    :param exc: ValidationError instance
+    :return: errors like "questions.0.type: field required", separated with "; "
+    """
+    return '; '.join(f'{".".join(map(str, error["loc"]))}: {error["msg"]}' for error in exc.errors())
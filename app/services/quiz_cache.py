@@ -0,0 +1,193 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, NamedTuple, Optional, Type, Union
+
+from bson import ObjectId
+
+from models.quiz import QuizInDB, QuizPartialInDB
+from services.single_flight import SingleFlight
+
+QUESTION_OVERHEAD = 64  # rough per-question cost of the model objects, in bytes
+
+CachedQuiz = Union[QuizInDB, QuizPartialInDB]
+
+
+class _CacheEntry(NamedTuple):
+    quiz: CachedQuiz
+    expires_at: float
+    size: int
+
+
+class QuizCache:
+    """
+    In-process LRU cache with TTL for quizzes, which can be looked up both by _id and by post_id.
+    Next to full quizzes it keeps their projections, like QuizPartialInDB without answers, each model
+    of a quiz in its own entry. Entries are bounded by their count and by the approximate total size
+    of the cached quizzes. Concurrent misses for the same key share one load from the DB
+    """
+
+    def __init__(self, max_entries: int, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self._max_entries = max_entries
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+
+        self._entries: OrderedDict[tuple[Type[CachedQuiz], ObjectId], _CacheEntry] = OrderedDict()
+        self._post_ids: dict[tuple[Type[CachedQuiz], int], ObjectId] = {}
+        self._models: set[Type[CachedQuiz]] = set()  # models ever cached, their entries are invalidated together
+        self._size = 0
+        self._loads = SingleFlight()
+        self._generation = 0  # changes on every invalidation, so loads started before it don't fill the cache
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_by_id(self, quiz_id: ObjectId, model: Type[CachedQuiz] = QuizInDB) -> Optional[CachedQuiz]:
+        """
+        Get cached quiz by _id
+        :param quiz_id: ObjectId instance
+        :param model: model the quiz was cached as, QuizInDB or its projection
+        :return: instance of the model or None, if the quiz is not cached or expired
+        """
+        key = (model, quiz_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= self._clock():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return entry.quiz
+
+    def get_by_post_id(self, post_id: int, model: Type[CachedQuiz] = QuizInDB) -> Optional[CachedQuiz]:
+        """
+        Get cached quiz by post id
+        :param post_id: int
+        :param model: model the quiz was cached as, QuizInDB or its projection
+        :return: instance of the model or None, if the quiz is not cached or expired
+        """
+        quiz_id = self._post_ids.get((model, post_id))
+        if quiz_id is None:
+            self.misses += 1
+            return None
+
+        return self.get_by_id(quiz_id, model)
+
+    async def load_by_id(self, quiz_id: ObjectId, loader: Callable[[], Awaitable[QuizInDB]]) -> QuizInDB:
+        """
+        Get quiz by _id from the cache or load it, concurrent misses wait for one load
+        :param quiz_id: ObjectId instance
+        :param loader: function making an awaitable which fetches the quiz from the DB
+        :return: QuizInDB instance
+        """
+        quiz = self.get_by_id(quiz_id)
+        if quiz is None:
+            generation = self._generation
+            quiz = await self._loads.do(('_id', quiz_id), lambda: self._load(loader, generation))
+
+        return quiz
+
+    async def load_by_post_id(self, post_id: int, loader: Callable[[], Awaitable[CachedQuiz]],
+                              model: Type[CachedQuiz] = QuizInDB) -> CachedQuiz:
+        """
+        Get quiz by post id from the cache or load it, concurrent misses wait for one load
+        :param post_id: int
+        :param loader: function making an awaitable which fetches the quiz as the model from the DB
+        :param model: QuizInDB or its projection, like QuizPartialInDB which is fetched without answers
+        :return: instance of the model
+        """
+        quiz = self.get_by_post_id(post_id, model)
+        if quiz is None:
+            generation = self._generation
+            quiz = await self._loads.do(('post_id', model, post_id), lambda: self._load(loader, generation))
+
+        return quiz
+
+    async def _load(self, loader: Callable[[], Awaitable[CachedQuiz]], generation: int) -> CachedQuiz:
+        quiz = await loader()
+        if generation == self._generation:
+            self.put(quiz)
+
+        return quiz
+
+    def put(self, quiz: CachedQuiz) -> None:
+        """
+        Add quiz to the cache as its model, evicting least recently used quizzes when limits are exceeded.
+        A cached quiz of a later version is never replaced by an earlier one
+        :param quiz: QuizInDB instance or its projection
+        """
+        key = (type(quiz), quiz.id)
+        entry = self._entries.get(key)
+        if entry is not None and entry.quiz.version > quiz.version:
+            return
+        self._discard(key)
+
+        size = estimate_quiz_size(quiz)
+        if size > self._max_size:
+            return
+
+        self._models.add(type(quiz))
+        self._entries[key] = _CacheEntry(quiz, self._clock() + self._ttl, size)
+        self._post_ids[(type(quiz), quiz.post_id)] = quiz.id
+        self._size += size
+
+        while len(self._entries) > self._max_entries or self._size > self._max_size:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def invalidate(self, quiz_id: ObjectId) -> None:
+        """
+        Remove quiz with all its projections from the cache, should be called after each quiz change
+        :param quiz_id: ObjectId instance
+        """
+        self._generation += 1
+        for model in self._models:
+            self._discard((model, quiz_id))
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+        :return: dict with hits, misses, evictions, current number of entries and their approximate size
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'size': self._size,
+            'loads_in_flight': self._loads.in_flight(),
+        }
+
+    def _discard(self, key: tuple[Type[CachedQuiz], ObjectId]) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: tuple[Type[CachedQuiz], ObjectId]) -> None:
+        model, quiz_id = key
+        entry = self._entries.pop(key)
+        if self._post_ids.get((model, entry.quiz.post_id)) == quiz_id:
+            del self._post_ids[(model, entry.quiz.post_id)]
+        self._size -= entry.size
+
+
+def estimate_quiz_size(quiz: CachedQuiz) -> int:
+    """
+    Cheap estimate of the memory taken by the quiz, based on the length of its strings
+    :param quiz: QuizInDB instance or its projection, which may have no answers
+    :return: approximate size in bytes
+    """
+    size = len(quiz.name) + len(quiz.description)
+    for question in quiz.questions:
+        size += QUESTION_OVERHEAD + len(question.description) + len(str(getattr(question, 'answer', '')))
+        if question.options:
+            size += sum(len(option) for option in question.options)
+
+    return size
@@ -0,0 +1,83 @@
+from typing import Any, Callable
+
+from models.quiz import QuizInDB
+from models.quiz_question import QuestionFull
+
+TEXT = 'text'
+RADIO = 'radio'
+CHECKBOX = 'checkbox'
+
+
+def normalize_text(value: str) -> str:
+    """Make text answers comparison insensitive to case and extra whitespaces"""
+    return ' '.join(value.split()).casefold()
+
+
+def _check_text(expected: str) -> Callable[[Any], bool]:
+    return lambda value: isinstance(value, str) and normalize_text(value) == expected
+
+
+def _check_checkbox(expected: frozenset) -> Callable[[Any], bool]:
+    # an option picked twice makes the answer wrong, the length check rejects it
+    return lambda value: isinstance(value, list) and len(value) == len(expected) and frozenset(value) == expected
+
+
+def _check_equal(expected: Any) -> Callable[[Any], bool]:
+    return lambda value: value == expected
+
+
+class AnswerKey:
+    """
+    Answers of one quiz version compiled into per-question checks, so every submission
+    is graded without touching the quiz model. Text answers are normalized and checkbox
+    answers are compared as sets of distinct options, so order of the chosen options does not matter
+    """
+
+    def __init__(self, questions: list[QuestionFull]):
+        self._checks = tuple(self._compile(question) for question in questions)
+
+    @classmethod
+    def for_quiz(cls, quiz: QuizInDB) -> 'AnswerKey':
+        """
+        Get compiled answers of the quiz. The key is built once and memoized on the quiz instance,
+        so it lives exactly as long as the cached quiz version does
+        :param quiz: QuizInDB instance
+        :return: AnswerKey instance
+        """
+        if quiz._answer_key is None:
+            quiz._answer_key = cls(quiz.questions)
+
+        return quiz._answer_key
+
+    @staticmethod
+    def _compile(question: QuestionFull) -> Callable[[Any], bool]:
+        if question.type == TEXT and isinstance(question.answer, str):
+            return _check_text(normalize_text(question.answer))
+        if question.type == CHECKBOX and isinstance(question.answer, list):
+            return _check_checkbox(frozenset(question.answer))
+
+        return _check_equal(question.answer)
+
+    def grade(self, answers: list[dict]) -> int:
+        """
+        Mark each answer with "is_correct" flag
+        :param answers: list of attempt answers in BaseAttemptAnswer format, updated in place
+        :return: total score of the attempt
+        """
+        score = 0
+        for check, answer in zip(self._checks, answers):
+            is_correct = check(answer['value'])
+            answer['is_correct'] = is_correct
+            score += is_correct
+
+        return score
+
+    def grade_many(self, attempts: list[list[dict]]) -> list[int]:
+        """
+        Grade many attempts of the same quiz in one call
+        :param attempts: list of attempt answers lists, updated in place
+        :return: list of total scores in the same order
+        """
+        grade = self.grade
+
+        return [grade(answers) for answers in attempts]
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+ResultT = TypeVar('ResultT')
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the call as a task
+    and everyone who comes while it is in flight awaits the same task, getting its result or its exception.
+    A cancelled caller stops waiting without cancelling the shared call, which other callers may still wait for
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[ResultT]]) -> ResultT:
+        """
+        Run the call or join the one already in flight for the key
+        :param key: identity of the call, like ("post_id", 123)
+        :param call: function making the awaitable, only called when there is no call in flight
+        :return: result of the shared call
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """
+        Get number of calls in flight
+        :return: int
+        """
+        return len(self._calls)
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # every waiter may be gone, the exception counts as retrieved anyway
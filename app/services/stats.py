@@ -0,0 +1,52 @@
+from typing import Optional
+
+from bson import ObjectId
+
+from models.stats import QuizStats
+
+
+def build_quiz_stats(quiz_id: ObjectId, histogram: dict[int, int], questions: dict[int, dict]) -> QuizStats:
+    """
+    Make quiz statistics summary out of raw counters
+    :param quiz_id: ObjectId of the quiz
+    :param histogram: number of attempts by total_score
+    :param questions: {"answered": int, "correct": int} counters by question index
+    :return: QuizStats instance
+    """
+    histogram = {score: count for score, count in sorted(histogram.items()) if count > 0}
+    attempts = sum(histogram.values())
+    mean_score = sum(score * count for score, count in histogram.items()) / attempts if attempts else None
+
+    return QuizStats(
+        quiz_id=quiz_id,
+        attempts=attempts,
+        mean_score=mean_score,
+        median_score=_histogram_median(histogram, attempts),
+        histogram=[{'score': score, 'count': count} for score, count in histogram.items()],
+        questions=[
+            {
+                'index': index,
+                'answered': counters['answered'],
+                'correct_ratio': counters['correct'] / counters['answered'] if counters['answered'] else 0.0
+            }
+            for index, counters in sorted(questions.items())
+        ]
+    )
+
+
+def _histogram_median(histogram: dict[int, int], attempts: int) -> Optional[float]:
+    if not attempts:
+        return None
+
+    lower_position, upper_position = (attempts - 1) // 2, attempts // 2
+    lower = upper = None
+    seen = 0
+    for score, count in histogram.items():
+        seen += count
+        if lower is None and seen > lower_position:
+            lower = score
+        if seen > upper_position:
+            upper = score
+            break
+
+    return (lower + upper) / 2
@@ -0,0 +1,372 @@
+"""
+Benchmark suite for the API hot paths.
+
+The app is driven in-process through ASGI calls, with the in-memory storage backend
+instead of MongoDB, so results depend only on the app code and the machine.
+Every scenario gets a fresh app, is seeded, warmed up and then measured twice:
+once for latency and throughput, once under tracemalloc for peak memory.
+The in-memory backend filters and sorts every index bucket it reads, so for the largest
+collections a part of the measured latency belongs to the stand-in itself.
+
+Run from the repository root:
+    PYTHONPATH=app python benchmarks/bench_api.py [--quick] [--save NAME] [--compare FILE]
+
+--save writes benchmarks/baselines/NAME.json, --compare prints the change against a saved baseline.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlencode
+from uuid import uuid4
+
+os.environ.setdefault('MONGO_BACKEND', 'memory')
+os.environ.setdefault('MONGO_CREATE_INDEXES', 'true')
+os.environ.setdefault('RESUME_QUIZ_DELETIONS', 'false')
+os.environ.setdefault('SLOW_QUERY_LOG', 'false')
+
+from bson import ObjectId  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from core.config import database_name  # noqa: E402
+from main import get_application  # noqa: E402
+
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+SEED = 42
+MEMORY_PASS_REQUESTS = 50
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client, calls the ASGI app directly without sockets or threads"""
+
+    def __init__(self, app: FastAPI):
+        self._app = app
+        self.last_headers = {}  # headers of the last response
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None,
+                      json_body: Optional[object] = None, headers: Optional[dict] = None) -> tuple[int, bytes]:
+        body = b'' if json_body is None else json.dumps(json_body).encode()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': urlencode(params or {}).encode(),
+            'root_path': '',
+            'headers': [(b'host', b'benchmark'), (b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode()),
+                        *((name.lower().encode(), value.encode()) for name, value in (headers or {}).items())],
+            'client': ('127.0.0.1', 50000),
+            'server': ('benchmark', 80),
+        }
+        response_done = asyncio.Event()
+        request_sent = False
+        status = 0
+        chunks = []
+        response_headers = {}
+
+        async def receive() -> dict:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await response_done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message: dict) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                response_headers.update((name.decode(), value.decode()) for name, value in message['headers'])
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    response_done.set()
+
+        await self._app(scope, receive, send)
+        response_done.set()
+
+        self.last_headers = response_headers
+
+        return status, b''.join(chunks)
+
+    async def get(self, path: str, headers: Optional[dict] = None, **params) -> tuple[int, bytes]:
+        return await self.request('GET', path, params=params, headers=headers)
+
+    async def post(self, path: str, json_body: object) -> tuple[int, bytes]:
+        return await self.request('POST', path, json_body=json_body)
+
+
+def make_quiz(post_id: int, question_count: int) -> dict:
+    questions = []
+    for i in range(question_count):
+        if i % 3 == 0:
+            questions.append({'description': f'Question {i}', 'type': 'text', 'answer': f'answer {i}'})
+        elif i % 3 == 1:
+            questions.append({'description': f'Question {i}', 'type': 'radio',
+                              'options': ['option1', 'option2', 'option3', 'option4'], 'answer': i % 4})
+        else:
+            questions.append({'description': f'Question {i}', 'type': 'checkbox',
+                              'options': ['option1', 'option2', 'option3', 'option4'], 'answer': [0, i % 4]})
+
+    return {'post_id': post_id, 'name': f'Quiz {post_id}', 'description': 'Benchmark quiz', 'questions': questions}
+
+
+def make_answers(question_count: int, rng: random.Random) -> list[dict]:
+    answers = []
+    for i in range(question_count):
+        if i % 3 == 0:
+            answers.append({'value': f'answer {i}' if rng.random() < 0.5 else 'wrong'})
+        elif i % 3 == 1:
+            answers.append({'value': rng.randrange(4)})
+        else:
+            answers.append({'value': [0, rng.randrange(4)]})
+
+    return answers
+
+
+def make_attempt_document(quiz_id: ObjectId, question_count: int, rng: random.Random) -> dict:
+    answers = [{'value': answer['value'], 'is_correct': rng.random() < 0.5}
+               for answer in make_answers(question_count, rng)]
+
+    return {'user': uuid4(), 'quiz_id': quiz_id, 'answers': answers,
+            'total_score': sum(answer['is_correct'] for answer in answers)}
+
+
+class Scenario:
+    """
+    Benchmark case: setup seeds a fresh app and returns a function making one request,
+    the request function gets the sequence number of the request
+    """
+
+    def __init__(self, name: str, params: dict, requests: int,
+                 setup: Callable[[FastAPI, ASGIClient, dict], Awaitable[Callable[[int], Awaitable]]]):
+        self.name = name
+        self.params = params
+        self.requests = requests
+        self.setup = setup
+
+
+async def setup_create_quiz(app: FastAPI, client: ASGIClient, params: dict) -> Callable[[int], Awaitable]:
+    quizzes = [make_quiz(post_id, params['questions']) for post_id in range(params['requests'] * 3)]
+
+    async def create_quiz(n: int):
+        return await client.post('/quiz/', quizzes[n])
+
+    return create_quiz
+
+
+async def setup_get_post_quiz(app: FastAPI, client: ASGIClient, params: dict) -> Callable[[int], Awaitable]:
+    collection = app.state.mongodb[database_name]['quizzes']
+    await collection.insert_many([make_quiz(post_id, params['questions']) for post_id in range(params['quizzes'])])
+    rng = random.Random(SEED)
+
+    async def get_post_quiz(n: int):
+        return await client.get(f'/post_quiz/{rng.randrange(params["quizzes"])}')
+
+    return get_post_quiz
+
+
+async def setup_revalidate_post_quiz(app: FastAPI, client: ASGIClient,
+                                     params: dict) -> Callable[[int], Awaitable]:
+    collection = app.state.mongodb[database_name]['quizzes']
+    await collection.insert_many([make_quiz(post_id, params['questions']) for post_id in range(params['quizzes'])])
+    etags = []
+    for post_id in range(params['quizzes']):
+        await client.get(f'/post_quiz/{post_id}')
+        etags.append(client.last_headers['etag'])
+    rng = random.Random(SEED)
+
+    async def revalidate_post_quiz(n: int):
+        post_id = rng.randrange(params['quizzes'])
+        return await client.get(f'/post_quiz/{post_id}', headers={'If-None-Match': etags[post_id]})
+
+    return revalidate_post_quiz
+
+
+async def setup_pass_quiz(app: FastAPI, client: ASGIClient, params: dict) -> Callable[[int], Awaitable]:
+    status, body = await client.post('/quiz/', make_quiz(1, params['questions']))
+    quiz_id = json.loads(body)['_id']
+    rng = random.Random(SEED)
+    attempts = [{'user': str(uuid4()), 'quiz_id': quiz_id, 'answers': make_answers(params['questions'], rng)}
+                for _ in range(16)]
+
+    async def pass_quiz(n: int):
+        return await client.post('/attempt/', attempts[n % len(attempts)])
+
+    return pass_quiz
+
+
+async def setup_list_attempts(app: FastAPI, client: ASGIClient, params: dict) -> Callable[[int], Awaitable]:
+    rng = random.Random(SEED)
+    quiz_ids = [ObjectId() for _ in range(params['quizzes'])]
+    collection = app.state.mongodb[database_name]['attempts']
+    await collection.insert_many([make_attempt_document(quiz_ids[n % len(quiz_ids)], 10, rng)
+                                  for n in range(params['attempts'])])
+
+    async def list_attempts(n: int):
+        return await client.get('/attempt/', quiz_id=str(quiz_ids[n % len(quiz_ids)]))
+
+    return list_attempts
+
+
+def get_scenarios(quick: bool) -> list[Scenario]:
+    requests = 50 if quick else 300
+    scenarios = []
+    for questions in ((10, 100) if quick else (10, 100, 1000)):
+        scenario_requests = max(10, requests * 10 // questions) if questions > 100 else requests
+        scenarios.append(Scenario('POST /quiz/', {'questions': questions, 'requests': scenario_requests},
+                                  scenario_requests, setup_create_quiz))
+    for quizzes in ((100, 1000) if quick else (100, 1000, 10000)):
+        scenarios.append(Scenario('GET /post_quiz/{post_id}', {'quizzes': quizzes, 'questions': 20},
+                                  requests, setup_get_post_quiz))
+    scenarios.append(Scenario('GET /post_quiz/{post_id} 304', {'quizzes': 1000, 'questions': 20},
+                              requests, setup_revalidate_post_quiz))
+    scenarios.append(Scenario('POST /attempt/', {'questions': 20}, requests, setup_pass_quiz))
+    for attempts in ((1000, 10000) if quick else (1000, 10000, 100000)):
+        scenarios.append(Scenario('GET /attempt/?quiz_id=', {'attempts': attempts, 'quizzes': 10},
+                                  requests, setup_list_attempts))
+
+    return scenarios
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+async def run_scenario(scenario: Scenario) -> dict:
+    app = get_application()
+    await app.router.startup()
+    try:
+        client = ASGIClient(app)
+        make_request = await scenario.setup(app, client, scenario.params)
+        warmup = max(1, scenario.requests // 10)
+        sequence = iter(range(scenario.requests * 3))
+
+        for _ in range(warmup):
+            await make_request(next(sequence))
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(scenario.requests):
+            request_started = time.perf_counter()
+            status, _ = await make_request(next(sequence))
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            if status >= 400:
+                raise RuntimeError(f'{scenario.name} {scenario.params}: unexpected status {status}')
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        for _ in range(min(scenario.requests, MEMORY_PASS_REQUESTS)):
+            await make_request(next(sequence))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        await app.router.shutdown()
+
+    latencies.sort()
+    return {
+        'scenario': scenario.name,
+        'params': scenario.params,
+        'requests': scenario.requests,
+        'throughput_rps': round(scenario.requests / elapsed, 1),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+        },
+        'peak_memory_kb': round((peak - baseline) / 1024, 1),
+    }
+
+
+def get_metadata(quick: bool) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': quick,
+    }
+
+
+def result_key(result: dict) -> str:
+    params = ', '.join(f'{key}={value}' for key, value in result['params'].items() if key != 'requests')
+    return f'{result["scenario"]} ({params})'
+
+
+def print_results(results: list[dict]) -> None:
+    print(f'{"scenario":<58} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"peak KiB":>9}')
+    for result in results:
+        latency = result['latency_ms']
+        print(f'{result_key(result):<58} {result["throughput_rps"]:>8} {latency["p50"]:>8} {latency["p95"]:>8} '
+              f'{latency["p99"]:>8} {result["peak_memory_kb"]:>9}')
+
+
+def print_comparison(results: list[dict], baseline: dict) -> None:
+    baseline_results = {result_key(result): result for result in baseline['results']}
+    print(f'\nChange against baseline {baseline["meta"].get("commit")} (negative latency change is better)')
+    print(f'{"scenario":<58} {"rps":>9} {"p50":>9} {"p99":>9} {"peak mem":>9}')
+    for result in results:
+        old = baseline_results.get(result_key(result))
+        if old is None:
+            print(f'{result_key(result):<58} {"new":>9}')
+            continue
+
+        def change(new_value: float, old_value: float) -> str:
+            return f'{(new_value - old_value) / old_value * 100:+.1f}%' if old_value else 'n/a'
+
+        print(f'{result_key(result):<58} {change(result["throughput_rps"], old["throughput_rps"]):>9} '
+              f'{change(result["latency_ms"]["p50"], old["latency_ms"]["p50"]):>9} '
+              f'{change(result["latency_ms"]["p99"], old["latency_ms"]["p99"]):>9} '
+              f'{change(result["peak_memory_kb"], old["peak_memory_kb"]):>9}')
+
+
+async def run(quick: bool) -> list[dict]:
+    results = []
+    for scenario in get_scenarios(quick):
+        results.append(await run_scenario(scenario))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the API hot paths in-process')
+    parser.add_argument('--quick', action='store_true', help='fewer requests and smaller collections')
+    parser.add_argument('--save', metavar='NAME', help='save results to benchmarks/baselines/NAME.json')
+    parser.add_argument('--compare', metavar='FILE', type=Path, help='baseline JSON to compare results with')
+    args = parser.parse_args()
+
+    results = asyncio.get_event_loop().run_until_complete(run(args.quick))
+    print_results(results)
+
+    if args.compare is not None:
+        print_comparison(results, json.loads(args.compare.read_text()))
+    if args.save is not None:
+        BASELINES_DIR.mkdir(exist_ok=True)
+        path = BASELINES_DIR / f'{args.save}.json'
+        path.write_text(json.dumps({'meta': get_metadata(args.quick), 'results': results}, indent=2) + '\n')
+        print(f'\nSaved {path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Measure QuizInCreate validation time for large quizzes, comparing the type-dispatched
+validation with the previous two-pass approach (validate as QuestionInCreate, then re-create).
+
+Run from the repository root:
+    PYTHONPATH=app python benchmarks/bench_quiz_validation.py
+"""
+import time
+
+from models.quiz import QuizInCreate
+from models.quiz_question import QuestionInCreate
+
+QUESTION_COUNTS = (1000, 5000, 10000)
+ROUNDS = 5
+
+
+def make_quiz_data(question_count: int) -> dict:
+    questions = []
+    for i in range(question_count):
+        if i % 3 == 0:
+            questions.append({'description': f'Question {i}', 'type': 'text', 'answer': 'answer'})
+        elif i % 3 == 1:
+            questions.append({'description': f'Question {i}', 'type': 'radio',
+                              'options': ['option1', 'option2', 'option3'], 'answer': 2})
+        else:
+            questions.append({'description': f'Question {i}', 'type': 'checkbox',
+                              'options': ['option1', 'option2', 'option3'], 'answer': [0, 2]})
+
+    return {'post_id': 1, 'name': 'Benchmark quiz', 'description': 'Quiz with many questions', 'questions': questions}
+
+
+def two_pass(data: dict) -> list:
+    mapper = {model_class._question_type: model_class for model_class in QuestionInCreate.__subclasses__()}
+    questions = [QuestionInCreate.validate(question) for question in data['questions']]
+    return [mapper[question.type](**question.dict()) for question in questions]
+
+
+def single_pass(data: dict) -> list:
+    return QuizInCreate(**data).questions
+
+
+def measure(func, data: dict) -> float:
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        func(data)
+    return (time.process_time() - start) / ROUNDS * 1000
+
+
+def main():
+    print(f'{"questions":>10} {"two-pass, ms":>13} {"single-pass, ms":>16} {"speedup":>8}')
+    for count in QUESTION_COUNTS:
+        data = make_quiz_data(count)
+        old_ms = measure(two_pass, data)
+        new_ms = measure(single_pass, data)
+        print(f'{count:>10} {old_ms:>13.2f} {new_ms:>16.2f} {old_ms / new_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
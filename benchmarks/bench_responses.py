@@ -0,0 +1,70 @@
+"""
+Compare the default FastAPI response serialization of a full quiz with the trusted fast path.
+
+Run from the repository root:
+    PYTHONPATH=app python benchmarks/bench_responses.py
+"""
+import time
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from core.responses import BSONJSONResponse, get_include
+from models.quiz import QuizInDB, QuizInResponseFull
+
+QUESTION_COUNTS = (100, 1000, 5000)
+ROUNDS = 20
+
+
+def make_quiz(question_count: int) -> QuizInDB:
+    return QuizInDB(
+        _id=ObjectId(),
+        post_id=1,
+        name='Benchmark quiz',
+        description='Quiz with many questions',
+        questions=[
+            {
+                'description': f'Question {i}',
+                'media': None,
+                'type': 'checkbox',
+                'options': ['option1', 'option2', 'option3', 'option4'],
+                'answer': [0, 2],
+            }
+            for i in range(question_count)
+        ],
+    )
+
+
+async def default_path(quiz: QuizInDB, field) -> bytes:
+    content = await serialize_response(field=field, response_content=quiz)
+    return JSONResponse(content).body
+
+
+async def fast_path(quiz: QuizInDB, field) -> bytes:
+    include = get_include(QuizInResponseFull)
+    return BSONJSONResponse(quiz.dict(by_alias=True, include=include)).body
+
+
+async def measure(func, quiz: QuizInDB, field) -> float:
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        await func(quiz, field)
+    return (time.process_time() - start) / ROUNDS * 1000
+
+
+async def main():
+    field = create_response_field('response', QuizInResponseFull)
+    print(f'{"questions":>10} {"default, ms":>12} {"fast, ms":>10} {"speedup":>8}')
+    for count in QUESTION_COUNTS:
+        quiz = make_quiz(count)
+        default_ms = await measure(default_path, quiz, field)
+        fast_ms = await measure(fast_path, quiz, field)
+        print(f'{count:>10} {default_ms:>12.2f} {fast_ms:>10.2f} {default_ms / fast_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    import asyncio
+
+    asyncio.run(main())
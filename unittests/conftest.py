@@ -1,6 +1,13 @@
+import os
+
 import pytest
 from bson import ObjectId
 
+# there is no MongoDB server to run startup tasks against
+os.environ.setdefault('MONGO_CREATE_INDEXES', 'false')
+os.environ.setdefault('RESUME_QUIZ_DELETIONS', 'false')
+os.environ.setdefault('SLOW_QUERY_LOG', 'false')
+
 
 @pytest.fixture(scope='session')
 def quiz_data():
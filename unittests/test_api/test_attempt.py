@@ -0,0 +1,109 @@
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from main import app
+from models.attempt import AttemptInDB, AttemptSummary
+from services.attempt import AttemptService
+
+
+@pytest.fixture
+def attempt_data():
+    return {
+        'user': 'a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55',
+        'quiz_id': '6061ee7d0cdbf594cfa34114',
+        'answers': [{'value': [1, 3]}, {'value': 2}, {'value': 'Answer'}],
+    }
+
+
+def test_pass_quizzes_batch(monkeypatch, attempt_data):
+    attempt_id = ObjectId()
+
+    async def mock_pass_quizzes(self, attempts):
+        created = AttemptInDB(
+            **attempts[0].dict(exclude={'answers'}),
+            _id=attempt_id,
+            answers=[{**answer.dict(), 'is_correct': True} for answer in attempts[0].answers],
+            total_score=3
+        )
+        return [{'attempt': created, 'error': None}, {'attempt': None, 'error': 'There are no quizzes'}]
+
+    monkeypatch.setattr(AttemptService, 'pass_quizzes', mock_pass_quizzes)
+
+    with TestClient(app) as client:
+        response = client.post('/attempt/batch', json=[attempt_data, attempt_data])
+        assert response.status_code == 200
+
+        results = response.json()
+        assert results[0]['attempt']['_id'] == str(attempt_id)
+        assert results[0]['attempt']['total_score'] == 3
+        assert results[0]['error'] is None
+        assert results[1] == {'attempt': None, 'error': 'There are no quizzes'}
+
+
+def test_pass_quizzes_batch_empty():
+    with TestClient(app) as client:
+        response = client.post('/attempt/batch', json=[])
+        assert response.status_code == 422
+
+
+@pytest.mark.parametrize('params, content_encoding', [({}, None), ({'gzip': 'true'}, 'gzip')])
+def test_export_attempts_csv(monkeypatch, params, content_encoding):
+    received = {}
+
+    async def mock_export(self, quiz_id, batch_size):
+        received.update(quiz_id=quiz_id, batch_size=batch_size)
+
+        async def rows():
+            yield ['6061ee7d0cdbf594cfa34115', 'a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55', 1, 1, 0]
+
+        return ['attempt_id', 'user', 'total_score', 'question_1', 'question_2'], rows()
+
+    monkeypatch.setattr(AttemptService, 'export_by_quiz_id', mock_export)
+
+    with TestClient(app) as client:
+        response = client.get('/attempt/export', params={'quiz_id': '6061ee7d0cdbf594cfa34114', 'batch_size': 10,
+                                                         **params})
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'text/csv; charset=utf-8'
+        assert response.headers.get('content-encoding') == content_encoding
+        assert 'attempts_6061ee7d0cdbf594cfa34114.csv' in response.headers['content-disposition']
+        assert response.text.splitlines() == [
+            'attempt_id,user,total_score,question_1,question_2',
+            '6061ee7d0cdbf594cfa34115,a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55,1,1,0',
+        ]
+        assert received == {'quiz_id': '6061ee7d0cdbf594cfa34114', 'batch_size': 10}
+
+
+def test_export_attempts_unknown_format():
+    with TestClient(app) as client:
+        response = client.get('/attempt/export', params={'quiz_id': '6061ee7d0cdbf594cfa34114', 'format': 'xlsx'})
+        assert response.status_code == 422
+
+
+def test_get_attempts_by_user(monkeypatch, attempt_data):
+    received = {}
+
+    async def mock_get_by_user(self, user, limit, after, quiz_id, answers):
+        received.update(user=str(user), quiz_id=quiz_id, answers=answers)
+        return [AttemptSummary(**attempt_data, _id='6061ee7d0cdbf594cfa34115', total_score=2)], None
+
+    monkeypatch.setattr(AttemptService, 'get_by_user', mock_get_by_user)
+
+    with TestClient(app) as client:
+        response = client.get('/attempt/', params={'user': attempt_data['user'], 'quiz_id': attempt_data['quiz_id']})
+        assert response.status_code == 200
+        assert response.json() == {
+            'items': [{'_id': '6061ee7d0cdbf594cfa34115', 'user': attempt_data['user'],
+                       'quiz_id': attempt_data['quiz_id'], 'total_score': 2}],
+            'next_cursor': None
+        }
+        assert received == {'user': attempt_data['user'], 'quiz_id': attempt_data['quiz_id'], 'answers': False}
+
+
+@pytest.mark.parametrize('params', [{}, {'user': 'not a uuid'}])
+def test_get_attempts_invalid_filter(params):
+    with TestClient(app) as client:
+        response = client.get('/attempt/', params=params)
+        assert response.status_code == 422
@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from db.exceptions import DatabaseResultException
+from services.quiz import QuizService
+
+
+def test_metrics_by_route(monkeypatch, quiz_data):
+    async def mock_get(*args, **kwargs):
+        raise DatabaseResultException('There are no quizzes')
+
+    monkeypatch.setattr(QuizService, 'get_by_id', mock_get)
+
+    with TestClient(app) as client:
+        client.get(f'/quiz/{quiz_data["_id"]}')
+        client.get(f'/quiz/{quiz_data["_id"]}')
+        client.get('/quiz/', params={'limit': 0})
+
+        response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'http_request_duration_seconds_count{method="GET",route="/quiz/{quiz_id}"} 2' in response.text
+    assert 'http_requests_total{method="GET",route="/quiz/{quiz_id}",status="404"} 2' in response.text
+    assert 'http_requests_total{method="GET",route="/quiz/",status="422"} 1' in response.text
+    assert 'http_requests_in_flight{method="GET",route="/quiz/{quiz_id}"} 0' in response.text
+
+
+def test_metrics_of_caches():
+    with TestClient(app) as client:
+        response = client.get('/metrics')
+
+    assert 'cache_hits_total{cache="quiz"} 0' in response.text
+    assert 'cache_entries{cache="response"} 0' in response.text
@@ -1,6 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
 
+from db import mongodb
+from db.memory import MemoryCollection
+from models.quiz import QuizInDB
 from services.quiz import QuizService
 from main import app
 
@@ -57,3 +60,74 @@ def test_get_quiz_by_post_id(monkeypatch, quiz_data, expected_data_in_response):
         response = client.get('/post_quiz/123')
         assert response.status_code == 200
         assert response.json() == expected_data_in_response
+
+
+def test_get_quiz_by_post_id_trusted_model_has_no_answers(monkeypatch, quiz_data, expected_data_in_response):
+    async def mock_get(*args, **kwargs):
+        return QuizInDB(**quiz_data)
+
+    monkeypatch.setattr(QuizService, 'get_by_post_id', mock_get)
+
+    with TestClient(app) as client:
+        response = client.get('/post_quiz/123')
+        assert response.status_code == 200
+        assert response.json() == expected_data_in_response
+
+
+def test_get_quiz_by_post_id_not_modified(monkeypatch, quiz_data):
+    async def mock_get(*args, **kwargs):
+        return QuizInDB(**quiz_data)
+
+    monkeypatch.setattr(QuizService, 'get_by_post_id', mock_get)
+
+    with TestClient(app) as client:
+        etag = client.get('/post_quiz/123').headers['etag']
+        assert etag == f'"{quiz_data["_id"]}-0-QuizInResponsePartial"'
+
+        response = client.get('/post_quiz/123', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+
+def test_get_quiz_by_post_id_not_modified_without_db(monkeypatch, quiz_data):
+    monkeypatch.setattr(mongodb, 'MONGO_BACKEND', 'memory')
+    queries = []
+
+    def count_queries(method):
+        def counted(self, *args, **kwargs):
+            queries.append(args)
+            return method(self, *args, **kwargs)
+        return counted
+
+    with TestClient(app) as client:
+        client.post('/quiz/', json={key: value for key, value in quiz_data.items() if key != '_id'})
+        etag = client.get('/post_quiz/123').headers['etag']
+
+        monkeypatch.setattr(MemoryCollection, 'find', count_queries(MemoryCollection.find))
+        monkeypatch.setattr(MemoryCollection, 'find_one', count_queries(MemoryCollection.find_one))
+        response = client.get('/post_quiz/123', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert queries == []
+
+
+def test_get_quizzes_by_post_ids(monkeypatch, quiz_data, expected_data_in_response):
+    received = {}
+
+    async def mock_get_many(self, post_ids):
+        received['post_ids'] = post_ids
+        return {123: QuizInDB(**quiz_data), 5: None}
+
+    monkeypatch.setattr(QuizService, 'get_many_by_post_ids', mock_get_many)
+
+    with TestClient(app) as client:
+        response = client.get('/post_quiz/', params={'post_ids': '123,5,123'})
+        assert response.status_code == 200
+        assert response.json() == {'items': {'123': expected_data_in_response, '5': None}}
+        assert received['post_ids'] == [123, 5]
+
+
+@pytest.mark.parametrize('post_ids', ['', '1,,2', 'a', ','.join(map(str, range(101)))])
+def test_get_quizzes_by_post_ids_invalid(post_ids):
+    with TestClient(app) as client:
+        response = client.get('/post_quiz/', params={'post_ids': post_ids})
+        assert response.status_code == 422
@@ -1,3 +1,4 @@
+import json
 from copy import copy
 
 import pytest
@@ -5,7 +6,12 @@ from bson import ObjectId
 from fastapi.testclient import TestClient
 
 from app.main import app
+from core import responses
+from models.quiz import QuizImportResult, QuizInDB
+from models.quiz_deletion import QuizDeletion
 from services.quiz import QuizService
+from models.stats import QuizLeaderboard
+from services.stats import build_quiz_stats
 
 
 @pytest.fixture
@@ -55,14 +61,67 @@ def expected_data_in_response():
 
 def test_get_all_quizzes(monkeypatch, quiz_data, expected_data_in_response):
     async def mock_get_many(*args, **kwargs):
-        return [quiz_data]
+        return [quiz_data], None
 
     monkeypatch.setattr(QuizService, 'get_all', mock_get_many)
 
     with TestClient(app) as client:
         response = client.get('/quiz/')
         assert response.status_code == 200
-        assert response.json() == [expected_data_in_response]
+        assert response.json() == {'items': [expected_data_in_response], 'next_cursor': None}
+
+
+def test_get_all_quizzes_next_page(monkeypatch, quiz_data):
+    received = {}
+
+    async def mock_get_many(self, limit, after):
+        received.update(limit=limit, after=after)
+        return [quiz_data], quiz_data['_id']
+
+    monkeypatch.setattr(QuizService, 'get_all', mock_get_many)
+
+    with TestClient(app) as client:
+        response = client.get('/quiz/', params={'limit': 1})
+        assert response.status_code == 200
+        next_cursor = response.json()['next_cursor']
+        assert received == {'limit': 1, 'after': None}
+
+        response = client.get('/quiz/', params={'limit': 1, 'after': next_cursor})
+        assert response.status_code == 200
+        assert received == {'limit': 1, 'after': quiz_data['_id']}
+
+
+@pytest.mark.parametrize('params', [{'limit': 0}, {'after': 'not a cursor'}])
+def test_get_all_quizzes_invalid_page_params(params):
+    with TestClient(app) as client:
+        response = client.get('/quiz/', params=params)
+        assert response.status_code == 422
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', 'zzz', 'YWJj'])
+def test_get_all_quizzes_invalid_cursor(cursor):
+    with TestClient(app) as client:
+        response = client.get('/quiz/', params={'after': cursor})
+        assert response.status_code == 422
+        assert response.json()['detail'][0]['msg'] == 'Invalid cursor'
+
+
+def test_get_all_quizzes_stream(monkeypatch, quiz_data, expected_data_in_response):
+    received = {}
+
+    async def mock_iterate_all(self, batch_size):
+        received['batch_size'] = batch_size
+        for _ in range(2):
+            yield QuizInDB(**quiz_data)
+
+    monkeypatch.setattr(QuizService, 'iterate_all', mock_iterate_all)
+
+    with TestClient(app) as client:
+        response = client.get('/quiz/', params={'stream': True, 'batch_size': 10})
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        assert [json.loads(line) for line in response.text.splitlines()] == [expected_data_in_response] * 2
+        assert received == {'batch_size': 10}
 
 
 def test_get_quiz_by_id(monkeypatch, quiz_data, expected_data_in_response):
@@ -78,6 +137,95 @@ def test_get_quiz_by_id(monkeypatch, quiz_data, expected_data_in_response):
         assert response.json() == expected_data_in_response
 
 
+def test_get_quiz_by_id_trusted_model(monkeypatch, quiz_data, expected_data_in_response):
+    async def mock_get(*args, **kwargs):
+        return QuizInDB(**quiz_data)
+
+    monkeypatch.setattr(QuizService, 'get_by_id', mock_get)
+
+    with TestClient(app) as client:
+        response = client.get(f'/quiz/{quiz_data["_id"]}')
+        assert response.status_code == 200
+        assert response.json() == expected_data_in_response
+
+
+def test_get_quiz_by_id_etag(monkeypatch, quiz_data, expected_data_in_response):
+    quiz = QuizInDB(**quiz_data, version=2)
+
+    async def mock_get(*args, **kwargs):
+        return quiz
+
+    monkeypatch.setattr(QuizService, 'get_by_id', mock_get)
+
+    with TestClient(app) as client:
+        response = client.get(f'/quiz/{quiz_data["_id"]}')
+        etag = response.headers['etag']
+        assert response.json() == expected_data_in_response
+        assert etag == f'"{quiz_data["_id"]}-2-QuizInResponseFull"'
+
+        response = client.get(f'/quiz/{quiz_data["_id"]}', headers={'If-None-Match': f'"other", W/{etag}'})
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response.headers['etag'] == etag
+
+        quiz = QuizInDB(**quiz_data, version=3)
+        response = client.get(f'/quiz/{quiz_data["_id"]}', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+        assert app.state.response_cache.stats()['entries'] == 2
+
+
+def test_get_quiz_by_id_etag_untrusted(monkeypatch, quiz_data, expected_data_in_response):
+    async def mock_get(*args, **kwargs):
+        return QuizInDB(**quiz_data, version=2)
+
+    monkeypatch.setattr(QuizService, 'get_by_id', mock_get)
+    monkeypatch.setattr(responses, 'TRUSTED_DB_RESPONSES', False)
+
+    with TestClient(app) as client:
+        response = client.get(f'/quiz/{quiz_data["_id"]}')
+        etag = response.headers['etag']
+        assert response.json() == expected_data_in_response
+        assert etag == f'"{quiz_data["_id"]}-2-QuizInResponseFull"'
+
+        response = client.get(f'/quiz/{quiz_data["_id"]}', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['etag'] == etag
+        assert app.state.response_cache.stats()['entries'] == 0
+
+
+def test_get_all_quizzes_trusted_models(monkeypatch, quiz_data, expected_data_in_response):
+    async def mock_get_many(*args, **kwargs):
+        return [QuizInDB(**quiz_data)], quiz_data['_id']
+
+    monkeypatch.setattr(QuizService, 'get_all', mock_get_many)
+
+    with TestClient(app) as client:
+        response = client.get('/quiz/')
+        assert response.status_code == 200
+        assert response.json()['items'] == [expected_data_in_response]
+        assert response.json()['next_cursor'] is not None
+
+
+def test_get_quiz_stats(monkeypatch, quiz_data):
+    async def mock_get_stats(*args, **kwargs):
+        return build_quiz_stats(quiz_data['_id'], {1: 1, 3: 1}, {0: {'answered': 2, 'correct': 1}})
+
+    monkeypatch.setattr(QuizService, 'get_stats', mock_get_stats)
+
+    with TestClient(app) as client:
+        response = client.get(f'/quiz/{quiz_data["_id"]}/stats')
+        assert response.status_code == 200
+        assert response.json() == {
+            'quiz_id': str(quiz_data['_id']),
+            'attempts': 2,
+            'mean_score': 2.0,
+            'median_score': 2.0,
+            'histogram': [{'score': 1, 'count': 1}, {'score': 3, 'count': 1}],
+            'questions': [{'index': 0, 'answered': 2, 'correct_ratio': 0.5}]
+        }
+
+
 def test_create_quiz(monkeypatch, quiz_data, expected_data_in_response):
     async def mock_create(*args, **kwargs):
         return quiz_data
@@ -109,11 +257,78 @@ def test_update_quiz(monkeypatch, quiz_data, expected_data_in_response):
 
 
 def test_delete_quiz(monkeypatch):
+    purged = []
+
     async def mock_delete(*args, **kwargs):
         return
 
+    async def mock_purge_attempts(self, quiz_id):
+        purged.append(quiz_id)
+
     monkeypatch.setattr(QuizService, 'delete', mock_delete)
+    monkeypatch.setattr(QuizService, 'purge_attempts', mock_purge_attempts)
 
     with TestClient(app) as client:
         response = client.delete('/quiz/<some_id>')
         assert response.status_code == 204
+        assert purged == ['<some_id>']
+
+
+def test_get_quiz_deletion(monkeypatch, quiz_data):
+    async def mock_get_deletion(*args, **kwargs):
+        return QuizDeletion(_id=quiz_data['_id'], deleted_attempts=1500)
+
+    monkeypatch.setattr(QuizService, 'get_deletion', mock_get_deletion)
+
+    with TestClient(app) as client:
+        response = client.get(f'/quiz/{quiz_data["_id"]}/deletion')
+        assert response.status_code == 200
+        assert response.json() == {'_id': str(quiz_data['_id']), 'deleted_attempts': 1500, 'finished': False}
+
+
+def test_import_quizzes(monkeypatch):
+    received = []
+
+    async def mock_import(self, chunks, chunk_size, max_line_size):
+        async for chunk in chunks:
+            received.append(chunk)
+        yield QuizImportResult(line=1, quiz_id=ObjectId('6061ee7d0cdbf594cfa34114'))
+        yield QuizImportResult(line=2, error='Invalid quiz')
+
+    monkeypatch.setattr(QuizService, 'import_quizzes', mock_import)
+
+    with TestClient(app) as client:
+        response = client.post('/quiz/import', data=b'{}\n{}\n', params={'chunk_size': 10})
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/x-ndjson'
+        assert [json.loads(line) for line in response.text.splitlines()] == [
+            {'line': 1, 'quiz_id': '6061ee7d0cdbf594cfa34114', 'error': None},
+            {'line': 2, 'quiz_id': None, 'error': 'Invalid quiz'},
+        ]
+        assert b''.join(received) == b'{}\n{}\n'
+
+
+def test_get_quiz_leaderboard(monkeypatch, quiz_data):
+    received = {}
+
+    async def mock_get_leaderboard(self, quiz_id, limit):
+        received.update(quiz_id=quiz_id, limit=limit)
+        return QuizLeaderboard(quiz_id=quiz_id, positions=[{
+            'rank': 1, 'user': 'a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55', 'total_score': 3,
+            'attempt_id': '6061ee7d0cdbf594cfa34115'
+        }])
+
+    monkeypatch.setattr(QuizService, 'get_leaderboard', mock_get_leaderboard)
+
+    with TestClient(app) as client:
+        response = client.get(f'/quiz/{quiz_data["_id"]}/leaderboard', params={'limit': 10})
+        assert response.status_code == 200
+        assert response.json() == {
+            'quiz_id': str(quiz_data['_id']),
+            'positions': [{'rank': 1, 'user': 'a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55', 'total_score': 3,
+                           'attempt_id': '6061ee7d0cdbf594cfa34115'}]
+        }
+        assert received == {'quiz_id': str(quiz_data['_id']), 'limit': 10}
+
+        response = client.get(f'/quiz/{quiz_data["_id"]}/leaderboard', params={'limit': 101})
+        assert response.status_code == 422
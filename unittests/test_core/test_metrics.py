@@ -0,0 +1,65 @@
+import threading
+
+from core.metrics import Counter, Gauge, Histogram, Metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, '/quiz/')
+
+    assert list(histogram.render()) == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/quiz/",le="0.1"} 2',
+        'latency_seconds_bucket{route="/quiz/",le="1.0"} 3',
+        'latency_seconds_bucket{route="/quiz/",le="+Inf"} 4',
+        'latency_seconds_sum{route="/quiz/"} 2.65',
+        'latency_seconds_count{route="/quiz/"} 4',
+    ]
+
+
+def test_shards_of_threads_are_summed():
+    counter = Counter('requests_total', 'Requests', ('status',))
+    gauge = Gauge('in_flight', 'In flight')
+
+    def work():
+        for _ in range(1000):
+            counter.inc('200')
+        gauge.dec()
+
+    gauge.inc(amount=4)
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert list(counter.render())[-1] == 'requests_total{status="200"} 4000'
+    assert list(gauge.render())[-1] == 'in_flight 0'
+
+
+def test_label_values_are_escaped():
+    counter = Counter('requests_total', 'Requests', ('route',))
+    counter.inc('/"quoted"\\')
+
+    assert list(counter.render())[-1] == 'requests_total{route="/\\"quoted\\"\\\\"} 1'
+
+
+def test_metrics_render_all():
+    text = Metrics().render()
+
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert '# TYPE mongodb_pool_checkout_wait_seconds histogram' in text
+    assert text.endswith('\n')
+
+
+def test_registered_cache_stats_are_rendered():
+    metrics = Metrics()
+    metrics.caches.register('quiz', lambda: {'hits': 3, 'misses': 1, 'evictions': 0, 'entries': 1, 'size': 120})
+
+    text = metrics.render()
+
+    assert '# TYPE cache_hits_total counter' in text
+    assert 'cache_hits_total{cache="quiz"} 3' in text
+    assert 'cache_size_bytes{cache="quiz"} 120' in text
@@ -0,0 +1,31 @@
+import pytest
+
+from core.ndjson import iterate_lines
+
+
+async def make_chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(chunks, max_line_size=10):
+    return [line async for line in iterate_lines(chunks, max_line_size)]
+
+
+@pytest.mark.asyncio
+async def test_lines_split_across_chunks():
+    chunks = make_chunks(b'{"a"', b':1}\n{"b":2}\n\n{"c"', b':3}')
+
+    assert await collect(chunks) == [b'{"a":1}', b'{"b":2}', b'', b'{"c":3}']
+
+
+@pytest.mark.asyncio
+async def test_too_long_lines_are_skipped():
+    chunks = make_chunks(b'short\n0123456789', b'0123456789', b'01\nok\n0123456789ab\n', b'0123456789abc')
+
+    assert await collect(chunks) == [b'short', None, b'ok', None, None]
+
+
+@pytest.mark.asyncio
+async def test_line_of_max_size():
+    assert await collect(make_chunks(b'01234', b'56789\n')) == [b'0123456789']
@@ -0,0 +1,46 @@
+from core.response_cache import ResponseCache
+
+
+def test_get_put():
+    cache = ResponseCache(max_entries=10, max_size=100)
+
+    assert cache.get(('quiz', 1)) is None
+    cache.put(('quiz', 1), b'body')
+
+    assert cache.get(('quiz', 1)) == b'body'
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1, 'size': 4}
+
+
+def test_evicts_least_recently_used_by_count():
+    cache = ResponseCache(max_entries=2, max_size=100)
+    cache.put(1, b'a')
+    cache.put(2, b'b')
+    cache.get(1)
+    cache.put(3, b'c')
+
+    assert cache.get(2) is None
+    assert cache.get(1) == b'a'
+    assert cache.get(3) == b'c'
+    assert cache.evictions == 1
+
+
+def test_evicts_by_size():
+    cache = ResponseCache(max_entries=10, max_size=10)
+    cache.put(1, b'12345')
+    cache.put(2, b'123456')
+
+    assert cache.get(1) is None
+    assert cache.stats()['size'] == 6
+
+    cache.put(3, b'12345678901')  # larger than the whole cache
+    assert cache.get(3) is None
+    assert cache.get(2) == b'123456'
+
+
+def test_put_replaces_body():
+    cache = ResponseCache(max_entries=10, max_size=100)
+    cache.put(1, b'old body')
+    cache.put(1, b'new')
+
+    assert cache.get(1) == b'new'
+    assert cache.stats()['size'] == 3
@@ -0,0 +1,64 @@
+import gzip
+import json
+from uuid import UUID
+
+import pytest
+from bson import ObjectId
+
+from core.responses import BSONJSONResponse, etag_matches, get_include, gzip_chunks
+from models.attempt import AttemptInResponse
+from models.quiz import QuizInResponsePartial
+
+
+def test_bson_json_response_encodes_bson_types():
+    object_id = ObjectId()
+    user = UUID('a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55')
+
+    response = BSONJSONResponse({'_id': object_id, 'user': user, 'name': 'Квіз'})
+
+    assert json.loads(response.body) == {'_id': str(object_id), 'user': str(user), 'name': 'Квіз'}
+
+
+def test_bson_json_response_unknown_type():
+    with pytest.raises(TypeError):
+        BSONJSONResponse({'value': object()})
+
+
+def test_get_include_nested_list():
+    assert get_include(QuizInResponsePartial) == {
+        'id': ...,
+        'name': ...,
+        'post_id': ...,
+        'description': ...,
+        'questions': {'__all__': {'description': ..., 'media': ..., 'type': ..., 'options': ...}},
+    }
+
+
+def test_get_include_attempt():
+    include = get_include(AttemptInResponse)
+
+    assert include['answers'] == {'__all__': {'value': ..., 'is_correct': ...}}
+    assert include['total_score'] is ...
+
+
+@pytest.mark.parametrize('if_none_match, matches', [
+    (None, False),
+    ('"a-1"', True),
+    ('W/"a-1"', True),
+    ('"b-1", "a-1"', True),
+    ('*', True),
+    ('"a-2"', False),
+])
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, '"a-1"') is matches
+
+
+@pytest.mark.asyncio
+async def test_gzip_chunks():
+    async def chunks():
+        for n in range(100):
+            yield f'row {n}\n'.encode()
+
+    compressed = b''.join([chunk async for chunk in gzip_chunks(chunks())])
+
+    assert gzip.decompress(compressed) == b''.join(f'row {n}\n'.encode() for n in range(100))
@@ -0,0 +1,60 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from core.config import database_name
+from crud.attempt import AttemptCRUD
+
+
+class MockMongoDBClient:
+    def __init__(self, collection):
+        self.__mocked_db = {database_name: {'attempts': collection}}
+
+    def __getitem__(self, item):
+        return self.__mocked_db[item]
+
+
+class MockMongoDBCollection:
+    def __init__(self, failed_indexes=()):
+        self.failed_indexes = failed_indexes
+
+    async def insert_many(self, documents, *args, **kwargs):
+        for document in documents:
+            document['_id'] = ObjectId()
+
+        if self.failed_indexes:
+            write_errors = [{'index': index, 'errmsg': 'duplicate key error'} for index in self.failed_indexes]
+            raise BulkWriteError({'writeErrors': write_errors})
+
+
+@pytest.fixture
+def attempts_data():
+    return [
+        {
+            'user': 'a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55',
+            'quiz_id': ObjectId('6061ee7d0cdbf594cfa34114'),
+            'answers': [{'value': 2, 'is_correct': True}],
+            'total_score': 1
+        }
+        for _ in range(3)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_create_many_success(attempts_data):
+    crud = AttemptCRUD(MockMongoDBClient(MockMongoDBCollection()))
+    attempts, errors = await crud.create_many(attempts_data)
+
+    assert errors == {}
+    assert [attempt.id for attempt in attempts] == [attempt['_id'] for attempt in attempts_data]
+
+
+@pytest.mark.asyncio
+async def test_create_many_partial_failure(attempts_data):
+    crud = AttemptCRUD(MockMongoDBClient(MockMongoDBCollection(failed_indexes=[1])))
+    attempts, errors = await crud.create_many(attempts_data)
+
+    assert errors == {1: 'duplicate key error'}
+    assert attempts[1] is None
+    assert attempts[0].id == attempts_data[0]['_id']
+    assert attempts[2].id == attempts_data[2]['_id']
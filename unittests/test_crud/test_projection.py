@@ -0,0 +1,35 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from crud.projection import get_projection
+from models.quiz import QuizPartial
+
+
+class NestedModel(BaseModel):
+    value: int
+
+
+class ModelWithNestedFields(BaseModel):
+    name: str
+    nested: NestedModel
+    nested_list: list[NestedModel]
+    optional_nested: Optional[NestedModel]
+    values: list[int]
+
+
+def test_get_projection_nested_fields():
+    assert get_projection(ModelWithNestedFields) == {
+        'name': 1,
+        'nested.value': 1,
+        'nested_list.value': 1,
+        'optional_nested.value': 1,
+        'values': 1,
+    }
+
+
+def test_get_projection_partial_quiz_has_no_answers():
+    projection = get_projection(QuizPartial)
+    assert projection['_id'] == 1
+    assert 'questions.description' in projection
+    assert not any(path.endswith('answer') for path in projection)
@@ -1,6 +1,8 @@
 from copy import copy
 
 import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from core.config import database_name
 from db.exceptions import DatabaseResultException
@@ -63,12 +65,43 @@ class MockMongoDBCollectionCreateSuccess(MockMongoDBCollection):
         return None
 
 
+class MockMongoDBCollectionDuplicate(MockMongoDBCollection):
+    async def insert_one(self, *args, **kwargs):
+        raise DuplicateKeyError('E11000 duplicate key error')
+
+    async def find_one_and_update(self, *args, **kwargs):
+        raise DuplicateKeyError('E11000 duplicate key error')
+
+    async def create_indexes(self, indexes, *args, **kwargs):
+        self.indexes = indexes
+
+
+class MockMongoDBCollectionTwoDocuments(MockMongoDBCollection):
+    def find(self, *args, **kwargs):
+        second_quiz_data = copy(self.quiz_data)
+        second_quiz_data['_id'] = ObjectId()
+        return MockMongoDBCursor(self.quiz_data, second_quiz_data)
+
+
 class MockMongoDBCursor:
-    def __init__(self, quiz_data):
-        self.quiz_data = quiz_data
+    def __init__(self, *quiz_data):
+        self.quiz_data = list(quiz_data)
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
+
+    def batch_size(self, *args, **kwargs):
+        return self
+
+    async def __aiter__(self):
+        for document in self.quiz_data:
+            yield document
 
     async def to_list(self, *args, **kwargs):
-        return [self.quiz_data]
+        return self.quiz_data
 
 
 class MockMongoDBInsertResult:
@@ -89,6 +122,7 @@ class MockMongoDBDeleteResultException:
 def simulate_quiz_data_validation(data):
     simulated_data = copy(data)
     simulated_data['id'] = simulated_data.pop('_id')
+    simulated_data.setdefault('version', 0)
     return simulated_data
 
 
@@ -119,6 +153,32 @@ async def test_get_many_success(quiz_data):
         assert quiz_result.dict() == expected_quiz
 
 
+@pytest.mark.asyncio
+async def test_get_page_last_page(quiz_data):
+    crud = QuizCRUD(MockMongoDBClient(quiz_data))
+    result, next_id = await crud.get_page(limit=10)
+    assert len(result) == 1
+    assert next_id is None
+
+
+@pytest.mark.asyncio
+async def test_get_page_has_next_page(quiz_data):
+    crud = QuizCRUD(MockMongoDBClient(quiz_data, collection_class=MockMongoDBCollectionTwoDocuments))
+    result, next_id = await crud.get_page(limit=1)
+    assert len(result) == 1
+    assert next_id == quiz_data['_id']
+
+
+@pytest.mark.asyncio
+async def test_iterate(quiz_data):
+    expected_quiz_data = simulate_quiz_data_validation(quiz_data)
+
+    crud = QuizCRUD(MockMongoDBClient(quiz_data, collection_class=MockMongoDBCollectionTwoDocuments))
+    result = [quiz async for quiz in crud.iterate(batch_size=1)]
+    assert len(result) == 2
+    assert result[0].dict() == expected_quiz_data
+
+
 @pytest.mark.asyncio
 async def test_create_success(quiz_data):
     crud = QuizCRUD(MockMongoDBClient(quiz_data, collection_class=MockMongoDBCollectionCreateSuccess))
@@ -133,7 +193,7 @@ async def test_create_success(quiz_data):
 
 @pytest.mark.asyncio
 async def test_create_post_id_exists(quiz_data):
-    crud = QuizCRUD(MockMongoDBClient(quiz_data))
+    crud = QuizCRUD(MockMongoDBClient(quiz_data, collection_class=MockMongoDBCollectionDuplicate))
 
     quiz_data = copy(quiz_data)
     quiz_data.pop('_id')
@@ -153,6 +213,27 @@ async def test_update_success(quiz_data):
     assert result.dict() == expected_quiz_data
 
 
+@pytest.mark.asyncio
+async def test_update_post_id_exists(quiz_data):
+    crud = QuizCRUD(MockMongoDBClient(quiz_data, collection_class=MockMongoDBCollectionDuplicate))
+
+    quiz_data = copy(quiz_data)
+    quiz_id = quiz_data.pop('_id')
+
+    with pytest.raises(DatabaseResultException):
+        await crud.update(quiz_id, quiz_data)
+
+
+@pytest.mark.asyncio
+async def test_create_indexes(quiz_data):
+    client = MockMongoDBClient(quiz_data, collection_class=MockMongoDBCollectionDuplicate)
+    await QuizCRUD(client).create_indexes()
+
+    [index] = client[database_name]['quizzes'].indexes
+    assert index.document['key'] == {'post_id': 1}
+    assert index.document['unique'] is True
+
+
 @pytest.mark.asyncio
 async def test_update_exception(quiz_data):
     crud = QuizCRUD(MockMongoDBClient(quiz_data, collection_class=MockMongoDBCollectionException))
@@ -0,0 +1,96 @@
+import pytest
+from bson import ObjectId
+
+from core.config import database_name
+from crud.quiz_stats import QuizStatsCRUD
+from models.attempt import AttemptInDB
+from models.stats import QuizStatsCounters
+
+
+class MockMongoDBClient:
+    def __init__(self, collection):
+        self.__mocked_db = {database_name: {'quiz_stats': collection}}
+
+    def __getitem__(self, item):
+        return self.__mocked_db[item]
+
+
+class MockMongoDBCollection:
+    def __init__(self, document=None):
+        self.document = document
+        self.operations = []
+        self.replaced = None
+
+    async def find_one(self, *args, **kwargs):
+        return self.document
+
+    async def bulk_write(self, operations, *args, **kwargs):
+        self.operations.extend(operations)
+
+    async def replace_one(self, query, document, *args, **kwargs):
+        self.replaced = document
+
+
+@pytest.fixture
+def attempt():
+    return AttemptInDB(
+        _id=ObjectId(),
+        user='a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55',
+        quiz_id=ObjectId('6061ee7d0cdbf594cfa34114'),
+        answers=[{'value': 1, 'is_correct': True}, {'value': 'answer', 'is_correct': False}],
+        total_score=1
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('sign', [1, -1])
+async def test_record(attempt, sign):
+    collection = MockMongoDBCollection()
+    await QuizStatsCRUD(MockMongoDBClient(collection)).record([attempt], sign=sign)
+
+    [operation] = collection.operations
+    assert operation._filter == {'_id': attempt.quiz_id}
+    assert operation._doc == {'$inc': {
+        'attempts': sign,
+        'score_sum': sign,
+        'histogram.1': sign,
+        'questions.0.answered': sign,
+        'questions.0.correct': sign,
+        'questions.1.answered': sign,
+        'questions.1.correct': 0,
+    }}
+    assert operation._upsert is True
+
+
+@pytest.mark.asyncio
+async def test_get_counters(attempt):
+    document = {
+        '_id': attempt.quiz_id,
+        'attempts': 2,
+        'score_sum': 3,
+        'histogram': {'1': 1, '2': 1},
+        'questions': {'0': {'answered': 2, 'correct': 1}}
+    }
+    counters = await QuizStatsCRUD(MockMongoDBClient(MockMongoDBCollection(document))).get_counters(attempt.quiz_id)
+
+    assert counters.histogram == {1: 1, 2: 1}
+    assert counters.questions[0].correct == 1
+
+
+@pytest.mark.asyncio
+async def test_get_counters_no_attempts(attempt):
+    counters = await QuizStatsCRUD(MockMongoDBClient(MockMongoDBCollection())).get_counters(attempt.quiz_id)
+
+    assert counters.id == attempt.quiz_id
+    assert counters.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_replace_uses_string_keys(attempt):
+    collection = MockMongoDBCollection()
+    counters = QuizStatsCounters(_id=attempt.quiz_id, attempts=1, score_sum=2, histogram={2: 1},
+                                 questions={0: {'answered': 1, 'correct': 1}})
+    await QuizStatsCRUD(MockMongoDBClient(collection)).replace(counters)
+
+    assert collection.replaced['histogram'] == {'2': 1}
+    assert collection.replaced['questions'] == {'0': {'answered': 1, 'correct': 1}}
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, ServerSelectionTimeoutError
+
+from db.batcher import InsertBatcher
+
+
+class MockMongoDBCollection:
+    def __init__(self, failed_indexes=(), exception=None):
+        self.failed_indexes = failed_indexes
+        self.exception = exception
+        self.batches = []
+
+    async def insert_many(self, documents, *args, **kwargs):
+        self.batches.append(list(documents))
+        if self.exception is not None:
+            raise self.exception
+
+        for document in documents:
+            document['_id'] = ObjectId()
+
+        if self.failed_indexes:
+            write_errors = [{'index': index, 'code': 11000, 'errmsg': 'duplicate key error'}
+                            for index in self.failed_indexes]
+            raise BulkWriteError({'writeErrors': write_errors})
+
+
+@pytest.mark.asyncio
+async def test_flush_by_size():
+    collection = MockMongoDBCollection()
+    batcher = InsertBatcher(collection, max_size=3, max_delay=60)
+
+    documents = [{'n': n} for n in range(3)]
+    inserted_ids = await asyncio.gather(*(batcher.insert(document) for document in documents))
+
+    assert len(collection.batches) == 1
+    assert inserted_ids == [document['_id'] for document in documents]
+
+
+@pytest.mark.asyncio
+async def test_flush_by_window():
+    collection = MockMongoDBCollection()
+    batcher = InsertBatcher(collection, max_size=100, max_delay=0.01)
+
+    await asyncio.gather(*(batcher.insert({'n': n}) for n in range(5)))
+
+    assert [len(batch) for batch in collection.batches] == [5]
+
+
+@pytest.mark.asyncio
+async def test_per_document_errors():
+    collection = MockMongoDBCollection(failed_indexes=[1])
+    batcher = InsertBatcher(collection, max_size=3, max_delay=60)
+
+    results = await asyncio.gather(*(batcher.insert({'n': n}) for n in range(3)), return_exceptions=True)
+
+    assert isinstance(results[0], ObjectId)
+    assert isinstance(results[1], DuplicateKeyError)
+    assert isinstance(results[2], ObjectId)
+
+
+@pytest.mark.asyncio
+async def test_batch_error_is_propagated_to_every_caller():
+    collection = MockMongoDBCollection(exception=ServerSelectionTimeoutError('no servers'))
+    batcher = InsertBatcher(collection, max_size=2, max_delay=60)
+
+    results = await asyncio.gather(*(batcher.insert({'n': n}) for n in range(2)), return_exceptions=True)
+
+    assert all(isinstance(result, ServerSelectionTimeoutError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_close_drains_buffer():
+    collection = MockMongoDBCollection()
+    batcher = InsertBatcher(collection, max_size=100, max_delay=60)
+
+    pending = asyncio.ensure_future(batcher.insert({'n': 1}))
+    await asyncio.sleep(0)
+    await batcher.close()
+
+    assert isinstance(await pending, ObjectId)
+    assert len(collection.batches) == 1
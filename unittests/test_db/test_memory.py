@@ -0,0 +1,223 @@
+from uuid import uuid4
+
+import pytest
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from core.config import database_name
+from crud.attempt import AttemptCRUD
+from crud.quiz import QuizCRUD
+from db.exceptions import DatabaseResultException
+from db.memory import MemoryClient
+from models.attempt import AttemptInCreate
+from models.quiz import QuizInCreate, QuizPartial
+from services.attempt import AttemptService
+from services.leaderboard import LeaderboardCache
+from services.quiz import QuizService
+from services.quiz_cache import QuizCache
+
+
+@pytest.fixture
+def collection():
+    return MemoryClient()[database_name]['test']
+
+
+@pytest.fixture
+def client():
+    return MemoryClient()
+
+
+@pytest.mark.asyncio
+async def test_insert_and_find(collection):
+    document = {'name': 'first', 'tags': ['a', 'b']}
+    result = await collection.insert_one(document)
+
+    assert document['_id'] == result.inserted_id
+    found = await collection.find_one({'_id': result.inserted_id})
+    assert found == document
+    found['tags'].append('c')  # returned documents are copies
+    assert (await collection.find_one({'name': 'first'}))['tags'] == ['a', 'b']
+
+
+@pytest.mark.asyncio
+async def test_find_filters_sort_limit(collection):
+    await collection.insert_many([{'_id': n, 'group': n % 2, 'tags': [n]} for n in range(10)])
+
+    assert [d['_id'] for d in await collection.find({'group': 1}).to_list(length=None)] == [1, 3, 5, 7, 9]
+    assert [d['_id'] for d in await collection.find({'_id': {'$in': [2, 4, 42]}}).to_list(length=None)] == [2, 4]
+    assert [d['_id'] for d in await collection.find({'tags': 3}).to_list(length=None)] == [3]
+
+    cursor = collection.find({'_id': {'$gt': 3}}).sort('_id', DESCENDING).limit(3)
+    assert [d['_id'] for d in await cursor.to_list(length=3)] == [9, 8, 7]
+
+
+@pytest.mark.asyncio
+async def test_find_projection(collection):
+    await collection.insert_one({'_id': 1, 'name': 'quiz', 'questions': [{'description': 'q', 'answer': 1}]})
+
+    assert await collection.find_one({}, {'name': 1}) == {'_id': 1, 'name': 'quiz'}
+    projected = await collection.find_one({}, {'_id': 0, 'questions.description': 1})
+    assert projected == {'questions': [{'description': 'q'}]}
+    assert await collection.find_one({}, {'questions': 0}) == {'_id': 1, 'name': 'quiz'}
+
+
+@pytest.mark.asyncio
+async def test_async_iteration(collection):
+    await collection.insert_many([{'_id': n} for n in range(5)])
+
+    assert [document['_id'] async for document in collection.find({}).batch_size(2)] == list(range(5))
+
+
+@pytest.mark.asyncio
+async def test_unique_index(collection):
+    await collection.create_indexes([IndexModel([('post_id', ASCENDING)], unique=True)])
+    await collection.insert_one({'post_id': 1})
+
+    with pytest.raises(DuplicateKeyError):
+        await collection.insert_one({'post_id': 1})
+
+    other = {'post_id': 2}
+    await collection.insert_one(other)
+    with pytest.raises(DuplicateKeyError):
+        await collection.update_one({'_id': other['_id']}, {'$set': {'post_id': 1}})
+
+    await collection.delete_one({'post_id': 1})
+    await collection.update_one({'_id': other['_id']}, {'$set': {'post_id': 1}})
+    assert await collection.count_documents({'post_id': 1}) == 1
+
+
+@pytest.mark.asyncio
+async def test_index_lookup_follows_updates(collection):
+    await collection.create_indexes([IndexModel([('quiz_id', ASCENDING), ('_id', ASCENDING)])])
+    await collection.insert_many([{'_id': n, 'quiz_id': 'a' if n < 3 else 'b'} for n in range(5)])
+    await collection.update_many({'quiz_id': 'a'}, {'$set': {'quiz_id': 'c'}})
+
+    assert await collection.count_documents({'quiz_id': 'a'}) == 0
+    assert [d['_id'] for d in await collection.find({'quiz_id': {'$in': ['b', 'c']}}).to_list(length=None)] == [
+        3, 4, 0, 1, 2
+    ]
+
+
+@pytest.mark.asyncio
+async def test_insert_many_unordered_errors(collection):
+    await collection.insert_one({'_id': 1})
+
+    with pytest.raises(BulkWriteError) as exc_info:
+        await collection.insert_many([{'_id': 0}, {'_id': 1}, {'_id': 2}], ordered=False)
+
+    assert [error['index'] for error in exc_info.value.details['writeErrors']] == [1]
+    assert exc_info.value.details['writeErrors'][0]['code'] == 11000
+    assert await collection.count_documents({}) == 3
+
+
+@pytest.mark.asyncio
+async def test_find_one_and_update_upsert(collection):
+    update = {'$setOnInsert': {'deleted': 0}, '$set': {'finished': False}}
+    created = await collection.find_one_and_update({'_id': 1}, update, upsert=True,
+                                                   return_document=ReturnDocument.AFTER)
+    assert created == {'_id': 1, 'deleted': 0, 'finished': False}
+
+    await collection.update_one({'_id': 1}, {'$inc': {'deleted': 5}})
+    before = await collection.find_one_and_update({'_id': 1}, update, upsert=True)
+    assert before == {'_id': 1, 'deleted': 5, 'finished': False}
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_dotted_inc(collection):
+    result = await collection.bulk_write([
+        UpdateOne({'_id': 1}, {'$inc': {'attempts': 1, 'histogram.3': 1}}, upsert=True),
+        UpdateOne({'_id': 1}, {'$inc': {'attempts': 1, 'histogram.3': 1, 'histogram.1': 1}}, upsert=True),
+    ], ordered=False)
+
+    assert result.upserted_count == 1
+    assert result.modified_count == 1
+    assert await collection.find_one({'_id': 1}) == {'_id': 1, 'attempts': 2, 'histogram': {'3': 2, '1': 1}}
+
+
+@pytest.mark.asyncio
+async def test_find_one_and_delete(collection):
+    await collection.insert_one({'_id': 1})
+
+    assert await collection.find_one_and_delete({'_id': 1}) == {'_id': 1}
+    assert await collection.find_one_and_delete({'_id': 1}) is None
+
+
+@pytest.mark.asyncio
+async def test_aggregate_facet(collection):
+    await collection.insert_many([
+        {'quiz_id': 1, 'total_score': 1, 'answers': [{'is_correct': True}, {'is_correct': False}]},
+        {'quiz_id': 1, 'total_score': 2, 'answers': [{'is_correct': True}, {'is_correct': True}]},
+        {'quiz_id': 2, 'total_score': 0, 'answers': [{'is_correct': False}]},
+    ])
+    pipeline = [
+        {'$match': {'quiz_id': 1}},
+        {'$facet': {
+            'histogram': [{'$group': {'_id': '$total_score', 'count': {'$sum': 1}}}, {'$sort': {'_id': 1}}],
+            'questions': [
+                {'$unwind': {'path': '$answers', 'includeArrayIndex': 'index'}},
+                {'$group': {'_id': '$index', 'correct': {'$sum': {'$cond': ['$answers.is_correct', 1, 0]}}}},
+            ],
+        }},
+    ]
+
+    [result] = await collection.aggregate(pipeline).to_list(length=1)
+
+    assert result == {
+        'histogram': [{'_id': 1, 'count': 1}, {'_id': 2, 'count': 1}],
+        'questions': [{'_id': 0, 'correct': 2}, {'_id': 1, 'correct': 1}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_crud_on_memory_backend(client, quiz_data):
+    quiz_crud = QuizCRUD(client)
+    await quiz_crud.create_indexes()
+    quiz_fields = {key: value for key, value in quiz_data.items() if key != '_id'}
+    quiz = await quiz_crud.create(dict(quiz_fields))
+
+    with pytest.raises(DatabaseResultException):
+        await quiz_crud.create(dict(quiz_fields))
+    assert (await quiz_crud.get(post_id=quiz_data['post_id'], model=QuizPartial)).id == quiz.id
+
+    assert quiz.version == 0
+    assert (await quiz_crud.update(quiz.id, dict(quiz_fields, name='new name'))).version == 1
+    assert (await quiz_crud.update(quiz.id, dict(quiz_fields, name='newer name'))).version == 2
+
+
+@pytest.mark.asyncio
+async def test_services_on_memory_backend(client, quiz_data):
+    quiz_cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    leaderboards = LeaderboardCache(size=10, max_quizzes=10)
+    quiz_service = QuizService(client, quiz_cache, leaderboards)
+    attempt_service = AttemptService(client, quiz_cache, leaderboards)
+    await AttemptCRUD(client).create_indexes()
+
+    quiz_fields = {key: value for key, value in quiz_data.items() if key != '_id'}
+    quiz = await quiz_service.create(QuizInCreate(**quiz_fields))
+    answers = [{'value': [1, 3]}, {'value': 0}, {'value': 'answer'}]
+    for _ in range(3):
+        await attempt_service.pass_quiz(AttemptInCreate(user=uuid4(), quiz_id=quiz.id, answers=answers))
+
+    quizzes = await quiz_service.get_many_by_post_ids([quiz.post_id, -1])
+    assert quizzes[quiz.post_id].id == quiz.id and quizzes[-1] is None
+
+    leaderboard = await quiz_service.get_leaderboard(str(quiz.id), limit=10)
+    assert [position.rank for position in leaderboard.positions] == [1, 2, 3]
+    best = await attempt_service.pass_quiz(AttemptInCreate(user=uuid4(), quiz_id=quiz.id, answers=answers))
+    leaderboard = await quiz_service.get_leaderboard(str(quiz.id), limit=10)
+    assert len(leaderboard.positions) == 4 and leaderboard.positions[-1].attempt_id == best.id
+    await attempt_service.delete(str(best.id))
+    assert len((await quiz_service.get_leaderboard(str(quiz.id), limit=10)).positions) == 3
+
+    stats = await quiz_service.get_stats(str(quiz.id))
+    assert stats.attempts == 3
+    assert stats.mean_score == 2
+
+    attempts, next_id = await attempt_service.get_by_quiz_id(str(quiz.id), limit=2)
+    assert len(attempts) == 2 and next_id == attempts[-1].id
+
+    assert (await quiz_service.rebuild_stats(quiz.id)).attempts == 3
+    await quiz_service.delete(str(quiz.id))
+    await quiz_service.purge_attempts(str(quiz.id), batch_size=2)
+    assert (await quiz_service.get_deletion(str(quiz.id))).deleted_attempts == 3
+    assert await client[database_name][AttemptCRUD._collection_name].count_documents({}) == 0
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from core.metrics import Metrics
+from db.monitoring import (CommandTimer, PoolCheckoutTimer, SlowCommandRecorder, get_plan_stages, get_query_shape,
+                           redact)
+
+
+def test_command_timer():
+    metrics = Metrics()
+    timer = CommandTimer(metrics)
+
+    timer.succeeded(SimpleNamespace(command_name='find', duration_micros=1500))
+    timer.failed(SimpleNamespace(command_name='insert', duration_micros=500))
+
+    text = metrics.render()
+    assert 'mongodb_command_duration_seconds_count{command="find"} 1' in text
+    assert 'mongodb_command_duration_seconds_sum{command="find"} 0.0015' in text
+    assert 'mongodb_command_failures_total{command="insert"} 1' in text
+
+
+def test_pool_checkout_timer():
+    metrics = Metrics()
+    timer = PoolCheckoutTimer(metrics)
+
+    timer.connection_check_out_started(SimpleNamespace())
+    timer.connection_checked_out(SimpleNamespace())
+    timer.connection_checked_out(SimpleNamespace())  # without a start it is not observed
+    timer.connection_check_out_started(SimpleNamespace())
+    timer.connection_check_out_failed(SimpleNamespace(reason='timeout'))
+
+    text = metrics.render()
+    assert 'mongodb_pool_checkout_wait_seconds_count 2' in text
+    assert 'mongodb_pool_checkout_failures_total{reason="timeout"} 1' in text
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.levelno, json.loads(record.getMessage())))
+
+
+class MockMongoDBDatabase:
+    def __init__(self, reply):
+        self.reply = reply
+        self.commands = []
+
+    async def command(self, command):
+        self.commands.append(command)
+        return self.reply
+
+
+class MockMongoDBClient:
+    def __init__(self, reply):
+        self.database = MockMongoDBDatabase(reply)
+
+    def __getitem__(self, name):
+        return self.database
+
+
+@pytest.fixture
+def log_handler():
+    handler = ListHandler()
+    logger = logging.getLogger('test_slow_queries')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    yield handler
+    logger.removeHandler(handler)
+
+
+def command_events(command_name, command, duration_micros, request_id=1):
+    started = SimpleNamespace(request_id=request_id, connection_id=('localhost', 27017),
+                              database_name='quizzesAPI', command=command, command_name=command_name)
+    finished = SimpleNamespace(request_id=request_id, connection_id=('localhost', 27017),
+                               command_name=command_name, duration_micros=duration_micros)
+    return started, finished
+
+
+def test_redact():
+    assert redact({'post_id': 5, '_id': {'$in': [ObjectId(), ObjectId()]}}) == {'post_id': '?', '_id': {'$in': '?'}}
+    assert redact([{'$match': {'quiz_id': ObjectId()}}, {'$group': {'_id': '$total_score'}}]) == [
+        {'$match': {'quiz_id': '?'}}, {'$group': {'_id': '$total_score'}}
+    ]
+
+
+def test_get_query_shape():
+    assert get_query_shape('find', {'find': 'quizzes', 'filter': {'name': 'Quiz'}, 'sort': {'_id': 1}}) == {
+        'filter': {'name': '?'}, 'sort': {'_id': 1}
+    }
+    assert get_query_shape('delete', {'delete': 'attempts', 'deletes': [{'q': {'_id': 1}, 'limit': 1}]}) == [
+        {'_id': '?'}
+    ]
+    assert get_query_shape('insert', {'insert': 'attempts', 'documents': []}) is None
+
+
+def test_get_plan_stages():
+    explain = {'queryPlanner': {
+        'winningPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}},
+        'rejectedPlans': [{'stage': 'COLLSCAN'}],
+    }}
+
+    assert get_plan_stages(explain) == ['FETCH', 'IXSCAN']
+
+
+def test_slow_command_recorder_logs_slow_commands_only(log_handler):
+    recorder = SlowCommandRecorder(0.1, logging.getLogger('test_slow_queries'))
+    command = {'find': 'quizzes', 'filter': {'name': 'Secret name'}, 'lsid': {'id': 1}}
+
+    for request_id, duration in ((1, 50_000), (2, 250_000)):
+        started, finished = command_events('find', command, duration, request_id)
+        recorder.started(started)
+        recorder.succeeded(finished)
+
+    assert log_handler.records == [(logging.WARNING, {
+        'event': 'slow_command', 'command': 'find', 'database': 'quizzesAPI', 'collection': 'quizzes',
+        'shape': {'name': '?'}, 'duration_ms': 250.0, 'failed': False
+    })]
+
+
+@pytest.mark.asyncio
+async def test_slow_command_recorder_explains_shape_once(log_handler):
+    client = MockMongoDBClient({'queryPlanner': {'winningPlan': {'stage': 'COLLSCAN'}}})
+    recorder = SlowCommandRecorder(0.1, logging.getLogger('test_slow_queries'), explain=True)
+    recorder.bind(client)
+
+    for request_id, name in enumerate(('first', 'second')):
+        command = {'find': 'quizzes', 'filter': {'name': name}, 'lsid': {'id': 1}, '$db': 'quizzesAPI'}
+        started, finished = command_events('find', command, 500_000, request_id)
+        recorder.started(started)
+        recorder.succeeded(finished)
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    [explain_command] = client.database.commands
+    assert dict(explain_command) == {'explain': {'find': 'quizzes', 'filter': {'name': 'first'}},
+                                     'verbosity': 'queryPlanner'}
+    assert log_handler.records[-1] == (logging.WARNING, {
+        'event': 'explain', 'command': 'find', 'database': 'quizzesAPI', 'collection': 'quizzes',
+        'shape': {'name': '?'}, 'stages': ['COLLSCAN'], 'collscan': True
+    })
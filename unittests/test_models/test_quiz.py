@@ -3,7 +3,7 @@ from copy import copy
 import pytest
 from pydantic import ValidationError
 
-from models.quiz_question import QuestionInCreate
+from models import quiz_question
 from models.quiz import QuizInCreate
 
 
@@ -38,10 +38,8 @@ BASE_QUIZ = {
 
 
 def test_correct_validate_questions(monkeypatch):
-    def mock_get(*args, **kwargs):
-        return QUESTION_MOCKS
-
-    monkeypatch.setattr(QuestionInCreate, '__subclasses__', mock_get)
+    mapper = {model_class._question_type: model_class for model_class in QUESTION_MOCKS}
+    monkeypatch.setattr(quiz_question, 'QUESTION_TYPES', mapper)
     data = copy(BASE_QUIZ)
     data['questions'] = [
         {
@@ -68,10 +66,8 @@ def test_correct_validate_questions(monkeypatch):
 
 
 def test_validate_questions_question_type_dont_exist(monkeypatch):
-    def mock_get(*args, **kwargs):
-        return QUESTION_MOCKS
-
-    monkeypatch.setattr(QuestionInCreate, '__subclasses__', mock_get)
+    mapper = {model_class._question_type: model_class for model_class in QUESTION_MOCKS}
+    monkeypatch.setattr(quiz_question, 'QUESTION_TYPES', mapper)
     data = copy(BASE_QUIZ)
     data['questions'] = [
         {
@@ -92,3 +88,54 @@ def test_validate_questions_question_type_dont_exist(monkeypatch):
     ]
     with pytest.raises(ValidationError):
         QuizInCreate(**data)
+
+
+def test_question_types_registry():
+    assert quiz_question.QUESTION_TYPES == {
+        'text': quiz_question.TextQuestionInCreate,
+        'radio': quiz_question.RadioQuestionInCreate,
+        'checkbox': quiz_question.CheckboxQuestionInCreate,
+    }
+
+
+def test_validate_questions_single_pass():
+    data = copy(BASE_QUIZ)
+    data['questions'] = [
+        {
+            'description': 'Question description',
+            'type': 'radio',
+            'options': ['option1', 'option2'],
+            'answer': 1
+        },
+        {
+            'description': 'Question description',
+            'type': 'text',
+            'answer': 'Answer'
+        },
+    ]
+
+    result = QuizInCreate(**data)
+
+    assert isinstance(result.questions[0], quiz_question.RadioQuestionInCreate)
+    assert isinstance(result.questions[1], quiz_question.TextQuestionInCreate)
+
+
+def test_validate_questions_error_message():
+    data = copy(BASE_QUIZ)
+    data['questions'] = [{'description': 'Question description', 'type': 'incorrect', 'answer': 'Answer'}]
+
+    with pytest.raises(ValidationError) as exc_info:
+        QuizInCreate(**data)
+
+    assert exc_info.value.errors()[0]['msg'] == 'Question type incorrect is not in list: [text, radio, checkbox]'
+
+
+def test_validate_questions_missing_type():
+    data = copy(BASE_QUIZ)
+    data['questions'] = [{'description': 'Question description', 'answer': 'Answer'}]
+
+    with pytest.raises(ValidationError) as exc_info:
+        QuizInCreate(**data)
+
+    assert exc_info.value.errors()[0]['loc'] == ('questions', 0, 'type')
+    assert exc_info.value.errors()[0]['msg'] == 'field required'
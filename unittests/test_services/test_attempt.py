@@ -0,0 +1,142 @@
+from uuid import uuid4
+
+import pytest
+from bson import ObjectId
+
+from core.config import database_name
+
+from db.memory import MemoryClient
+from crud.attempt import AttemptCRUD
+from models.attempt import AttemptInCreate, AttemptInDB, AttemptSummary
+from models.quiz import QuizInDB
+from services.attempt import AttemptService
+from services.leaderboard import LeaderboardCache
+from services.quiz_cache import QuizCache
+
+
+class MockQuizCRUD:
+    def __init__(self, quizzes):
+        self.quizzes = quizzes
+        self.queries = []
+
+    async def get_many(self, **kwargs):
+        self.queries.append(kwargs)
+        return [quiz for quiz in self.quizzes if quiz.id in kwargs['_id']['$in']]
+
+
+class MockAttemptCRUD:
+    async def create_many(self, attempts_data):
+        attempts = [AttemptInDB(**attempt_data, _id=ObjectId()) for attempt_data in attempts_data]
+        return attempts, {}
+
+
+class MockQuizStatsCRUD:
+    def __init__(self):
+        self.recorded = []
+
+    async def record(self, attempts, sign=1):
+        self.recorded.extend((attempt.total_score, sign) for attempt in attempts)
+
+
+@pytest.fixture
+def quiz(quiz_data):
+    return QuizInDB(**quiz_data)
+
+
+@pytest.fixture
+def attempt_service(quiz):
+    service = AttemptService(MemoryClient(), QuizCache(max_entries=10, max_size=10 ** 6, ttl=60),
+                             LeaderboardCache(size=10, max_quizzes=10))
+    service._quiz_crud = MockQuizCRUD([quiz])
+    service._attempt_crud = MockAttemptCRUD()
+    service._stats_crud = MockQuizStatsCRUD()
+    return service
+
+
+def make_attempt(quiz_id, answers):
+    return AttemptInCreate(
+        user='a3b4a7a6-5a10-4a9b-9a3c-7c0b6a1f2f55',
+        quiz_id=quiz_id,
+        answers=[{'value': value} for value in answers]
+    )
+
+
+@pytest.mark.asyncio
+async def test_pass_quizzes(attempt_service, quiz):
+    unknown_quiz_id = ObjectId()
+    attempts = [
+        make_attempt(quiz.id, [[1, 3], 2, 'Answer']),
+        make_attempt(unknown_quiz_id, [1]),
+        make_attempt(quiz.id, [[1], 2, 'Wrong']),
+    ]
+
+    results = await attempt_service.pass_quizzes(attempts)
+
+    assert [result['attempt'].total_score for result in (results[0], results[2])] == [3, 1]
+    assert results[1]['attempt'] is None
+    assert str(unknown_quiz_id) in results[1]['error']
+    [query] = attempt_service._quiz_crud.queries
+    assert set(query['_id']['$in']) == {quiz.id, unknown_quiz_id}
+    assert attempt_service._stats_crud.recorded == [(3, 1), (1, 1)]
+
+
+@pytest.mark.asyncio
+async def test_pass_quizzes_uses_quiz_cache(attempt_service, quiz):
+    attempts = [make_attempt(quiz.id, [[1, 3], 2, 'Answer'])]
+
+    await attempt_service.pass_quizzes(attempts)
+    await attempt_service.pass_quizzes(attempts)
+
+    assert len(attempt_service._quiz_crud.queries) == 1
+
+
+@pytest.mark.asyncio
+async def test_export_by_quiz_id(quiz):
+    client = MemoryClient()
+    service = AttemptService(client, QuizCache(max_entries=10, max_size=10 ** 6, ttl=60),
+                             LeaderboardCache(size=10, max_quizzes=10))
+    service._quiz_crud = MockQuizCRUD([quiz])
+    service._quiz_cache.put(quiz)
+    attempts = client[database_name]['attempts']
+    user = uuid4()
+    await attempts.insert_many([
+        {'_id': ObjectId(), 'user': user, 'quiz_id': quiz.id, 'total_score': 2,
+         'answers': [{'value': [1, 3], 'is_correct': True}, {'value': 1, 'is_correct': False},
+                     {'value': 'Answer', 'is_correct': True}]},
+        {'_id': ObjectId(), 'user': user, 'quiz_id': quiz.id, 'total_score': 0,
+         'answers': [{'value': [1], 'is_correct': False}]},
+        {'_id': ObjectId(), 'user': user, 'quiz_id': ObjectId(), 'total_score': 1, 'answers': []},
+    ])
+
+    header, rows = await service.export_by_quiz_id(str(quiz.id), batch_size=1)
+
+    assert header == ['attempt_id', 'user', 'total_score', 'question_1', 'question_2', 'question_3']
+    assert [row[2:] async for row in rows] == [[2, 1, 0, 1], [0, 0, '', '']]
+
+
+@pytest.mark.asyncio
+async def test_get_by_user(quiz):
+    client = MemoryClient()
+    service = AttemptService(client, QuizCache(max_entries=10, max_size=10 ** 6, ttl=60),
+                             LeaderboardCache(size=10, max_quizzes=10))
+    await AttemptCRUD(client).create_indexes()
+    user, other_quiz_id = uuid4(), ObjectId()
+    documents = [
+        {'_id': ObjectId(), 'user': user, 'quiz_id': quiz_id, 'total_score': score,
+         'answers': [{'value': 1, 'is_correct': bool(score)}]}
+        for quiz_id, score in ((quiz.id, 1), (other_quiz_id, 0), (quiz.id, 1), (quiz.id, 0))
+    ]
+    await client[database_name]['attempts'].insert_many(
+        documents + [{**documents[0], '_id': ObjectId(), 'user': uuid4()}]
+    )
+
+    attempts, next_id = await service.get_by_user(user, limit=2)
+    assert [attempt.id for attempt in attempts] == [documents[0]['_id'], documents[1]['_id']]
+    assert all(type(attempt) is AttemptSummary for attempt in attempts)
+
+    attempts, next_id = await service.get_by_user(user, limit=2, after=next_id, quiz_id=str(quiz.id), answers=True)
+    assert [attempt.id for attempt in attempts] == [documents[2]['_id'], documents[3]['_id']]
+    assert attempts[0].answers[0].is_correct is True
+    assert next_id is None
+
+    assert len([attempt async for attempt in service.iterate_by_user(user, batch_size=2)]) == 4
@@ -0,0 +1,37 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from db.memory import MemoryClient
+from services.attempt import AttemptService
+from services.container import ServiceContainer
+from services.leaderboard import LeaderboardCache
+from services.quiz import QuizService
+from services.quiz_cache import QuizCache
+
+
+def test_services_are_created_once():
+    quiz_cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    leaderboards = LeaderboardCache(size=10, max_quizzes=10)
+    container = ServiceContainer(MemoryClient(), quiz_cache, leaderboards)
+
+    assert isinstance(container.get(QuizService), QuizService)
+    assert isinstance(container.get(AttemptService), AttemptService)
+    assert container.get(QuizService) is container.get(QuizService)
+    assert container.quiz_cache is quiz_cache
+    assert container.leaderboards is leaderboards
+
+
+def test_requests_share_service_instances(monkeypatch, quiz_data):
+    services = []
+
+    async def mock_get(self, *args, **kwargs):
+        services.append(self)
+        return quiz_data
+
+    monkeypatch.setattr(QuizService, 'get_by_id', mock_get)
+
+    with TestClient(app) as client:
+        client.get(f'/quiz/{quiz_data["_id"]}')
+        client.get(f'/quiz/{quiz_data["_id"]}')
+
+        assert services[0] is services[1] is app.state.services.get(QuizService)
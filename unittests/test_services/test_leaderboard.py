@@ -0,0 +1,147 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from bson import ObjectId
+
+from services.leaderboard import Leaderboard, LeaderboardCache, LeaderboardEntry
+
+
+def make_entries(*scores):
+    return [LeaderboardEntry(uuid4(), score, ObjectId()) for score in scores]
+
+
+async def iterate(entries):
+    for entry in entries:
+        yield entry
+
+
+def test_keeps_best_score_per_user():
+    board = Leaderboard(size=3)
+    first, second = make_entries(5, 3)
+    board.add(*first)
+    board.add(*second)
+
+    assert board.add(first.user, 4, ObjectId()) is False
+    assert board.add(second.user, 7, ObjectId()) is True
+    assert [(entry.user, entry.total_score) for entry in board.top(10)] == [(second.user, 7), (first.user, 5)]
+
+
+def test_evicts_worst_user_when_full():
+    board = Leaderboard(size=3)
+    entries = make_entries(5, 1, 3)
+    for entry in entries:
+        board.add(*entry)
+
+    assert board.add(*make_entries(1)[0]) is False  # equal to the worst score, but a later attempt
+    better = make_entries(2)[0]
+    assert board.add(*better) is True
+
+    assert [entry.total_score for entry in board.top(10)] == [5, 3, 2]
+    assert entries[1].user not in [entry.user for entry in board.top(10)]
+    assert len(board) == 3
+
+
+def test_ties_are_ranked_by_attempt():
+    board = Leaderboard(size=2)
+    entries = make_entries(3, 3, 3)
+    for entry in reversed(entries):
+        board.add(*entry)
+
+    assert board.top(2) == entries[:2]
+
+
+def test_improved_users_do_not_grow_heap():
+    board = Leaderboard(size=2)
+    user = uuid4()
+    board.add(*make_entries(100)[0])
+    for score in range(50):
+        board.add(user, score, ObjectId())
+
+    assert len(board._heap) <= 4
+    assert [entry.total_score for entry in board.top(2)] == [100, 49]
+
+
+@pytest.mark.asyncio
+async def test_seed_reads_until_full():
+    board = Leaderboard(size=2)
+    user = uuid4()
+    entries = [LeaderboardEntry(user, 9, ObjectId()), LeaderboardEntry(user, 8, ObjectId()), *make_entries(7, 6, 5)]
+    read = []
+
+    async def attempts():
+        for entry in entries:
+            read.append(entry)
+            yield entry
+
+    await board.seed(attempts())
+
+    assert [entry.total_score for entry in board.top(5)] == [9, 7]
+    assert len(read) == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_seeds_once_and_follows_records():
+    cache = LeaderboardCache(size=10, max_quizzes=10)
+    quiz_id = ObjectId()
+    seeded = asyncio.Event()
+    seedings = []
+
+    async def loader():
+        seedings.append(quiz_id)
+        await seeded.wait()
+        for entry in make_entries(3):
+            yield entry
+
+    reads = [asyncio.ensure_future(cache.get(quiz_id, loader)) for _ in range(3)]
+    while not seedings:  # the seeding query is running
+        await asyncio.sleep(0)
+    cache.record(quiz_id, make_entries(5)[0])  # passed while the board is being seeded
+    seeded.set()
+    boards = await asyncio.gather(*reads)
+
+    assert seedings == [quiz_id]
+    assert boards[0] is boards[1] is boards[2]
+    assert [entry.total_score for entry in boards[0].top(10)] == [5, 3]
+
+    cache.record(quiz_id, make_entries(4)[0])
+    board = await cache.get(quiz_id, loader)
+    assert [entry.total_score for entry in board.top(10)] == [5, 4, 3]
+    cache.record(ObjectId(), make_entries(1)[0])  # no board, the attempt is found by the next seeding
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidation():
+    cache = LeaderboardCache(size=10, max_quizzes=1)
+    quiz_id, other_quiz_id = ObjectId(), ObjectId()
+    scores = [3]
+
+    def loader():
+        return iterate(make_entries(*scores))
+
+    board = await cache.get(quiz_id, loader)
+    assert await cache.get(quiz_id, loader) is board
+
+    cache.invalidate(quiz_id)
+    scores.append(1)
+    board = await cache.get(quiz_id, loader)
+    assert [entry.total_score for entry in board.top(10)] == [3, 1]
+
+    await cache.get(other_quiz_id, loader)  # evicts the least recently used board
+    assert await cache.get(quiz_id, loader) is not board
+
+
+@pytest.mark.asyncio
+async def test_cache_stops_collecting_records_after_failed_seeding():
+    cache = LeaderboardCache(size=10, max_quizzes=10)
+    quiz_id = ObjectId()
+
+    async def loader():
+        raise ConnectionError('no DB')
+        yield
+
+    with pytest.raises(ConnectionError):
+        await cache.get(quiz_id, loader)
+
+    cache.record(quiz_id, make_entries(1)[0])
+    assert cache._seeding == {}
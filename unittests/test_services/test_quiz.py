@@ -0,0 +1,265 @@
+import asyncio
+import json
+
+import pytest
+from bson import ObjectId
+
+from db.exceptions import DatabaseResultException
+from db.memory import MemoryClient
+from models.quiz import QuizInCreate, QuizInDB, QuizPartial, QuizPartialInDB
+from models.quiz_deletion import QuizDeletion
+from services.leaderboard import LeaderboardCache
+from services.quiz import QuizService
+from services.quiz_cache import QuizCache
+
+
+class MockAttemptCRUD:
+    def __init__(self, attempts_count):
+        self.attempts_count = attempts_count
+        self.batches = []
+
+    async def delete_batch_by_quiz_id(self, quiz_id, batch_size):
+        deleted = min(batch_size, self.attempts_count)
+        self.attempts_count -= deleted
+        if deleted:
+            self.batches.append(deleted)
+        return deleted
+
+
+class MockQuizDeletionCRUD:
+    def __init__(self, unfinished=()):
+        self.unfinished = list(unfinished)
+        self.progress = 0
+        self.finished = []
+        self.started = []
+        self.dropped = []
+
+    async def start(self, quiz_id):
+        self.started.append(quiz_id)
+        return QuizDeletion(_id=quiz_id)
+
+    async def get_many(self, **kwargs):
+        return [QuizDeletion(_id=quiz_id) for quiz_id in self.unfinished]
+
+    async def add_progress(self, quiz_id, deleted_attempts):
+        self.progress += deleted_attempts
+
+    async def finish(self, quiz_id):
+        self.finished.append(quiz_id)
+
+    async def delete(self, quiz_id):
+        self.dropped.append(quiz_id)
+
+
+def make_service(attempts_count, unfinished=()):
+    service = QuizService(MemoryClient(), QuizCache(max_entries=10, max_size=10 ** 6, ttl=60),
+                          LeaderboardCache(size=10, max_quizzes=10))
+    service._attempt_crud = MockAttemptCRUD(attempts_count)
+    service._deletion_crud = MockQuizDeletionCRUD(unfinished)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_purge_attempts_in_batches():
+    quiz_id = ObjectId()
+    service = make_service(attempts_count=25)
+
+    await service.purge_attempts(str(quiz_id), batch_size=10)
+
+    assert service._attempt_crud.batches == [10, 10, 5]
+    assert service._deletion_crud.progress == 25
+    assert service._deletion_crud.finished == [quiz_id]
+
+
+class MockSlowQuizCRUD:
+    def __init__(self, quiz):
+        self.quiz = quiz
+        self.read_done = asyncio.Event()
+        self.release_read = asyncio.Event()
+        self.update_started = asyncio.Event()
+        self.release_write = asyncio.Event()
+
+    async def get(self, **kwargs):
+        quiz = self.quiz
+        self.read_done.set()
+        await self.release_read.wait()
+        return quiz
+
+    async def update(self, quiz_id, quiz_data):
+        self.update_started.set()
+        await self.release_write.wait()
+        self.quiz = QuizInDB(**quiz_data, _id=quiz_id, version=self.quiz.version + 1)
+        return self.quiz
+
+
+@pytest.mark.asyncio
+async def test_load_reading_before_update_does_not_overwrite_it(quiz_data):
+    service = make_service(attempts_count=0)
+    old_quiz = QuizInDB(**quiz_data)
+    crud = service._quiz_crud = MockSlowQuizCRUD(old_quiz)
+    quiz_fields = {key: value for key, value in quiz_data.items() if key != '_id'}
+
+    update = asyncio.ensure_future(service.update(str(old_quiz.id),
+                                                  QuizInCreate(**{**quiz_fields, 'name': 'new name'})))
+    await crud.update_started.wait()  # the cache is invalidated, the write is in progress
+    load = asyncio.ensure_future(service.get_by_id(str(old_quiz.id)))
+    await crud.read_done.wait()  # the load has read the quiz before the write
+    crud.release_write.set()
+    updated = await update
+    crud.release_read.set()
+
+    assert (await load).name == 'Quiz name'
+    assert (await service.get_by_id(str(old_quiz.id))) is updated
+
+
+class MockFailingQuizStatsCRUD:
+    async def delete_for_quiz(self, quiz_id):
+        raise RuntimeError('connection lost')
+
+
+@pytest.mark.asyncio
+async def test_delete_records_deletion_first(quiz_data):
+    service = make_service(attempts_count=0)
+    quiz_fields = {key: value for key, value in quiz_data.items() if key != '_id'}
+    quiz = await service.create(QuizInCreate(**quiz_fields))
+    service._stats_crud = MockFailingQuizStatsCRUD()
+
+    with pytest.raises(RuntimeError):
+        await service.delete(str(quiz.id))
+
+    assert service._deletion_crud.started == [quiz.id]  # resume_deletions will purge the attempts
+
+
+@pytest.mark.asyncio
+async def test_delete_missing_quiz_records_no_deletion():
+    service = make_service(attempts_count=0)
+
+    with pytest.raises(DatabaseResultException):
+        await service.delete(str(ObjectId()))
+
+    assert service._deletion_crud.started == []
+
+
+@pytest.mark.asyncio
+async def test_failed_delete_keeps_attempts(monkeypatch, quiz_data):
+    service = make_service(attempts_count=3)
+    quiz_fields = {key: value for key, value in quiz_data.items() if key != '_id'}
+    quiz = await service.create(QuizInCreate(**quiz_fields))
+
+    async def failing_delete(*args, **kwargs):
+        raise ConnectionError('transient')
+
+    monkeypatch.setattr(service._quiz_crud, 'delete', failing_delete)
+    with pytest.raises(ConnectionError):
+        await service.delete(str(quiz.id))
+
+    assert service._deletion_crud.dropped == [quiz.id]
+
+    service._deletion_crud = MockQuizDeletionCRUD(unfinished=[quiz.id])  # the record outlived a crash
+    await service.resume_deletions()
+
+    assert service._attempt_crud.attempts_count == 3
+    assert service._deletion_crud.dropped == [quiz.id]
+    assert service._deletion_crud.finished == []
+
+
+@pytest.mark.asyncio
+async def test_purge_attempts_in_background_logs_failure(caplog):
+    quiz_id = ObjectId()
+    service = make_service(attempts_count=1)
+    service._attempt_crud = None
+
+    await service.purge_attempts_in_background(str(quiz_id))
+
+    assert f'Deletion of attempts of quiz {quiz_id} failed' in caplog.text
+    assert service._deletion_crud.finished == []
+
+
+@pytest.mark.asyncio
+async def test_resume_deletions():
+    quiz_id = ObjectId()
+    service = make_service(attempts_count=3, unfinished=[quiz_id])
+
+    await service.resume_deletions()
+
+    assert service._attempt_crud.attempts_count == 0
+    assert service._deletion_crud.finished == [quiz_id]
+
+
+class MockQuizCRUD:
+    def __init__(self, quizzes):
+        self.quizzes = quizzes
+        self.queries = []
+
+    async def get_many(self, model=None, **kwargs):
+        self.queries.append((kwargs, model))
+        post_ids = kwargs['post_id']['$in']
+        return [model(**quiz) for quiz in self.quizzes if quiz['post_id'] in post_ids]
+
+
+@pytest.mark.asyncio
+async def test_get_many_by_post_ids(quiz_data):
+    other_quiz = {**quiz_data, '_id': ObjectId(), 'post_id': 456}
+    service = make_service(attempts_count=0)
+    service._quiz_cache.put(QuizInDB(**quiz_data))
+    service._quiz_crud = MockQuizCRUD([quiz_data, other_quiz])
+
+    quizzes = await service.get_many_by_post_ids([123, 456, 789])
+
+    assert service._quiz_crud.queries == [({'post_id': {'$in': [456, 789]}}, QuizPartial)]
+    assert list(quizzes) == [123, 456, 789]
+    assert quizzes[123].id == quiz_data['_id']
+    assert quizzes[456].id == other_quiz['_id']
+    assert quizzes[789] is None
+
+
+@pytest.mark.asyncio
+async def test_get_by_post_id_caches_quiz_without_answers(quiz_data):
+    service = make_service(attempts_count=0)
+    collection = service._quiz_crud._collection
+    await collection.insert_one({**quiz_data, 'version': 2})
+
+    quiz = await service.get_by_post_id(quiz_data['post_id'])
+
+    assert isinstance(quiz, QuizPartialInDB)
+    assert quiz.version == 2
+    assert all('answer' not in question for question in quiz.dict()['questions'])
+    assert await service.get_by_post_id(quiz_data['post_id']) is quiz  # cached without answers
+
+    quiz_fields = {key: value for key, value in quiz_data.items() if key != '_id'}
+    await service.update(str(quiz.id), QuizInCreate(**{**quiz_fields, 'name': 'Updated'}))
+    updated = await service.get_by_post_id(quiz_data['post_id'])
+    assert isinstance(updated, QuizPartialInDB)
+    assert (updated.name, updated.version) == ('Updated', 3)
+
+
+@pytest.mark.asyncio
+async def test_import_quizzes(quiz_data):
+    service = make_service(attempts_count=0)
+    await service._quiz_crud.create_indexes()
+    quiz_fields = {key: value for key, value in quiz_data.items() if key != '_id'}
+    lines = [
+        json.dumps(quiz_fields),
+        json.dumps({**quiz_fields, 'post_id': 124}),
+        '',
+        json.dumps(quiz_fields),
+        '{"name": ',
+        json.dumps({**quiz_fields, 'post_id': 125, 'questions': [{'description': 'q', 'type': 'unknown'}]}),
+        json.dumps({**quiz_fields, 'post_id': 126, 'description': 'x' * 2000}),
+        json.dumps({**quiz_fields, 'post_id': 127}),
+    ]
+    body = ('\n'.join(lines) + '\n').encode()
+
+    async def chunks():
+        for start in range(0, len(body), 100):
+            yield body[start:start + 100]
+
+    results = [result async for result in service.import_quizzes(chunks(), chunk_size=2, max_line_size=1000)]
+
+    assert [result.line for result in results] == [1, 2, 4, 5, 6, 7, 8]
+    assert [result.quiz_id is not None for result in results] == [True, True, False, False, False, False, True]
+    assert results[2].error == 'There is a quiz with post id "123" already'
+    assert results[3].error.startswith('__root__: ')
+    assert 'not in list' in results[4].error
+    assert results[5].error == 'Line is longer than 1000 bytes'
+    assert (await service.get_by_post_id(127)).id == results[6].quiz_id
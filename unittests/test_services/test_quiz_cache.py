@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from models.quiz import QuizInDB, QuizPartialInDB
+from services.quiz_cache import QuizCache, estimate_quiz_size
+
+
+class MockClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def quiz(quiz_data):
+    return QuizInDB(**quiz_data)
+
+
+def make_quiz(quiz_data, post_id):
+    return QuizInDB(**{**quiz_data, '_id': ObjectId(), 'post_id': post_id})
+
+
+def test_get_by_id_and_post_id(quiz):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    cache.put(quiz)
+
+    assert cache.get_by_id(quiz.id) is quiz
+    assert cache.get_by_post_id(quiz.post_id) is quiz
+    assert cache.stats()['hits'] == 2
+
+
+def test_miss(quiz):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+
+    assert cache.get_by_id(quiz.id) is None
+    assert cache.get_by_post_id(quiz.post_id) is None
+    assert cache.stats()['misses'] == 2
+
+
+def test_ttl_expiration(quiz):
+    clock = MockClock()
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60, clock=clock)
+    cache.put(quiz)
+
+    clock.now = 61
+    assert cache.get_by_id(quiz.id) is None
+    assert cache.get_by_post_id(quiz.post_id) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_by_entries(quiz_data):
+    cache = QuizCache(max_entries=2, max_size=10 ** 6, ttl=60)
+    first, second, third = (make_quiz(quiz_data, post_id) for post_id in range(3))
+
+    cache.put(first)
+    cache.put(second)
+    cache.get_by_id(first.id)
+    cache.put(third)
+
+    assert cache.get_by_id(second.id) is None
+    assert cache.get_by_post_id(second.post_id) is None
+    assert cache.get_by_id(first.id) is first
+    assert cache.get_by_id(third.id) is third
+    assert cache.stats()['evictions'] == 1
+
+
+def test_lru_eviction_by_size(quiz_data):
+    first, second = (make_quiz(quiz_data, post_id) for post_id in range(2))
+    cache = QuizCache(max_entries=10, max_size=estimate_quiz_size(first) + 1, ttl=60)
+
+    cache.put(first)
+    cache.put(second)
+
+    assert cache.get_by_id(first.id) is None
+    assert cache.get_by_id(second.id) is second
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_removes_both_keys(quiz):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    cache.put(quiz)
+    cache.invalidate(quiz.id)
+
+    assert cache.get_by_id(quiz.id) is None
+    assert cache.get_by_post_id(quiz.post_id) is None
+    assert cache.stats()['size'] == 0
+
+
+def test_put_replaces_changed_post_id(quiz, quiz_data):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    cache.put(quiz)
+    updated_quiz = QuizInDB(**{**quiz_data, 'post_id': quiz.post_id + 1})
+    cache.put(updated_quiz)
+
+    assert cache.get_by_post_id(quiz.post_id) is None
+    assert cache.get_by_post_id(updated_quiz.post_id) is updated_quiz
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load(quiz):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(quiz.post_id)
+        await asyncio.sleep(0)
+        return quiz
+
+    results = await asyncio.gather(*(cache.load_by_post_id(quiz.post_id, loader) for _ in range(10)))
+
+    assert results == [quiz] * 10
+    assert len(loads) == 1
+    assert cache.get_by_id(quiz.id) is quiz
+
+
+@pytest.mark.asyncio
+async def test_projection_is_cached_next_to_quiz(quiz, quiz_data):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    partial = QuizPartialInDB(**quiz_data)
+    loads = []
+
+    async def loader():
+        loads.append(quiz.post_id)
+        await asyncio.sleep(0)
+        return partial
+
+    results = await asyncio.gather(*(cache.load_by_post_id(quiz.post_id, loader, model=QuizPartialInDB)
+                                     for _ in range(10)))
+
+    assert results == [partial] * 10
+    assert await cache.load_by_post_id(quiz.post_id, loader, model=QuizPartialInDB) is partial
+    assert len(loads) == 1
+    assert cache.get_by_post_id(quiz.post_id) is None  # the projection does not take the place of the quiz
+
+    cache.put(quiz)
+    assert cache.get_by_post_id(quiz.post_id) is quiz
+    assert cache.get_by_post_id(quiz.post_id, QuizPartialInDB) is partial
+
+    cache.put(QuizPartialInDB(**quiz_data, version=-1))
+    assert cache.get_by_post_id(quiz.post_id, QuizPartialInDB) is partial
+
+    cache.invalidate(quiz.id)
+    assert cache.get_by_post_id(quiz.post_id) is None
+    assert cache.get_by_post_id(quiz.post_id, QuizPartialInDB) is None
+    assert cache.stats()['entries'] == cache.stats()['size'] == 0
+
+
+@pytest.mark.asyncio
+async def test_load_started_before_invalidation_is_not_cached(quiz):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return quiz
+
+    load = asyncio.ensure_future(cache.load_by_id(quiz.id, loader))
+    await asyncio.sleep(0)
+    cache.invalidate(quiz.id)
+    release.set()
+
+    assert await load is quiz
+    assert cache.get_by_id(quiz.id) is None
+
+
+def test_put_keeps_later_version(quiz):
+    cache = QuizCache(max_entries=10, max_size=10 ** 6, ttl=60)
+    updated = quiz.copy(update={'version': quiz.version + 1})
+    cache.put(updated)
+    cache.put(quiz)
+
+    assert cache.get_by_id(quiz.id) is updated
@@ -0,0 +1,40 @@
+import pytest
+
+from models.quiz import QuizInDB
+from services.scoring import AnswerKey
+
+
+@pytest.fixture
+def quiz(quiz_data):
+    return QuizInDB(**quiz_data)
+
+
+@pytest.mark.parametrize('answers, expected_correct', [
+    ([[1, 3], 2, 'Answer'], [True, True, True]),
+    ([[3, 1], 2, '  answer '], [True, True, True]),
+    ([[1], 3, 'Wrong'], [False, False, False]),
+    ([[1, 3, 4], 2, 2], [False, True, False]),
+    ([[1, 3]], [True]),
+    ([[1, 1, 3], 2, 'Answer'], [False, True, True]),
+    ([[1, 3, 3, 1], 2, 'Answer'], [False, True, True]),
+])
+def test_grade(quiz, answers, expected_correct):
+    answers = [{'value': value} for value in answers]
+    score = AnswerKey.for_quiz(quiz).grade(answers)
+
+    assert [answer['is_correct'] for answer in answers] == expected_correct
+    assert score == sum(expected_correct)
+
+
+def test_grade_many(quiz):
+    attempts = [
+        [{'value': [1, 3]}, {'value': 2}, {'value': 'Answer'}],
+        [{'value': [1]}, {'value': 2}, {'value': 'Wrong'}],
+    ]
+
+    assert AnswerKey.for_quiz(quiz).grade_many(attempts) == [3, 1]
+
+
+def test_answer_key_is_memoized_per_quiz_instance(quiz, quiz_data):
+    assert AnswerKey.for_quiz(quiz) is AnswerKey.for_quiz(quiz)
+    assert AnswerKey.for_quiz(quiz) is not AnswerKey.for_quiz(QuizInDB(**quiz_data))
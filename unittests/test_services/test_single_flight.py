@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+class MockCall:
+    def __init__(self, result=None, exception=None):
+        self.result = result
+        self.exception = exception
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    single_flight = SingleFlight()
+    call = MockCall(result='quiz')
+
+    waiters = [asyncio.ensure_future(single_flight.do('key', call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert single_flight.in_flight() == 1
+    call.release.set()
+
+    assert await asyncio.gather(*waiters) == ['quiz'] * 5
+    assert call.calls == 1
+    assert single_flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_calls_after_completion_run_again():
+    single_flight = SingleFlight()
+    call = MockCall(result='quiz')
+    call.release.set()
+
+    await single_flight.do('key', call)
+    await single_flight.do('key', call)
+
+    assert call.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_is_propagated_to_every_waiter():
+    single_flight = SingleFlight()
+    call = MockCall(exception=LookupError('There are no quizzes'))
+
+    waiters = [asyncio.ensure_future(single_flight.do('key', call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    call.release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(result, LookupError) for result in results)
+    assert call.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    single_flight = SingleFlight()
+    call = MockCall(result='quiz')
+
+    cancelled = asyncio.ensure_future(single_flight.do('key', call))
+    waiting = asyncio.ensure_future(single_flight.do('key', call))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await waiting == 'quiz'
+    assert cancelled.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_coalesced():
+    single_flight = SingleFlight()
+    call = MockCall(result='quiz')
+    call.release.set()
+
+    await asyncio.gather(single_flight.do('first', call), single_flight.do('second', call))
+
+    assert call.calls == 2
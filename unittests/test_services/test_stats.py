@@ -0,0 +1,35 @@
+import pytest
+from bson import ObjectId
+
+from services.stats import build_quiz_stats
+
+
+@pytest.mark.parametrize('histogram, expected_mean, expected_median', [
+    ({1: 1, 2: 1, 3: 1}, 2, 2),
+    ({0: 1, 3: 3}, 2.25, 3),
+    ({1: 2, 3: 2}, 2, 2),
+    ({2: 1}, 2, 2),
+])
+def test_build_quiz_stats_scores(histogram, expected_mean, expected_median):
+    stats = build_quiz_stats(ObjectId(), histogram, {})
+
+    assert stats.attempts == sum(histogram.values())
+    assert stats.mean_score == expected_mean
+    assert stats.median_score == expected_median
+    assert [bucket.score for bucket in stats.histogram] == sorted(histogram)
+
+
+def test_build_quiz_stats_no_attempts():
+    stats = build_quiz_stats(ObjectId(), {0: 0}, {})
+
+    assert stats.attempts == 0
+    assert stats.mean_score is None
+    assert stats.median_score is None
+    assert stats.histogram == []
+
+
+def test_build_quiz_stats_questions():
+    questions = {1: {'answered': 4, 'correct': 1}, 0: {'answered': 4, 'correct': 4}, 2: {'answered': 0, 'correct': 0}}
+    stats = build_quiz_stats(ObjectId(), {}, questions)
+
+    assert [(question.index, question.correct_ratio) for question in stats.questions] == [(0, 1), (1, 0.25), (2, 0)]